@@ -1,8 +1,19 @@
-import os
-import pickle
+import logging
+import tempfile
+import time
+
 import streamlit as st
 from streamlit_option_menu import option_menu
 
+from smart_health import metrics, startup
+from smart_health.encoding import CP_MAP, FAMILY_HISTORY_DPF, SEX_MAP, SLOPE_MAP, THAL_MAP, YES_NO, encode_record
+from smart_health.inference import predict_one, record_scored
+from smart_health.registry import get_registry, start_model_watcher
+from smart_health.specs import MODEL_SPECS
+
+# the whole rerun, from page config to the footer, is timed as the "script" stage
+script_start = time.perf_counter()
+
 # ---------- PAGE CONFIG ----------
 st.set_page_config(
     page_title="Smart Health Assistant",
@@ -10,15 +21,20 @@ st.set_page_config(
     page_icon="🧑‍⚕️"
 )
 
-working_dir = os.path.dirname(os.path.abspath(__file__))
-
-# Load models
-diabetes_model = pickle.load(open(f"{working_dir}/saved_models/diabetes_model.sav", "rb"))
-heart_disease_model = pickle.load(open(f"{working_dir}/saved_models/heart_disease_model.sav", "rb"))
-parkinsons_model = pickle.load(open(f"{working_dir}/saved_models/parkinsons_model.sav", "rb"))
-kidney_model = pickle.load(open(f"{working_dir}/saved_models/kidney_model.sav", "rb"))
+# Models are loaded once per server process, on a background thread started
+# by the first session, so the page shell renders without waiting for them.
+# A retrained model file dropped into saved_models/ is swapped in live.
+registry = get_registry()
+startup.start_warm_up()
+start_model_watcher()
+try:
+    metrics.start_exporter()
+except OSError as exc:
+    # a taken metrics port must not take the page down with it
+    logging.getLogger(__name__).warning("Metrics exporter not started: %s", exc)
 
 # ---------- UI STYLE ----------
+style_start = time.perf_counter()
 st.markdown(
     """
 <style>
@@ -46,7 +62,8 @@ html, body, [class*="css"] {
 }
 
 /* Center ALL buttons strongly by default */
-.stButton > button {
+.stButton > button,
+[data-testid="stFormSubmitButton"] > button {
     display: block !important;
     margin-left: auto !important;
     margin-right: auto !important;
@@ -80,6 +97,8 @@ label {
     unsafe_allow_html=True,
 )
 
+style_seconds = time.perf_counter() - style_start
+
 # ---------- Helper to show colored result ----------
 def show_result(text: str, is_disease: bool):
     if not text:
@@ -91,6 +110,134 @@ def show_result(text: str, is_disease: bool):
     )
 
 
+# ---------- Why this result: per-feature contributions ----------
+def show_explanation(key: str, row, top: int = 5):
+    """Bar chart of the inputs that moved this prediction most, from the model's training average."""
+    from smart_health.explain import explain
+
+    try:
+        result = explain(key, row)
+    except TypeError:
+        return  # no exact explanation for this kind of model; the result stands alone
+    bars = [
+        {"feature": feature, "contribution": value, "direction": "towards disease" if value > 0 else "away from disease"}
+        for feature, value in result.top(top)
+    ]
+    st.markdown("#### 🔎 What Drove This Result")
+    st.vega_lite_chart(
+        {
+            "data": {"values": bars},
+            "mark": "bar",
+            "height": 28 * len(bars),
+            "encoding": {
+                "y": {"field": "feature", "type": "nominal", "sort": None, "title": None},
+                "x": {"field": "contribution", "type": "quantitative", "title": f"change in {result.score_name}"},
+                "color": {
+                    "field": "direction",
+                    "type": "nominal",
+                    "title": None,
+                    "scale": {"domain": ["towards disease", "away from disease"], "range": ["#ef4444", "#22c55e"]},
+                },
+            },
+        },
+        use_container_width=True,
+    )
+    st.caption(
+        f"Starting from {result.base:.3g}, the {result.score_name} for the training data as a whole, "
+        f"these inputs moved it to {result.score:.3g} (disease above {result.threshold:g})."
+    )
+
+
+# ---------- What-if panel under a result ----------
+# features swept first on each page: (one value, second value of a grid)
+WHAT_IF_DEFAULTS = {
+    "diabetes": ("Glucose", "BMI"),
+    "heart": ("chol", "age"),
+    "parkinsons": ("MDVP:Fo(Hz)", "HNR"),
+    "kidney": ("sc", "hemo"),
+}
+
+
+def show_what_if(key: str):
+    """Risk curve for the last checked inputs of ``key`` with one or two values varied."""
+    row = st.session_state.get(f"{key}_whatif_row")
+    if row is None:
+        return
+    from smart_health import whatif
+
+    features = MODEL_SPECS[key].features
+    default_x, default_y = WHAT_IF_DEFAULTS[key]
+    st.markdown("#### 📈 What If a Value Changes?")
+    st.caption("Based on the inputs of your last result. All other values stay as you entered them.")
+    w1, w2 = st.columns(2)
+    with w1:
+        x = st.selectbox("Value to vary", features, index=features.index(default_x), key=f"{key}_whatif_x")
+    with w2:
+        second = ("None",) + tuple(name for name in features if name != x)
+        y = st.selectbox("Second value (optional)", second, key=f"{key}_whatif_y")
+
+    if y == "None":
+        result = whatif.sweep(key, row, x)
+        points = [{"x": value, "score": score} for value, score in zip(result.axes[0].tolist(), result.scores.tolist())]
+        st.vega_lite_chart(
+            {
+                "data": {"values": points},
+                "layer": [
+                    {
+                        "mark": "line",
+                        "encoding": {
+                            "x": {"field": "x", "type": "quantitative", "title": x},
+                            "y": {"field": "score", "type": "quantitative", "title": result.score_name},
+                        },
+                    },
+                    {
+                        "mark": {"type": "rule", "strokeDash": [4, 4], "color": "#ef4444"},
+                        "encoding": {"y": {"datum": result.threshold}},
+                    },
+                ],
+            },
+            use_container_width=True,
+        )
+        flips = result.flips()
+        if flips:
+            st.caption(f"The prediction changes at {x} ≈ " + ", ".join(f"{value:.4g}" for value in flips) + ".")
+        else:
+            st.caption(f"The prediction stays the same across the whole {x} range.")
+    else:
+        result = whatif.grid(key, row, x, y)
+        xs, ys = (axis.tolist() for axis in result.axes)
+        scores = result.scores.tolist()
+        cells = [
+            {"x": xs[j], "y": ys[i], "score": scores[i][j]}
+            for i in range(len(ys))
+            for j in range(len(xs))
+        ]
+        st.vega_lite_chart(
+            {
+                "data": {"values": cells},
+                "mark": "rect",
+                "encoding": {
+                    "x": {"field": "x", "type": "ordinal", "title": x, "axis": {"format": ".3~g"}},
+                    "y": {"field": "y", "type": "ordinal", "title": y, "sort": "descending", "axis": {"format": ".3~g"}},
+                    "color": {
+                        "field": "score",
+                        "type": "quantitative",
+                        "title": result.score_name,
+                        "scale": {"scheme": "redyellowgreen", "reverse": True, "domainMid": result.threshold},
+                    },
+                },
+            },
+            use_container_width=True,
+        )
+        st.caption(f"Red cells are predicted as disease: {result.score_name} above {result.threshold:g}.")
+
+
+# reruns only the panel when its selectboxes change, on Streamlit versions with fragments
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+if _fragment is not None:
+    show_what_if = _fragment(show_what_if)
+
+
 # ---------- Title + TOP MENU ----------
 st.markdown(
     '<div class="main-title">🧑‍⚕️ Smart Health Assistant</div>',
@@ -108,8 +255,10 @@ selected = option_menu(
         "Heart Disease Prediction",
         "Parkinsons Prediction",
         "Kidney Disease Prediction",
+        "Full Screening",
+        "Batch Screening",
     ],
-    icons=["activity", "heart", "person", "droplet-half"],
+    icons=["activity", "heart", "person", "droplet-half", "clipboard2-pulse", "file-earmark-spreadsheet"],
     orientation="horizontal",
     styles={
         "container": {
@@ -135,14 +284,22 @@ selected = option_menu(
 
 st.write("")
 
+# latency histograms for this page's stages (see smart_health/metrics.py)
+stages = metrics.page_stages(selected)
+stages["style"].observe(style_seconds)
+
 
 # ===================== DIABETES PREDICTION PAGE =====================
 if selected == "Diabetes Prediction":
 
     st.title("🩸 Diabetes Prediction")
 
-    # Inputs section
-    with st.container():
+    diab_diagnosis = ""
+    diab_is_disease = False
+    diab_tips = []
+
+    # Inputs section; sent together on submit, so editing them does not rerun the script
+    with st.form("diabetes_form", border=False):
         col1, col2, col3 = st.columns(3)
 
         # [Glucose, BMI, Age, DPF, Insulin, BloodPressure]
@@ -160,6 +317,7 @@ if selected == "Diabetes Prediction":
                 min_value=18.0,
                 max_value=67.0,
                 help="If you don't know BMI, calculate using the BMI section below.",
+                key="diab_bmi",
             )
 
         with col3:
@@ -189,58 +347,65 @@ if selected == "Diabetes Prediction":
                 ("No", "Yes"),
             )
 
-        if FamilyHistory == "Yes":
-            DiabetesPedigreeFunction = 2.5
-        else:
-            DiabetesPedigreeFunction = 0.08
+        # center Get Result button, very slight shift to the right
+        d1, d2, d3 = st.columns([1, 1, 0.8])
+        with d2:
+            diab_btn = st.form_submit_button("🔍 Get Diabetes Test Result")
 
     # ---------- BMI Calculator ----------
-    st.markdown("### 🧮 BMI Calculator (Optional)")
-    bmi_col1, bmi_col2 = st.columns(2)
-
-    with bmi_col1:
-        height = st.number_input(
-            "Height (cm)",
-            min_value=100,
-            max_value=230,
-            value=170,
-        )
-        # button directly under Height, left side
-        calc_bmi = st.button("Calculate BMI")
-    with bmi_col2:
-        weight = st.number_input(
-            "Weight (kg)",
-            min_value=20,
-            max_value=200,
-            value=60,
-        )
+    def apply_bmi():
+        """Fill the BMI input from the calculator before the rerun draws it."""
+        height = st.session_state["bmi_height"]
+        bmi_value = st.session_state["bmi_weight"] / ((height / 100) ** 2)
+        # the BMI input only accepts 18 – 67
+        st.session_state["diab_bmi"] = min(max(round(bmi_value, 2), 18.0), 67.0)
+        st.session_state["bmi_message"] = f"Calculated BMI: {bmi_value:.2f} (filled in above)"
 
-    if calc_bmi and height > 0:
-        bmi_value = weight / ((height / 100) ** 2)
-        st.success(f"Calculated BMI: {bmi_value:.2f}")
-        BMI = float(f"{bmi_value:.2f}")
+    st.markdown("### 🧮 BMI Calculator (Optional)")
+    with st.form("bmi_form", border=False):
+        bmi_col1, bmi_col2 = st.columns(2)
 
-    diab_diagnosis = ""
-    diab_is_disease = False
-    diab_tips = []
+        with bmi_col1:
+            st.number_input(
+                "Height (cm)",
+                min_value=100,
+                max_value=230,
+                value=170,
+                key="bmi_height",
+            )
+            # button directly under Height, left side
+            st.form_submit_button("Calculate BMI", on_click=apply_bmi)
+        with bmi_col2:
+            st.number_input(
+                "Weight (kg)",
+                min_value=20,
+                max_value=200,
+                value=60,
+                key="bmi_weight",
+            )
 
-    # center Get Result button, very slight shift to the right
-    d1, d2, d3 = st.columns([1, 1, 0.8])
-    with d2:
-        diab_btn = st.button("🔍 Get Diabetes Test Result")
+    if "bmi_message" in st.session_state:
+        st.success(st.session_state.pop("bmi_message"))
 
     if diab_btn:
-        user_input = [
-            Glucose,
-            BMI,
-            Age,
-            DiabetesPedigreeFunction,
-            Insulin,
-            BloodPressure,
-        ]
+        with stages["encode"].time():
+            # widget labels become model codes here, as for an API record
+            user_input = encode_record(
+                "diabetes",
+                [
+                    Glucose,
+                    BMI,
+                    Age,
+                    FamilyHistory,
+                    Insulin,
+                    BloodPressure,
+                ],
+            )
 
-        diab_prediction = diabetes_model.predict([user_input])
-        diab_is_disease = diab_prediction[0] == 1
+        st.session_state["diabetes_whatif_row"] = user_input
+        with stages["predict"].time():
+            diab_prediction = predict_one("diabetes", user_input)
+        diab_is_disease = diab_prediction == 1
 
         if diab_is_disease:
             diab_diagnosis = (
@@ -266,10 +431,16 @@ if selected == "Diabetes Prediction":
             ]
 
     if diab_diagnosis:
-        show_result(diab_diagnosis, diab_is_disease)
-        st.markdown("#### 🩺 Health Tips")
-        for tip in diab_tips:
-            st.markdown(f"- ✔ {tip}")
+        with stages["render"].time():
+            show_result(diab_diagnosis, diab_is_disease)
+            show_explanation("diabetes", user_input)
+            st.markdown("#### 🩺 Health Tips")
+            for tip in diab_tips:
+                st.markdown(f"- ✔ {tip}")
+
+    # stays available while the inputs are nudged, until the next result
+    with stages["render"].time():
+        show_what_if("diabetes")
 
 
 # ===================== HEART DISEASE PREDICTION PAGE =====================
@@ -277,7 +448,12 @@ if selected == "Heart Disease Prediction":
 
     st.title("❤️ Heart Disease Prediction")
 
-    with st.container():
+    heart_diagnosis = ""
+    heart_is_disease = False
+    heart_tips = []
+
+    # inputs are sent together on submit, so editing them does not rerun the script
+    with st.form("heart_form", border=False):
         col1, col2, col3 = st.columns(3)
 
         # [age, sex, cp, trestbps, chol, thalach, exang, oldpeak, slope, thal]
@@ -295,25 +471,12 @@ if selected == "Heart Disease Prediction":
                 "Gender",
                 ("Male", "Female"),
             )
-            sex = 1 if sex_label == "Male" else 0
 
         with col3:
             cp_label = st.selectbox(
                 "Type of chest discomfort",
-                (
-                    "Typical angina",
-                    "Atypical angina",
-                    "Non-anginal pain",
-                    "Asymptomatic",
-                ),
-            )
-            cp_map = {
-                "Typical angina": 0,
-                "Atypical angina": 1,
-                "Non-anginal pain": 2,
-                "Asymptomatic": 3,
-            }
-            cp = cp_map[cp_label]
+                tuple(CP_MAP),
+            )
 
         with col1:
             trestbps = st.number_input(
@@ -344,7 +507,6 @@ if selected == "Heart Disease Prediction":
                 "Chest pain during exercise (Yes/No)",
                 ("No", "Yes"),
             )
-            exang = 1 if exang_label == "Yes" else 0
 
         with col2:
             oldpeak = st.number_input(
@@ -358,52 +520,42 @@ if selected == "Heart Disease Prediction":
         with col3:
             slope_label = st.selectbox(
                 "ECG pattern during exercise",
-                ("Upsloping", "Flat", "Downsloping"),
+                tuple(SLOPE_MAP),
             )
-            slope_map = {
-                "Upsloping": 0,
-                "Flat": 1,
-                "Downsloping": 2,
-            }
-            slope = slope_map[slope_label]
 
         col4, _, _ = st.columns(3)
         with col4:
             thal_label = st.selectbox(
                 "Heart blood flow test result (Thallium scan)",
-                ("Normal", "Fixed defect", "Reversible defect"),
+                tuple(THAL_MAP),
             )
-            thal_map = {
-                "Normal": 0,
-                "Fixed defect": 1,
-                "Reversible defect": 2,
-            }
-            thal = thal_map[thal_label]
-
-    heart_diagnosis = ""
-    heart_is_disease = False
-    heart_tips = []
 
-    h1, h2, h3 = st.columns([1, 1, 0.8])
-    with h2:
-        heart_btn = st.button("🔍 Get Heart Disease Test Result")
+        h1, h2, h3 = st.columns([1, 1, 0.8])
+        with h2:
+            heart_btn = st.form_submit_button("🔍 Get Heart Disease Test Result")
 
     if heart_btn:
-        user_input = [
-            age,
-            sex,
-            cp,
-            trestbps,
-            chol,
-            thalach,
-            exang,
-            oldpeak,
-            slope,
-            thal,
-        ]
+        with stages["encode"].time():
+            user_input = encode_record(
+                "heart",
+                [
+                    age,
+                    sex_label,
+                    cp_label,
+                    trestbps,
+                    chol,
+                    thalach,
+                    exang_label,
+                    oldpeak,
+                    slope_label,
+                    thal_label,
+                ],
+            )
 
-        heart_prediction = heart_disease_model.predict([user_input])
-        heart_is_disease = heart_prediction[0] == 1
+        st.session_state["heart_whatif_row"] = user_input
+        with stages["predict"].time():
+            heart_prediction = predict_one("heart", user_input)
+        heart_is_disease = heart_prediction == 1
 
         if heart_is_disease:
             heart_diagnosis = (
@@ -429,10 +581,16 @@ if selected == "Heart Disease Prediction":
             ]
 
     if heart_diagnosis:
-        show_result(heart_diagnosis, heart_is_disease)
-        st.markdown("#### 🫀 Heart Health Tips")
-        for tip in heart_tips:
-            st.markdown(f"- ✔ {tip}")
+        with stages["render"].time():
+            show_result(heart_diagnosis, heart_is_disease)
+            show_explanation("heart", user_input)
+            st.markdown("#### 🫀 Heart Health Tips")
+            for tip in heart_tips:
+                st.markdown(f"- ✔ {tip}")
+
+    # stays available while the inputs are nudged, until the next result
+    with stages["render"].time():
+        show_what_if("heart")
 
 
 # ===================== PARKINSON'S PREDICTION PAGE =====================
@@ -440,7 +598,12 @@ if selected == "Parkinsons Prediction":
 
     st.title("🧠 Parkinson's Disease Prediction")
 
-    with st.container():
+    parkinsons_diagnosis = ""
+    park_is_disease = False
+    park_tips = []
+
+    # inputs are sent together on submit, so editing them does not rerun the script
+    with st.form("parkinsons_form", border=False):
         col1, col2, col3 = st.columns(3)
 
         with col1:
@@ -508,28 +671,30 @@ if selected == "Parkinsons Prediction":
                 step=0.01,
             )
 
-    parkinsons_diagnosis = ""
-    park_is_disease = False
-    park_tips = []
-
-    p1, p2, p3 = st.columns([1, 1, 0.8])
-    with p2:
-        park_btn = st.button("🔍 Get Parkinson's Test Result")
+        p1, p2, p3 = st.columns([1, 1, 0.8])
+        with p2:
+            park_btn = st.form_submit_button("🔍 Get Parkinson's Test Result")
 
     if park_btn:
-        user_input = [
-            Fo,
-            Fhi,
-            Flo,
-            Jitter_percent,
-            Shimmer,
-            HNR,
-            RPDE,
-            DFA,
-        ]
+        with stages["encode"].time():
+            user_input = encode_record(
+                "parkinsons",
+                [
+                    Fo,
+                    Fhi,
+                    Flo,
+                    Jitter_percent,
+                    Shimmer,
+                    HNR,
+                    RPDE,
+                    DFA,
+                ],
+            )
 
-        parkinsons_prediction = parkinsons_model.predict([user_input])
-        park_is_disease = parkinsons_prediction[0] == 1
+        st.session_state["parkinsons_whatif_row"] = user_input
+        with stages["predict"].time():
+            parkinsons_prediction = predict_one("parkinsons", user_input)
+        park_is_disease = parkinsons_prediction == 1
 
         if park_is_disease:
             parkinsons_diagnosis = (
@@ -555,10 +720,16 @@ if selected == "Parkinsons Prediction":
             ]
 
     if parkinsons_diagnosis:
-        show_result(parkinsons_diagnosis, park_is_disease)
-        st.markdown("#### 🧠 Brain & Movement Health Tips")
-        for tip in park_tips:
-            st.markdown(f"- ✔ {tip}")
+        with stages["render"].time():
+            show_result(parkinsons_diagnosis, park_is_disease)
+            show_explanation("parkinsons", user_input)
+            st.markdown("#### 🧠 Brain & Movement Health Tips")
+            for tip in park_tips:
+                st.markdown(f"- ✔ {tip}")
+
+    # stays available while the inputs are nudged, until the next result
+    with stages["render"].time():
+        show_what_if("parkinsons")
 
 
 # ===================== KIDNEY DISEASE PREDICTION PAGE =====================
@@ -566,7 +737,12 @@ if selected == "Kidney Disease Prediction":
 
     st.title("💧 Kidney Disease Prediction")
 
-    with st.container():
+    kidney_diagnosis = ""
+    kidney_is_disease = False
+    kidney_tips = []
+
+    # inputs are sent together on submit, so editing them does not rerun the script
+    with st.form("kidney_form", border=False):
         # Row 1
         r1c1, r1c2, r1c3 = st.columns(3)
         with r1c1:
@@ -649,46 +825,45 @@ if selected == "Kidney Disease Prediction":
                 "Hypertension (High Blood Pressure)",
                 ("No", "Yes"),
             )
-            k_htn = 1 if k_htn_label == "Yes" else 0
         with r4c2:
             k_dm_label = st.radio(
                 "Diabetes",
                 ("No", "Yes"),
             )
-            k_dm = 1 if k_dm_label == "Yes" else 0
         with r4c3:
             k_ane_label = st.radio(
                 "Anemia",
                 ("No", "Yes"),
             )
-            k_ane = 1 if k_ane_label == "Yes" else 0
-
-    kidney_diagnosis = ""
-    kidney_is_disease = False
-    kidney_tips = []
 
-    k1, k2, k3 = st.columns([1, 1, 0.8])
-    with k2:
-        kidney_btn = st.button("🔍 Get Kidney Disease Test Result")
+        k1, k2, k3 = st.columns([1, 1, 0.8])
+        with k2:
+            kidney_btn = st.form_submit_button("🔍 Get Kidney Disease Test Result")
 
     if kidney_btn:
-        kidney_input = [
-            k_age,
-            k_bp,
-            k_sg,
-            k_al,
-            k_bgr,
-            k_bu,
-            k_sc,
-            k_hemo,
-            k_wc,
-            k_htn,
-            k_dm,
-            k_ane,
-        ]
+        with stages["encode"].time():
+            kidney_input = encode_record(
+                "kidney",
+                [
+                    k_age,
+                    k_bp,
+                    k_sg,
+                    k_al,
+                    k_bgr,
+                    k_bu,
+                    k_sc,
+                    k_hemo,
+                    k_wc,
+                    k_htn_label,
+                    k_dm_label,
+                    k_ane_label,
+                ],
+            )
 
-        kidney_prediction = kidney_model.predict([kidney_input])
-        kidney_is_disease = kidney_prediction[0] == 1
+        st.session_state["kidney_whatif_row"] = kidney_input
+        with stages["predict"].time():
+            kidney_prediction = predict_one("kidney", kidney_input)
+        kidney_is_disease = kidney_prediction == 1
 
         if kidney_is_disease:
             kidney_diagnosis = (
@@ -714,10 +889,331 @@ if selected == "Kidney Disease Prediction":
             ]
 
     if kidney_diagnosis:
-        show_result(kidney_diagnosis, kidney_is_disease)
-        st.markdown("#### 💧 Kidney Health Tips")
-        for tip in kidney_tips:
-            st.markdown(f"- ✔ {tip}")
+        with stages["render"].time():
+            show_result(kidney_diagnosis, kidney_is_disease)
+            show_explanation("kidney", kidney_input)
+            st.markdown("#### 💧 Kidney Health Tips")
+            for tip in kidney_tips:
+                st.markdown(f"- ✔ {tip}")
+
+    # stays available while the inputs are nudged, until the next result
+    with stages["render"].time():
+        show_what_if("kidney")
+
+
+# ===================== FULL SCREENING PAGE =====================
+if selected == "Full Screening":
+
+    st.title("🩺 Full Screening")
+    st.write(
+        "Enter one patient's details once and check all four conditions together. "
+        "Shared values such as age and blood pressure are used by every model that needs them."
+    )
+
+    # one submit for the whole profile instead of a rerun per edited input
+    with st.form("full_screening_form", border=False):
+        st.markdown("### 👤 Shared Profile")
+        s1, s2, s3 = st.columns(3)
+        with s1:
+            fs_age = st.number_input("Age (years) — 1 to 100", min_value=1, max_value=100, value=40, key="fs_age")
+            fs_diabetic = st.radio("Known diabetes", ("No", "Yes"), key="fs_diabetic")
+        with s2:
+            fs_dbp = st.number_input(
+                "Diastolic blood pressure (mm Hg) — 24 to 200",
+                min_value=24,
+                max_value=200,
+                value=80,
+                key="fs_dbp",
+            )
+            fs_family = st.radio("Family history of diabetes", ("No", "Yes"), key="fs_family")
+        with s3:
+            fs_glucose = st.number_input(
+                "Blood glucose (mg/dL) — 40 to 500",
+                min_value=40,
+                max_value=500,
+                value=120,
+                key="fs_glucose",
+            )
+            fs_sex = st.radio("Gender", ("Male", "Female"), key="fs_sex")
+
+        with st.expander("🩸 Diabetes details", expanded=True):
+            f1, f2 = st.columns(2)
+            with f1:
+                fs_bmi = st.number_input("BMI value (18 – 67 kg/m²)", min_value=18.0, max_value=67.0, key="fs_bmi")
+            with f2:
+                fs_insulin = st.number_input(
+                    "Insulin Level (15 – 276 µU/mL)", min_value=15, max_value=276, key="fs_insulin"
+                )
+
+        with st.expander("❤️ Heart details", expanded=True):
+            f1, f2, f3 = st.columns(3)
+            with f1:
+                fs_cp = st.selectbox("Type of chest discomfort", tuple(CP_MAP), key="fs_cp")
+                fs_thalach = st.number_input(
+                    "Highest heart rate during exercise (bpm) — 60 to 220",
+                    min_value=60,
+                    max_value=220,
+                    value=150,
+                    key="fs_thalach",
+                )
+                fs_slope = st.selectbox("ECG pattern during exercise", tuple(SLOPE_MAP), key="fs_slope")
+            with f2:
+                fs_trestbps = st.number_input(
+                    "Systolic blood pressure (resting, mm Hg) — 80 to 220",
+                    min_value=80,
+                    max_value=220,
+                    value=120,
+                    key="fs_trestbps",
+                )
+                fs_exang = st.radio("Chest pain during exercise (Yes/No)", ("No", "Yes"), key="fs_exang")
+                fs_thal = st.selectbox("Heart blood flow test result (Thallium scan)", tuple(THAL_MAP), key="fs_thal")
+            with f3:
+                fs_chol = st.number_input(
+                    "Cholesterol level (mg/dL) — 100 to 600",
+                    min_value=100,
+                    max_value=600,
+                    value=200,
+                    key="fs_chol",
+                )
+                fs_oldpeak = st.number_input(
+                    "ECG value change after exercise — 0.0 to 6.5",
+                    min_value=0.0,
+                    max_value=6.5,
+                    value=1.0,
+                    step=0.1,
+                    key="fs_oldpeak",
+                )
+
+        with st.expander("🧠 Parkinson's voice measurements", expanded=True):
+            f1, f2, f3 = st.columns(3)
+            with f1:
+                fs_fo = st.number_input(
+                    "Average vocal frequency (Hz) — 70 to 300", min_value=70.0, max_value=300.0, step=0.1, key="fs_fo"
+                )
+                fs_jitter = st.number_input(
+                    "Pitch variation (%) — 0.001 to 0.03",
+                    min_value=0.001,
+                    max_value=0.03,
+                    step=0.001,
+                    format="%.4f",
+                    key="fs_jitter",
+                )
+                fs_rpde = st.number_input(
+                    "Voice pattern recurrence score — 0.1 to 1.0", min_value=0.1, max_value=1.0, step=0.01, key="fs_rpde"
+                )
+            with f2:
+                fs_fhi = st.number_input(
+                    "Highest vocal frequency (Hz) — 80 to 600", min_value=80.0, max_value=600.0, step=0.1, key="fs_fhi"
+                )
+                fs_shimmer = st.number_input(
+                    "Voice amplitude variation — 0.01 to 0.2", min_value=0.01, max_value=0.2, step=0.001, key="fs_shimmer"
+                )
+                fs_dfa = st.number_input(
+                    "Signal stability index — 0.4 to 1.5", min_value=0.4, max_value=1.5, step=0.01, key="fs_dfa"
+                )
+            with f3:
+                fs_flo = st.number_input(
+                    "Lowest vocal frequency (Hz) — 50 to 260", min_value=50.0, max_value=260.0, step=0.1, key="fs_flo"
+                )
+                fs_hnr = st.number_input(
+                    "Harmonics-to-noise ratio (HNR) — 5 to 45", min_value=5.0, max_value=45.0, step=0.1, key="fs_hnr"
+                )
+
+        with st.expander("💧 Kidney details", expanded=True):
+            f1, f2, f3 = st.columns(3)
+            with f1:
+                fs_sg = st.number_input(
+                    "Urine Specific Gravity — 1.005 to 1.025",
+                    min_value=1.005,
+                    max_value=1.025,
+                    value=1.015,
+                    step=0.001,
+                    format="%.3f",
+                    key="fs_sg",
+                )
+                fs_sc = st.number_input(
+                    "Serum Creatinine (mg/dL) — 0.4 to 15", min_value=0.4, max_value=15.0, value=1.2, key="fs_sc"
+                )
+                fs_htn = st.radio("Hypertension (High Blood Pressure)", ("No", "Yes"), key="fs_htn")
+            with f2:
+                fs_al = st.number_input(
+                    "Urine Albumin Level — 0 to 5", min_value=0.0, max_value=5.0, value=1.0, step=1.0, key="fs_al"
+                )
+                fs_hemo = st.number_input(
+                    "Hemoglobin (g/dL) — 3 to 20", min_value=3.0, max_value=20.0, value=13.0, key="fs_hemo"
+                )
+                fs_ane = st.radio("Anemia", ("No", "Yes"), key="fs_ane")
+            with f3:
+                fs_bu = st.number_input(
+                    "Blood Urea (mg/dL) — 1 to 400", min_value=1.0, max_value=400.0, value=40.0, key="fs_bu"
+                )
+                fs_wc = st.number_input(
+                    "White Blood Cell Count (cells/mm³) — 2000 to 25000",
+                    min_value=2000,
+                    max_value=25000,
+                    value=8000,
+                    key="fs_wc",
+                )
+
+        fs1, fs2, fs3 = st.columns([1, 1, 0.8])
+        with fs2:
+            fs_btn = st.form_submit_button("🔍 Get Full Screening Result")
+
+    if fs_btn:
+        # the models' own widget ranges are narrower in places; shared values are clamped to them
+        from smart_health.screening import build_inputs, screen
+
+        with stages["encode"].time():
+            screening_inputs, adjustments = build_inputs(
+                {
+                    "age": fs_age,
+                    "diastolic_bp": fs_dbp,
+                    "glucose": fs_glucose,
+                    "diabetic": YES_NO[fs_diabetic],
+                },
+                {
+                    "diabetes": {
+                        "BMI": fs_bmi,
+                        "DiabetesPedigreeFunction": FAMILY_HISTORY_DPF[fs_family],
+                        "Insulin": fs_insulin,
+                    },
+                    "heart": {
+                        "sex": SEX_MAP[fs_sex],
+                        "cp": CP_MAP[fs_cp],
+                        "trestbps": fs_trestbps,
+                        "chol": fs_chol,
+                        "thalach": fs_thalach,
+                        "exang": YES_NO[fs_exang],
+                        "oldpeak": fs_oldpeak,
+                        "slope": SLOPE_MAP[fs_slope],
+                        "thal": THAL_MAP[fs_thal],
+                    },
+                    "parkinsons": {
+                        "MDVP:Fo(Hz)": fs_fo,
+                        "MDVP:Fhi(Hz)": fs_fhi,
+                        "MDVP:Flo(Hz)": fs_flo,
+                        "MDVP:Jitter(%)": fs_jitter,
+                        "MDVP:Shimmer": fs_shimmer,
+                        "HNR": fs_hnr,
+                        "RPDE": fs_rpde,
+                        "DFA": fs_dfa,
+                    },
+                    "kidney": {
+                        "sg": fs_sg,
+                        "al": fs_al,
+                        "bu": fs_bu,
+                        "sc": fs_sc,
+                        "hemo": fs_hemo,
+                        "wc": fs_wc,
+                        "htn": YES_NO[fs_htn],
+                        "ane": YES_NO[fs_ane],
+                    },
+                },
+            )
+
+        with stages["predict"].time():
+            screening = screen(screening_inputs)
+
+        with stages["render"].time():
+            st.markdown("### 📋 Screening Results")
+            if adjustments:
+                st.warning(
+                    "Some values are outside what a model accepts and were scored at its nearest limit: "
+                    + "; ".join(
+                        f"{a.feature} {a.given:g} → {a.used:g} for the {MODEL_SPECS[a.model].title} model"
+                        for a in adjustments
+                    )
+                    + "."
+                )
+            result_cols = st.columns(2)
+            for index, (key, label) in enumerate(screening.labels.items()):
+                title = MODEL_SPECS[key].title
+                with result_cols[index % 2]:
+                    if label == 1:
+                        show_result(f"Signs of {title} — please consult a doctor.", True)
+                    else:
+                        show_result(f"No signs of {title}.", False)
+                    show_explanation(key, screening_inputs[key], top=3)
+            st.caption(
+                f"All four models scored in {screening.total_seconds * 1000:.0f} ms; "
+                f"the slowest model answered after {max(screening.seconds.values()) * 1000:.0f} ms."
+            )
+
+
+# ===================== BATCH SCREENING PAGE =====================
+if selected == "Batch Screening":
+
+    st.title("📑 Batch Screening")
+    st.write("Upload a CSV file with one patient per row to screen a whole spreadsheet at once.")
+
+    # label -> key, like the other selectboxes (AppTest cannot drive format_func options)
+    batch_models = {spec.title: key for key, spec in MODEL_SPECS.items()}
+    batch_key = batch_models[st.selectbox("Disease model", tuple(batch_models))]
+    st.caption("Expected columns: " + ", ".join(MODEL_SPECS[batch_key].features))
+    uploaded = st.file_uploader(
+        "Patient CSV file",
+        type="csv",
+        help="Up to 50 MB. Larger files: python -m smart_health.bulk_score",
+    )
+    too_large = False
+    if uploaded is not None:
+        from smart_health.batch import MAX_UPLOAD_BYTES
+
+        # the upload and its result are both held in memory until the session ends
+        too_large = uploaded.size > MAX_UPLOAD_BYTES
+        if too_large:
+            st.error(
+                f"The file is {uploaded.size / 2**20:.0f} MB; this page takes up to "
+                f"{MAX_UPLOAD_BYTES >> 20} MB. Score larger files with "
+                f"`python -m smart_health.bulk_score {batch_key} <file> --output <dir>`."
+            )
+
+    b1, b2, b3 = st.columns([1, 1, 0.8])
+    with b2:
+        batch_btn = st.button("🔍 Screen Uploaded File", disabled=uploaded is None or too_large)
+
+    if batch_btn and uploaded is not None and not too_large:
+        # pandas is only needed here; importing it lazily keeps it off the startup path
+        from smart_health.batch import score_csv
+        from smart_health.registry import bulk_model
+
+        progress = st.progress(0.0, text="Scoring rows...")
+        # the model scored with and the version its audit rows name come from one snapshot
+        batch_active = registry.active(batch_key)
+        # scored chunks go to disk; only the finished file is read back once
+        with tempfile.TemporaryFile() as result_file:
+            try:
+                summary = score_csv(
+                    uploaded,
+                    batch_key,
+                    bulk_model(batch_active),
+                    result_file,
+                    on_progress=lambda done: progress.progress(done, text="Scoring rows..."),
+                    on_scored=lambda rows, labels: record_scored(batch_key, rows, labels, batch_active.version),
+                )
+            except ValueError as exc:
+                progress.empty()
+                st.error(str(exc))
+            else:
+                progress.progress(1.0, text="Done")
+                st.success(
+                    f"Scored {summary.scored:,} of {summary.rows:,} rows in {summary.seconds:.1f} s, "
+                    f"{summary.positives:,} flagged for {MODEL_SPECS[batch_key].title}."
+                )
+                if summary.skipped:
+                    st.warning(
+                        f"{summary.skipped:,} rows had missing or unreadable values and were left unscored."
+                    )
+                # download_button reads a BufferedReader (not the BufferedRandom TemporaryFile
+                # returns) into its in-memory media store; our copy stays on disk
+                result_file.flush()
+                with open(result_file.fileno(), "rb", closefd=False) as result_reader:
+                    st.download_button(
+                        "⬇️ Download Results",
+                        data=result_reader,
+                        file_name=f"{batch_key}_screening_results.csv",
+                        mime="text/csv",
+                    )
 
 
 # ---------- Global doctor note at bottom ----------
@@ -729,3 +1225,5 @@ st.markdown(
     "</p>",
     unsafe_allow_html=True,
 )
+
+stages["script"].observe_since(script_start)
@@ -0,0 +1,65 @@
+"""Benchmark FlatForest against ``RandomForestClassifier.predict``.
+
+Rows are resampled from each model's training CSV.  Every timed batch is also
+checked for identical predictions.
+
+    python benchmarks/bench_forest.py [--repeat 5] [--sizes 1 100 100000]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smart_health.datasets import load_dataset  # noqa: E402
+from smart_health.forest import FlatForest  # noqa: E402
+from smart_health.registry import get_registry  # noqa: E402
+
+FOREST_KEYS = ("heart", "parkinsons", "kidney")
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    registry = get_registry()
+    rng = np.random.default_rng(0)
+
+    print(f"{'model':<11}{'rows':>8}{'sklearn ms':>13}{'flat ms':>11}{'speedup':>9}  parity")
+    for key in FOREST_KEYS:
+        model = registry.get(key)
+        flat = FlatForest.from_sklearn(model)
+        X, _ = load_dataset(key)
+        X = X.to_numpy(dtype=np.float64)
+
+        for size in args.sizes:
+            batch = X[rng.integers(0, len(X), size)]
+            # large batches are slow under sklearn; one run is enough there
+            repeat = args.repeat if size <= 1000 else 1
+            sk_time = best_of(lambda: model.predict(batch), repeat)
+            flat_time = best_of(lambda: flat.predict(batch), repeat)
+            parity = np.array_equal(model.predict(batch), flat.predict(batch))
+            print(
+                f"{key:<11}{size:>8}{sk_time * 1000:>13.3f}{flat_time * 1000:>11.3f}"
+                f"{sk_time / flat_time:>8.1f}x  {'ok' if parity else 'MISMATCH'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Load test for the prediction API (``python -m smart_health.api``).
+
+Opens ``--connections`` keep-alive connections, each sending single-record
+``POST /predict/<model>`` requests back to back for ``--duration`` seconds,
+and reports throughput and latency percentiles.  Records are the notebook
+sample rows.
+
+    python benchmarks/load_test_api.py --spawn --model heart --connections 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from smart_health.specs import SAMPLE_ROWS  # noqa: E402
+
+SAMPLE_RECORDS = {key: list(row) for key, row in SAMPLE_ROWS.items()}
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def client(host, port, request: bytes, deadline: float, latencies: list, errors: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if b" 200 " not in status_line:
+                errors.append(status_line)
+    finally:
+        writer.close()
+
+
+async def run(args) -> dict:
+    body = json.dumps(SAMPLE_RECORDS[args.model]).encode()
+    request = (
+        f"POST /predict/{args.model} HTTP/1.1\r\nHost: {args.host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+
+    # one warm-up request so the model load is not timed
+    await client(args.host, args.port, request, time.perf_counter() + 0.2, [], [])
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(
+        *(client(args.host, args.port, request, deadline, latencies, errors) for _ in range(args.connections))
+    )
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "model": args.model,
+        "connections": args.connections,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def wait_for_server(host: str, port: int, timeout: float = 60.0):
+    import socket
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"API did not start on {host}:{port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", choices=sorted(SAMPLE_RECORDS), default="heart")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--spawn", action="store_true", help="start the API in a subprocess")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen(
+            [sys.executable, "-W", "ignore", "-m", "smart_health.api", "--host", args.host, "--port", str(args.port)],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        wait_for_server(args.host, args.port)
+        result = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for name, value in result.items():
+            print(f"{name:<20} {value:.2f}" if isinstance(value, float) else f"{name:<20} {value}")
+
+
+if __name__ == "__main__":
+    main()
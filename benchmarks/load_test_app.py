@@ -0,0 +1,192 @@
+"""Offline load test for the Streamlit app: N simulated sessions in one process.
+
+Each session is a ``streamlit.testing.v1.AppTest`` of the real ``app.py``.
+All sessions share this process and its module-level state (models, cache,
+micro-batchers), as sessions share a ``streamlit run`` server process.  A
+session loops over the disease pages and Full Screening: it switches page
+through ``option_menu``, fills every number input with a random value in its
+range and presses the page's result button.  Every script run is timed.
+
+Concurrency ramps through ``--sessions`` (each level runs ``--duration``
+seconds); each level reports reruns per second, p50/p95/p99 rerun latency,
+process CPU (100% is one core busy) and RSS.
+
+    python benchmarks/load_test_app.py --sessions 1 2 4 8 --duration 20
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from load_test_api import percentile  # noqa: E402
+from run import rss_bytes  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+
+PAGES = (
+    "Diabetes Prediction",
+    "Heart Disease Prediction",
+    "Parkinsons Prediction",
+    "Kidney Disease Prediction",
+    "Full Screening",
+)
+
+# session_state key the patched option_menu reads, so each session has its own page
+PAGE_KEY = "_load_test_page"
+
+
+def option_menu(*_, options=None, **__):
+    import streamlit as st
+
+    page = st.session_state.get(PAGE_KEY)
+    return page if page in options else options[0]
+
+
+def share_runtime():
+    """Keep one mock ``Runtime`` for every session, as one server has one.
+
+    ``AppTest`` installs a fresh mock as the global ``Runtime`` before each
+    run and clears it afterwards, so a session finishing while another runs
+    would pull the runtime from under it.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: shared)
+    Runtime.exists = classmethod(lambda cls: True)
+
+
+def fill_inputs(at, rng: random.Random):
+    for widget in at.number_input:
+        low, high = widget.min, widget.max
+        if isinstance(widget.value, int):
+            widget.set_value(rng.randint(int(low), int(high)))
+        else:
+            widget.set_value(round(rng.uniform(low, high), 3))
+
+
+def visit(at, page: str, rng: random.Random, latencies: list):
+    """Open ``page``, fill its inputs and press its result button: two timed runs."""
+    at.session_state[PAGE_KEY] = page
+    start = time.perf_counter()
+    at.run()
+    latencies.append(time.perf_counter() - start)
+    fill_inputs(at, rng)
+    buttons = [button for button in at.button if "Result" in button.label]
+    if not buttons:
+        raise RuntimeError(f"{page}: the run rendered no result button")
+    button = buttons[0]
+    start = time.perf_counter()
+    button.click().run()
+    latencies.append(time.perf_counter() - start)
+
+
+def session(index: int, deadline: float, timeout: float, latencies: list, errors: list):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(index)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    page = index
+    while time.perf_counter() < deadline:
+        try:
+            visit(at, PAGES[page % len(PAGES)], rng, latencies)
+        except Exception as exc:  # a timed-out or failed run counts; the session goes on
+            errors.append(repr(exc))
+        else:
+            if at.exception:
+                errors.append(str(at.exception[0].message))
+        page += 1
+
+
+def run_level(sessions: int, duration: float, timeout: float) -> dict:
+    latencies, errors = [], []
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [
+        threading.Thread(target=session, args=(index, deadline, timeout, latencies, errors), daemon=True)
+        for index in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    latencies.sort()
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "errors": len(errors),
+        "reruns_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "cpu_percent": cpu / elapsed * 100,
+        "rss_mb": rss_bytes() / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8], help="concurrency levels")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds one script run may take")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    # set_value from a session thread warns that it has no script context
+    logging.getLogger("streamlit.runtime.scriptrunner.script_run_context").addFilter(
+        lambda record: "missing ScriptRunContext" not in record.getMessage()
+    )
+    # models load in the warm-up run below, not in a thread racing the first level
+    os.environ["SMART_HEALTH_WARMUP"] = "0"
+    os.environ["SMART_HEALTH_AUDIT_DIR"] = tempfile.mkdtemp(prefix="smart-health-audit-")
+
+    import streamlit_option_menu
+
+    # app.py imports option_menu from the module on every run
+    streamlit_option_menu.option_menu = option_menu
+    share_runtime()
+    from streamlit.testing.v1 import AppTest
+
+    # one untimed pass over every page loads the models and imports
+    at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    for page in PAGES:
+        visit(at, page, random.Random(0), [])
+
+    results = []
+    for sessions in args.sessions:
+        print(f"running {sessions} sessions...", file=sys.stderr)
+        results.append(run_level(sessions, args.duration, args.timeout))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'sessions':>8}{'reruns':>8}{'errors':>7}{'reruns/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'cpu %':>7}{'rss MB':>8}")
+    for r in results:
+        print(
+            f"{r['sessions']:>8}{r['reruns']:>8}{r['errors']:>7}{r['reruns_per_second']:>10.1f}"
+            f"{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}{r['p99_ms']:>9.0f}{r['cpu_percent']:>7.0f}{r['rss_mb']:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
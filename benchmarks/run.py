@@ -0,0 +1,292 @@
+"""Reproducible, offline benchmark suite with JSON output and baseline comparison.
+
+Sections:
+
+* ``memory``: process RSS and per-model footprint after loading every model.
+* ``inference``: single-row latency on the notebook sample rows through
+  ``predict_one`` (the cache and micro-batcher path the app uses, both a
+  cache miss and a hit), the bare serving predictor and the original sklearn
+  estimator, and per-row cost of batched predicts on rows drawn from the
+  training CSVs.
+* ``batch``: ``score_csv`` throughput on a synthetic upload.
+* ``reruns``: cost of a full Streamlit script rerun per page (and of a
+  predict-button click), via ``streamlit.testing.v1.AppTest``.
+* ``audit``: ``predict_one`` and a predict-button click with the audit log
+  off and on, and how long the writer takes to drain what they queued.
+
+Every metric is "lower is better".
+
+    python benchmarks/run.py --output baseline.json
+    python benchmarks/run.py --compare baseline.json [--threshold 0.10] [--fail-on-regression]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from smart_health.datasets import load_dataset  # noqa: E402
+from smart_health.registry import estimate_footprint, get_registry  # noqa: E402
+from smart_health.specs import MODEL_SPECS, SAMPLE_ROWS  # noqa: E402
+
+SECTIONS = ("memory", "inference", "batch", "reruns", "audit")
+BATCH_SIZES = (100, 10_000)
+
+
+def timings(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarise(prefix: str, samples: list, scale: float = 1000.0) -> dict:
+    """Median and p95 of ``samples`` (seconds), scaled to ms by default."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    return {
+        f"{prefix}.p50_ms": statistics.median(ordered) * scale,
+        f"{prefix}.p95_ms": p95 * scale,
+    }
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS; peak rather than current
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def bench_memory(args) -> dict:
+    registry = get_registry()
+    before = rss_bytes()
+    metrics = {}
+    for key in MODEL_SPECS:
+        metrics[f"memory.{key}.predictor_bytes"] = estimate_footprint(registry.predictor(key))
+    metrics["memory.rss_after_predictors_bytes"] = rss_bytes()
+    for key in MODEL_SPECS:
+        metrics[f"memory.{key}.sklearn_bytes"] = estimate_footprint(registry.get(key))
+    metrics["memory.rss_after_all_models_bytes"] = rss_bytes()
+    metrics["memory.rss_growth_bytes"] = metrics["memory.rss_after_all_models_bytes"] - before
+    return metrics
+
+
+def bench_inference(args) -> dict:
+    from smart_health.cache import get_cache
+    from smart_health.inference import predict_one
+
+    registry = get_registry()
+    cache = get_cache()
+    rng = np.random.default_rng(0)
+    metrics = {}
+    for key in MODEL_SPECS:
+        predictor = registry.predictor(key)
+        model = registry.get(key)
+        row = [float(value) for value in SAMPLE_ROWS[key]]
+        array_row = np.array([row])
+
+        def miss():
+            cache.clear(key)
+            predict_one(key, row)
+
+        predict_one(key, row)
+        metrics.update(summarise(f"inference.{key}.single_row", timings(miss, args.repeat)))
+        metrics.update(
+            summarise(f"inference.{key}.single_row_cached", timings(lambda: predict_one(key, row), args.repeat))
+        )
+        metrics.update(
+            summarise(f"inference.{key}.single_row_predictor", timings(lambda: predictor.predict([row]), args.repeat))
+        )
+        sk_repeat = max(1, args.repeat // 10)
+        metrics.update(
+            summarise(f"inference.{key}.single_row_sklearn", timings(lambda: model.predict(array_row), sk_repeat))
+        )
+
+        X, _ = load_dataset(key)
+        X = X.to_numpy(dtype=np.float64)
+        for size in BATCH_SIZES:
+            batch = X[rng.integers(0, len(X), size)]
+            best = min(timings(lambda: predictor.predict(batch), 5))
+            metrics[f"inference.{key}.batch_{size}.us_per_row"] = best / size * 1e6
+    return metrics
+
+
+def bench_batch(args) -> dict:
+    from smart_health.batch import score_csv
+    from smart_health.registry import bulk_model
+
+    registry = get_registry()
+    metrics = {}
+    for key in MODEL_SPECS:
+        X, _ = load_dataset(key)
+        rows = X.sample(args.batch_rows, replace=True, random_state=0)
+        source = io.BytesIO(rows.to_csv(index=False).encode())
+        model = bulk_model(registry.active(key))
+        start = time.perf_counter()
+        score_csv(source, key, model, io.BytesIO())
+        elapsed = time.perf_counter() - start
+        metrics[f"batch.{key}.score_csv_us_per_row"] = elapsed / args.batch_rows * 1e6
+    return metrics
+
+
+def bench_reruns(args) -> dict:
+    import streamlit_option_menu
+    from streamlit.testing.v1 import AppTest
+
+    # app.py does ``from streamlit_option_menu import option_menu`` on every
+    # run, so swapping the module attribute picks the page without a browser
+    state = {"page": None, "options": []}
+
+    def fake_option_menu(*_, options=None, **__):
+        state["options"] = list(options)
+        return state["page"] if state["page"] in options else options[0]
+
+    real_option_menu = streamlit_option_menu.option_menu
+    streamlit_option_menu.option_menu = fake_option_menu
+    metrics = {}
+    try:
+        app_path = os.path.join(ROOT, "app.py")
+        AppTest.from_file(app_path, default_timeout=120).run()
+        for page in state["options"]:
+            state["page"] = page
+            slug = page.lower().replace(" prediction", "").replace(" ", "_")
+            at = AppTest.from_file(app_path, default_timeout=120)
+            start = time.perf_counter()
+            at.run()
+            metrics[f"reruns.{slug}.first_run_ms"] = (time.perf_counter() - start) * 1000
+            if at.exception:
+                raise RuntimeError(f"{page}: {at.exception}")
+            metrics.update(summarise(f"reruns.{slug}.rerun", timings(at.run, args.rerun_repeat)))
+
+            buttons = [button for button in at.button if "Result" in button.label]
+            if buttons:
+                samples = timings(lambda: buttons[0].click().run(), args.rerun_repeat)
+                metrics.update(summarise(f"reruns.{slug}.predict_click", samples))
+    finally:
+        streamlit_option_menu.option_menu = real_option_menu
+    return metrics
+
+
+def bench_audit(args) -> dict:
+    import streamlit_option_menu
+    from streamlit.testing.v1 import AppTest
+
+    from smart_health import audit
+    from smart_health.inference import predict_one
+
+    row = SAMPLE_ROWS["heart"]
+    # a cached row: the cheapest predict_one, where the log's cost shows most
+    predict_one("heart", row)
+    real_option_menu = streamlit_option_menu.option_menu
+    streamlit_option_menu.option_menu = lambda *_, options=None, **__: "Heart Disease Prediction"
+    metrics = {}
+    try:
+        at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120).run()
+        button = [button for button in at.button if "Result" in button.label][0]
+        for state in ("off", "on"):
+            # swap the process-wide log the way get_audit_log would create it
+            audit._log = audit.AuditLog(os.environ["SMART_HEALTH_AUDIT_DIR"]) if state == "on" else None
+            os.environ["SMART_HEALTH_AUDIT"] = "1" if state == "on" else "0"
+            metrics.update(
+                summarise(f"audit.{state}.predict_one_cached", timings(lambda: predict_one("heart", row), args.repeat * 10))
+            )
+            metrics.update(
+                summarise(f"audit.{state}.predict_click", timings(lambda: button.click().run(), args.rerun_repeat * 4))
+            )
+            if audit._log is not None:
+                start = time.perf_counter()
+                audit._log.close()
+                metrics["audit.on.drain_ms"] = (time.perf_counter() - start) * 1000
+                metrics["audit.on.dropped_records"] = audit._log.stats()["dropped"]
+                audit._log = None
+    finally:
+        streamlit_option_menu.option_menu = real_option_menu
+    return metrics
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Print each shared metric's change; return the names that regressed."""
+    regressions = []
+    print(f"{'metric':<52}{'baseline':>14}{'current':>14}{'change':>9}")
+    for name in sorted(current):
+        if name not in baseline:
+            continue
+        old, new = baseline[name], current[name]
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<52}{old:>14.4g}{new:>14.4g}{change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument("--repeat", type=int, default=200, help="single-row predicts per model")
+    parser.add_argument("--rerun-repeat", type=int, default=5, help="reruns per page")
+    parser.add_argument("--batch-rows", type=int, default=50_000, help="rows in the synthetic upload")
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with a saved results JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    # the warm-up thread would race the memory and latency measurements
+    os.environ["SMART_HEALTH_WARMUP"] = "0"
+    # benchmark predictions are not screenings; keep them out of the real audit log
+    os.environ["SMART_HEALTH_AUDIT_DIR"] = tempfile.mkdtemp(prefix="smart-health-audit-")
+
+    metrics = {}
+    # memory first, before the other sections allocate anything
+    for section in SECTIONS:
+        if section in args.sections:
+            print(f"running {section}...", file=sys.stderr)
+            metrics.update(globals()[f"bench_{section}"](args))
+
+    results = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+        },
+        "metrics": metrics,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(metrics, baseline, args.threshold)
+        if regressions and args.fail_on_regression:
+            raise SystemExit(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+    elif not args.output:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
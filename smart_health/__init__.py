@@ -0,0 +1 @@
+"""Model loading and inference helpers shared by the Streamlit app and tools."""
@@ -0,0 +1,254 @@
+"""Headless HTTP prediction API, independent of the Streamlit UI.
+
+    python -m smart_health.api [--host 127.0.0.1] [--port 8000] [--workers 4]
+
+Endpoints:
+
+* ``POST /predict/{diabetes,heart,parkinsons,kidney}``: body is one record
+  or a JSON array of records.  A record is either an array of feature values
+  in model order or an object keyed by feature name, with categorical fields
+  given as numbers or as the UI's labels (``"Asymptomatic"``, ``"Yes"``...).
+  Replies ``{"prediction": 1}`` or ``{"predictions": [1, 0, ...]}``.
+* ``GET /health`` and ``GET /models`` (load time, memory, serving version
+  and the versions rollback can return to, per model).
+* ``POST /models/{key}/reload`` and ``POST /models/{key}/rollback``: swap in
+  the file now on disk (after validation) or the version before the last
+  swap.  Changed files are also picked up by the model watcher.
+
+* ``GET /batching``: micro-batch sizes and queue waits per model.
+* ``GET /cache``: prediction-cache hits, misses and evictions per model.
+* ``GET /drift``: how far live inputs have moved from the training data.
+* ``GET /startup``: time spent in each startup and warm-up phase.
+* ``GET /metrics``: latency histograms in the Prometheus text format.
+
+The server is a plain asyncio HTTP/1.1 loop with keep-alive, so it needs no
+dependencies beyond the app's own.  Single records go through the shared
+prediction cache and micro-batchers; arrays are encoded and predicted on a
+thread pool, so the event loop only parses and writes bytes.  Arrays of
+``BULK_MIN_ROWS`` records or more are scored with the sklearn forest, which
+is faster than the serving ``FlatForest`` at that size.
+"""
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from http import HTTPStatus
+
+from smart_health import metrics, microbatch, startup
+from smart_health.cache import get_cache
+from smart_health.drift import get_drift_monitor
+from smart_health.encoding import encode_record
+from smart_health.inference import predict_one_async, record_scored
+from smart_health.registry import ModelValidationError, get_model_watcher, get_registry, model_for, start_model_watcher
+from smart_health.specs import MODEL_SPECS
+
+MAX_BODY_BYTES = 8 << 20
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class PredictionService:
+    def __init__(self, registry=None, executor=None):
+        self.registry = registry or get_registry()
+        self.executor = executor or ThreadPoolExecutor(max_workers=4)
+
+    def _predict_records(self, key: str, records: list) -> list:
+        try:
+            rows = [encode_record(key, record) for record in records]
+            active = self.registry.active(key)
+            model, X = model_for(active, rows)
+            labels = model.predict(X)
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(exc))
+        record_scored(key, rows, labels, active.version)
+        return labels.tolist()
+
+    async def predict(self, key: str, payload) -> dict:
+        if key not in MODEL_SPECS:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown model {key!r}")
+        # a flat array of numbers is one record; an array of records is a batch
+        single = not (isinstance(payload, list) and payload and isinstance(payload[0], (list, dict)))
+        if single:
+            try:
+                row = encode_record(key, payload)
+                label = await predict_one_async(key, row)
+            except ValueError as exc:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, str(exc))
+            return {"model": key, "prediction": label}
+
+        loop = asyncio.get_running_loop()
+        labels = await loop.run_in_executor(self.executor, self._predict_records, key, payload)
+        return {"model": key, "predictions": labels}
+
+    def models(self) -> dict:
+        loaded = self.registry.stats()
+        result = {
+            key: {"loaded": True, **asdict(loaded[key]), **self.registry.versions(key)}
+            if key in loaded
+            else {"loaded": False}
+            for key in MODEL_SPECS
+        }
+        watcher = get_model_watcher()
+        if watcher is not None:
+            result["watcher"] = watcher.stats()
+        return result
+
+    def _swap(self, key: str, action: str) -> dict:
+        try:
+            if action == "reload":
+                version = self.registry.reload(key)
+            else:
+                version = self.registry.rollback(key)
+        except ModelValidationError as exc:
+            raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, str(exc))
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.CONFLICT, str(exc))
+        return {"model": key, "version": version.version}
+
+    async def swap(self, key: str, action: str) -> dict:
+        if key not in MODEL_SPECS:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown model {key!r}")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._swap, key, action)
+
+
+async def _route(service: PredictionService, method: str, path: str, body: bytes):
+    if path.startswith("/predict/"):
+        if method != "POST":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST")
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+        return await service.predict(path[len("/predict/"):], payload)
+    if path.startswith("/models/") and path.endswith(("/reload", "/rollback")):
+        if method != "POST":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST")
+        key, action = path[len("/models/"):].rsplit("/", 1)
+        return await service.swap(key, action)
+    if path == "/health":
+        return {"status": "ok"}
+    if path == "/models":
+        return service.models()
+    if path == "/batching":
+        return microbatch.all_stats()
+    if path == "/cache":
+        return get_cache().stats()
+    if path == "/drift":
+        drift = get_drift_monitor()
+        return drift.stats() if drift is not None else {}
+    if path == "/metrics":
+        return metrics.render_prometheus()
+    if path == "/startup":
+        return {name: seconds * 1000 for name, seconds in startup.report().items()}
+    raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+
+
+def _response(status: HTTPStatus, payload, keep_alive: bool) -> bytes:
+    """JSON for dicts; plain text for strings (the Prometheus exposition)."""
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), "text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(payload).encode(), "application/json"
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def handle_connection(service: PredictionService, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                writer.write(_response(HTTPStatus.BAD_REQUEST, {"error": "Bad request line"}, False))
+                break
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                writer.write(_response(HTTPStatus.BAD_REQUEST, {"error": "Bad Content-Length"}, False))
+                break
+            if length > MAX_BODY_BYTES:
+                writer.write(_response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Body too large"}, False))
+                break
+            body = await reader.readexactly(length) if length else b""
+
+            try:
+                status, payload = HTTPStatus.OK, await _route(service, method, target.split("?")[0], body)
+            except HTTPError as exc:
+                status, payload = exc.status, {"error": exc.message}
+            except Exception as exc:  # keep the connection loop alive
+                status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(exc)}
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int, workers: int):
+    service = PredictionService(executor=ThreadPoolExecutor(max_workers=workers))
+    server = await asyncio.start_server(
+        lambda r, w: handle_connection(service, r, w), host, port, backlog=1024
+    )
+    print(f"Serving predictions on http://{host}:{port}", flush=True)
+    startup.start_warm_up()
+    start_model_watcher()
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Health Assistant prediction API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4, help="prediction threads")
+    parser.add_argument(
+        "--max-batch", type=int, default=microbatch.DEFAULT_MAX_BATCH, help="rows per micro-batch"
+    )
+    parser.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=microbatch.DEFAULT_MAX_LATENCY * 1000,
+        help="longest a row waits for its micro-batch to fill",
+    )
+    args = parser.parse_args()
+    microbatch.configure(max_batch=args.max_batch, max_latency=args.batch_window_ms / 1000)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""Append-only audit log of every prediction, written off the request path.
+
+``record`` only puts a tuple on a bounded in-memory queue, and
+``record_many`` queues already-scored batches (API arrays, Batch Screening
+chunks) as items of up to ``batch_size`` rows.  One background thread takes
+records off it in batches (up to ``batch_size`` rows, or whatever arrived
+within ``flush_interval`` of the first) and appends each batch to SQLite in
+a single transaction.  Each record carries the model
+version that produced the label (see ``ModelRegistry.active``); records
+queued without one get the version serving when they are written.
+
+* Rotation: once the current file is larger than ``max_bytes`` or its first
+  record is older than ``max_age`` seconds, it is closed and renamed to
+  ``predictions-<UTC time>.sqlite`` and a fresh file is started.
+* Backpressure: when the queue is full, ``record`` waits up to
+  ``block_timeout`` for room; a record that still does not fit is counted
+  in ``stats()["dropped"]`` rather than stalling the page.
+* Shutdown: ``close`` (registered with ``atexit``) writes everything still
+  queued before the process exits.
+
+The log lives in ``audit/`` by default; ``SMART_HEALTH_AUDIT_DIR`` moves it
+and ``SMART_HEALTH_AUDIT=0`` turns it off.
+"""
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from smart_health.registry import BASE_DIR, get_registry
+
+DEFAULT_DIR = os.path.join(BASE_DIR, "audit")
+CURRENT_NAME = "predictions.sqlite"
+
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE = 24 * 3600
+DEFAULT_BLOCK_TIMEOUT = 0.05
+
+_STOP = object()
+
+
+@dataclass
+class AuditStats:
+    written: int = 0
+    batches: int = 0
+    # records that waited for room in a full queue / never got any
+    blocked: int = 0
+    dropped: int = 0
+    rotations: int = 0
+    # records lost to a failed write (disk full, unwritable directory)
+    failed: int = 0
+
+
+class AuditLog:
+    def __init__(
+        self,
+        directory: str = DEFAULT_DIR,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: float = DEFAULT_MAX_AGE,
+        block_timeout: float = DEFAULT_BLOCK_TIMEOUT,
+        registry=None,
+    ):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.block_timeout = block_timeout
+        self.registry = registry or get_registry()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stats = AuditStats()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._db = None
+        self._first_ts = None
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, CURRENT_NAME)
+
+    def record(self, key: str, row, label, version: str = None):
+        """Queue one prediction; returns at once unless the queue is full."""
+        if self._closed:
+            return
+        self._put((time.time(), key, (row,), (label,), version))
+
+    def record_many(self, key: str, rows, labels, version: str = None):
+        """Queue a batch of predictions, ``batch_size`` rows per queue item."""
+        if self._closed:
+            return
+        ts = time.time()
+        for start in range(0, len(rows), self.batch_size):
+            stop = start + self.batch_size
+            self._put((ts, key, rows[start:stop], labels[start:stop], version))
+
+    def _put(self, item: tuple):
+        try:
+            self._queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        with self._stats_lock:
+            self._stats.blocked += len(item[2])
+        try:
+            self._queue.put(item, timeout=self.block_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats.dropped += len(item[2])
+
+    def close(self):
+        """Write every queued record and stop the writer; later records are ignored."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {"queued": self._queue.qsize(), **vars(self._stats)}
+
+    def _open(self):
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " ts REAL, model TEXT, version TEXT, features TEXT, label INTEGER)"
+        )
+        self._first_ts = self._db.execute("SELECT MIN(ts) FROM predictions").fetchone()[0]
+
+    def _rotate_if_due(self):
+        if self._first_ts is None:
+            return
+        wal = self.path + "-wal"
+        size = os.path.getsize(self.path) + (os.path.getsize(wal) if os.path.exists(wal) else 0)
+        too_big = size > self.max_bytes
+        too_old = time.time() - self._first_ts > self.max_age
+        if not (too_big or too_old):
+            return
+        # closing the last connection checkpoints the WAL back into the file
+        self._db.close()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        target = os.path.join(self.directory, f"predictions-{stamp}.sqlite")
+        suffix = 1
+        while os.path.exists(target):
+            target = os.path.join(self.directory, f"predictions-{stamp}-{suffix}.sqlite")
+            suffix += 1
+        os.replace(self.path, target)
+        self._open()
+        with self._stats_lock:
+            self._stats.rotations += 1
+
+    def _write(self, batch: list):
+        rows = [
+            (
+                ts,
+                key,
+                version or self.registry.version(key),
+                json.dumps([float(value) for value in row]),
+                int(label),
+            )
+            for ts, key, item_rows, labels, version in batch
+            for row, label in zip(item_rows, labels)
+        ]
+        if not rows:
+            return
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT INTO predictions VALUES (?, ?, ?, ?, ?)", rows)
+        if self._first_ts is None:
+            self._first_ts = rows[0][0]
+        with self._stats_lock:
+            self._stats.written += len(rows)
+            self._stats.batches += 1
+
+    def _flush(self, batch: list):
+        try:
+            self._write(batch)
+            self._rotate_if_due()
+        except (sqlite3.Error, OSError):
+            # keep draining the queue: a dead writer would make every caller wait
+            with self._stats_lock:
+                self._stats.failed += sum(len(item[2]) for item in batch)
+
+    def _collect(self, first) -> tuple:
+        """``(batch, stop)``: records arriving within ``flush_interval`` of ``first``."""
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        rows = len(first[2])
+        deadline = time.monotonic() + self.flush_interval
+        while rows < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            rows += len(item[2])
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._rotate_if_due()
+                continue
+            batch, stop = self._collect(first)
+            if batch:
+                self._flush(batch)
+        # records from callers that raced ``close``
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self._flush(leftover)
+        self._db.close()
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_audit_log():
+    """Process-wide audit log, or ``None`` when ``SMART_HEALTH_AUDIT=0``."""
+    global _log
+    if _log is None:
+        if os.environ.get("SMART_HEALTH_AUDIT", "1") == "0":
+            return None
+        with _log_lock:
+            if _log is None:
+                _log = AuditLog(os.environ.get("SMART_HEALTH_AUDIT_DIR") or DEFAULT_DIR)
+                atexit.register(_log.close)
+    return _log
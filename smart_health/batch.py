@@ -0,0 +1,107 @@
+"""Chunked scoring of uploaded patient spreadsheets.
+
+The CSV is read ``chunksize`` rows at a time, each chunk is encoded into the
+model's feature order and scored with a single ``predict`` call, and the
+scored chunk is written straight to ``out``.  Scoring therefore needs memory
+proportional to the chunk size, not to the number of rows in the file.
+
+The Batch Screening page is not bounded that way: Streamlit holds the whole
+upload in memory, and ``st.download_button`` copies the whole result into
+its media store.  The page refuses uploads over ``MAX_UPLOAD_BYTES``; larger
+files belong to ``python -m smart_health.bulk_score``, which reads and writes
+disk only.
+"""
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from smart_health.encoding import CATEGORICAL_FEATURES, map_columns
+from smart_health.specs import MODEL_SPECS
+
+DEFAULT_CHUNK_ROWS = 20_000
+# the page keeps the upload and its scored copy in memory until the session ends
+MAX_UPLOAD_BYTES = 50 << 20
+
+PREDICTION_COLUMN = "prediction"
+
+@dataclass
+class BatchSummary:
+    rows: int = 0
+    scored: int = 0
+    positives: int = 0
+    # rows with a missing or unreadable feature value; written unscored
+    skipped: int = 0
+    seconds: float = 0.0
+
+
+def encode_frame(chunk: pd.DataFrame, key: str, mapping: dict) -> pd.DataFrame:
+    """Numeric feature matrix in model order; unreadable cells become NaN."""
+    encoded = {}
+    categorical = CATEGORICAL_FEATURES[key]
+    for feature in MODEL_SPECS[key].features:
+        column = chunk[mapping[feature]]
+        if column.dtype == object:
+            # stray tabs such as '\t6200' in the kidney export
+            column = column.str.strip()
+            labels = categorical.get(feature)
+            if labels:
+                lowered = {label.lower(): code for label, code in labels.items()}
+                text = column.str.lower()
+                column = text.map(lowered).where(text.isin(lowered.keys()), column)
+        encoded[feature] = pd.to_numeric(column, errors="coerce")
+    return pd.DataFrame(encoded, index=chunk.index)
+
+
+def score_csv(
+    source,
+    key: str,
+    model,
+    out,
+    chunksize: int = DEFAULT_CHUNK_ROWS,
+    on_progress=None,
+    on_scored=None,
+) -> BatchSummary:
+    """Score CSV ``source`` with ``model`` and write the result CSV to binary ``out``.
+
+    Output rows keep every uploaded column and gain a ``prediction`` column
+    (empty for skipped rows).  ``on_progress`` is called with the fraction of
+    the input consumed after each chunk, when the input size is known.
+    ``on_scored`` is called with each chunk's scored feature rows and labels.
+    """
+    summary = BatchSummary()
+    start = time.perf_counter()
+    total_bytes = getattr(source, "size", None)
+    features = list(MODEL_SPECS[key].features)
+    mapping = None
+
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        if mapping is None:
+            mapping = map_columns(chunk.columns, key)
+        X = encode_frame(chunk, key, mapping)
+        valid = X.notna().all(axis=1).to_numpy()
+
+        prediction = pd.Series(pd.NA, index=chunk.index, dtype="Int64")
+        if valid.any():
+            rows = X.loc[valid, features]
+            labels = model.predict(rows)
+            prediction[valid] = labels
+            summary.positives += int((labels == 1).sum())
+            if on_scored is not None:
+                on_scored(rows.to_numpy(dtype=np.float64), labels)
+        chunk[PREDICTION_COLUMN] = prediction
+
+        out.write(chunk.to_csv(index=False, header=summary.rows == 0).encode("utf-8"))
+        summary.rows += len(chunk)
+        summary.scored += int(valid.sum())
+        summary.skipped += int((~valid).sum())
+
+        if on_progress is not None and total_bytes:
+            on_progress(min(source.tell() / total_bytes, 1.0))
+
+    # a header-only file still yields one empty chunk
+    if summary.rows == 0:
+        raise ValueError("The uploaded file has no rows.")
+    summary.seconds = time.perf_counter() - start
+    return summary
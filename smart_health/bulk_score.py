@@ -0,0 +1,328 @@
+"""Offline bulk scoring of large patient exports, sharded across processes.
+
+Each input CSV is cut into byte ranges of about ``--shard-mb``; a shard
+holds every line that starts inside its range, so shards never split a row
+(rows must not contain quoted line breaks).  Shards go to a process pool
+whose initializer loads the model once per worker, so a task is only a file
+name and two offsets.  Workers read their range, encode it exactly as the
+Batch Screening upload is encoded (``batch.encode_frame``: column-name
+matching, the UI's categorical labels, stray whitespace) and score it in
+chunks.
+
+Every shard becomes one columnar file,
+``<output>/<input name>/part-<shard>.parquet`` (``.npz`` when pyarrow is not
+installed), numbered in input order.  Inputs sharing a name get their
+position in the list as a prefix (``<output>/1-export/``), and part files
+left in an output directory by an earlier run are removed first.  Columns:
+any ``--keep`` input columns as text, the encoded features, and
+``prediction`` (empty, or -1 in ``.npz``, for rows with a missing or
+unreadable value).  A ``--keep`` column named like one of the others is
+refused, since the output could not hold both.  ``summary.json`` next to them
+has row counts, positives and timings per file and in total.
+
+    python -m smart_health.bulk_score heart exports/*.csv --output scored/ [--jobs 8] [--keep patient_id]
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from smart_health.batch import PREDICTION_COLUMN, BatchSummary, encode_frame
+from smart_health.encoding import map_columns
+from smart_health.specs import MODEL_SPECS
+
+DEFAULT_SHARD_BYTES = 32 << 20
+# shards per worker at least, so a slow shard does not leave cores idle at the end
+MIN_SHARDS_PER_WORKER = 4
+MIN_SHARD_BYTES = 1 << 20
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def columnar_format() -> str:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "npz"
+    return "parquet"
+
+
+@dataclass(frozen=True)
+class Shard:
+    path: str
+    index: int
+    start: int
+    end: int
+
+
+@dataclass
+class FileSummary(BatchSummary):
+    path: str = ""
+    # directory under the output holding this file's parts
+    directory: str = ""
+    shards: int = 0
+    bytes: int = 0
+    outputs: List[str] = field(default_factory=list)
+
+
+def read_header(path: str) -> tuple:
+    """``(column names, offset of the first data byte)``."""
+    with open(path, "rb") as f:
+        line = f.readline()
+        offset = f.tell()
+    columns = pd.read_csv(io.BytesIO(line), nrows=0).columns.tolist()
+    return columns, offset
+
+
+def plan_shards(path: str, data_start: int, shard_bytes: int) -> List[Shard]:
+    size = os.path.getsize(path)
+    starts = range(data_start, size, shard_bytes) if size > data_start else []
+    return [Shard(path, i, start, min(start + shard_bytes, size)) for i, start in enumerate(starts)]
+
+
+def read_shard(shard: Shard) -> bytes:
+    """The lines that start in ``[shard.start, shard.end)``."""
+    with open(shard.path, "rb") as f:
+        if shard.index:
+            f.seek(shard.start - 1)
+            if f.read(1) != b"\n":
+                f.readline()  # the line under way belongs to the shard before
+        else:
+            f.seek(shard.start)  # past the header
+        begin = f.tell()
+        data = f.read(max(0, shard.end - begin))
+        if data and not data.endswith(b"\n"):
+            data += f.readline()  # finish the last line started in range
+    return data
+
+
+_worker = {}
+
+
+def output_names(paths: List[str]) -> dict:
+    """Input path -> output directory name: the file's stem, prefixed with its position if shared."""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    return {
+        path: stem if stems.count(stem) == 1 else f"{index}-{stem}"
+        for index, (path, stem) in enumerate(zip(paths, stems))
+    }
+
+
+def _init_worker(
+    key: str, columns_by_path: dict, names: dict, keep: tuple, fmt: str, output: str, chunksize: int
+):
+    from smart_health.registry import bulk_model, get_registry
+
+    _worker.update(
+        key=key,
+        model=bulk_model(get_registry().active(key)),
+        columns=columns_by_path,
+        names=names,
+        keep=keep,
+        format=fmt,
+        output=output,
+        chunksize=chunksize,
+    )
+
+
+def _output_path(shard: Shard) -> str:
+    name = _worker["names"][shard.path]
+    return os.path.join(_worker["output"], name, f"part-{shard.index:05d}.{_worker['format']}")
+
+
+def _write(frame: pd.DataFrame, path: str):
+    tmp_path = path + ".tmp"
+    if _worker["format"] == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp_path)
+    else:
+        arrays = {}
+        for name, column in frame.items():
+            if name == PREDICTION_COLUMN:
+                arrays[name] = column.fillna(-1).to_numpy(dtype=np.int8)
+            elif column.dtype == object:
+                arrays[name] = column.fillna("").to_numpy(dtype=str)
+            else:
+                arrays[name] = column.to_numpy()
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def score_shard(shard: Shard) -> tuple:
+    """Score one shard in a worker; returns ``(shard, BatchSummary, output path)``."""
+    start = time.perf_counter()
+    key, model, keep = _worker["key"], _worker["model"], _worker["keep"]
+    columns = _worker["columns"][shard.path]
+    features = list(MODEL_SPECS[key].features)
+    mapping = map_columns(columns, key)
+    summary = BatchSummary()
+    parts = []
+    data = read_shard(shard)
+    if data:
+        # kept columns stay text; the rest are parsed per chunk and encoded
+        chunks = pd.read_csv(
+            io.BytesIO(data),
+            header=None,
+            names=columns,
+            dtype={column: str for column in keep},
+            chunksize=_worker["chunksize"],
+        )
+        for chunk in chunks:
+            X = encode_frame(chunk, key, mapping)
+            valid = X.notna().all(axis=1).to_numpy()
+            prediction = pd.Series(pd.NA, index=chunk.index, dtype="Int8")
+            if valid.any():
+                labels = model.predict(X.loc[valid, features])
+                prediction[valid] = labels
+                summary.positives += int((labels == 1).sum())
+            part = chunk[list(keep)].copy()
+            for feature in features:
+                part[feature] = X[feature].to_numpy(dtype=np.float64)
+            part[PREDICTION_COLUMN] = prediction
+            parts.append(part)
+            summary.rows += len(chunk)
+            summary.scored += int(valid.sum())
+            summary.skipped += int((~valid).sum())
+    if parts:
+        frame = pd.concat(parts, ignore_index=True)
+    else:
+        empty = {column: pd.Series(dtype=object) for column in keep}
+        empty.update({feature: pd.Series(dtype=np.float64) for feature in features})
+        empty[PREDICTION_COLUMN] = pd.Series(dtype="Int8")
+        frame = pd.DataFrame(empty)
+    path = _output_path(shard)
+    _write(frame, path)
+    summary.seconds = time.perf_counter() - start
+    return shard, summary, path
+
+
+def bulk_score(
+    key: str,
+    paths: List[str],
+    output: str,
+    jobs: int = None,
+    shard_bytes: int = None,
+    keep=(),
+    chunksize: int = DEFAULT_CHUNK_ROWS,
+    fmt: str = None,
+) -> dict:
+    """Score every row of ``paths`` with model ``key``; returns the summary written to ``output``."""
+    start = time.perf_counter()
+    jobs = jobs or os.cpu_count() or 1
+    fmt = fmt or columnar_format()
+    keep = tuple(keep)
+    paths = list(paths)
+    repeated = sorted({path for path in paths if paths.count(path) > 1})
+    if repeated:
+        raise ValueError("Input given more than once: " + ", ".join(repeated))
+    # features and the prediction are written under their own names and would overwrite a kept column
+    clashes = [column for column in keep if column in MODEL_SPECS[key].features or column == PREDICTION_COLUMN]
+    if clashes:
+        raise ValueError(f"--keep {', '.join(clashes)}: the output already has a column of that name")
+    names = output_names(paths)
+
+    columns_by_path, shards = {}, []
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    if shard_bytes is None:
+        shard_bytes = min(DEFAULT_SHARD_BYTES, total_bytes // (jobs * MIN_SHARDS_PER_WORKER))
+        shard_bytes = max(shard_bytes, MIN_SHARD_BYTES)
+    for path in paths:
+        columns, data_start = read_header(path)
+        map_columns(columns, key)  # missing features fail here, before any worker starts
+        missing = [column for column in keep if column not in columns]
+        if missing:
+            raise ValueError(f"{path} has no column " + ", ".join(missing))
+        columns_by_path[path] = columns
+        shards += plan_shards(path, data_start, shard_bytes)
+        directory = os.path.join(output, names[path])
+        os.makedirs(directory, exist_ok=True)
+        # a rerun with fewer shards must not leave the old tail behind
+        for stale in glob.glob(os.path.join(directory, "part-*")):
+            os.remove(stale)
+
+    files = {path: FileSummary(path=path, directory=names[path], bytes=os.path.getsize(path)) for path in paths}
+    worker_seconds = 0.0
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(key, columns_by_path, names, keep, fmt, output, chunksize),
+    ) as pool:
+        for shard, summary, part in pool.map(score_shard, shards):
+            entry = files[shard.path]
+            entry.rows += summary.rows
+            entry.scored += summary.scored
+            entry.skipped += summary.skipped
+            entry.positives += summary.positives
+            entry.seconds += summary.seconds
+            entry.shards += 1
+            entry.outputs.append(os.path.relpath(part, output))
+            worker_seconds += summary.seconds
+
+    seconds = time.perf_counter() - start
+    rows = sum(entry.rows for entry in files.values())
+    report = {
+        "model": key,
+        "format": fmt,
+        "jobs": jobs,
+        "shard_bytes": shard_bytes,
+        "shards": len(shards),
+        "rows": rows,
+        "scored": sum(entry.scored for entry in files.values()),
+        "skipped": sum(entry.skipped for entry in files.values()),
+        "positives": sum(entry.positives for entry in files.values()),
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+        # busy time summed over workers; near jobs * seconds when the pool is kept full
+        "worker_seconds": worker_seconds,
+        "files": [asdict(entry) for entry in files.values()],
+    }
+    tmp_path = os.path.join(output, "summary.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, os.path.join(output, "summary.json"))
+    return report
+
+
+def main():
+    import warnings
+
+    parser = argparse.ArgumentParser(description="Score large patient CSVs with one disease model, in parallel")
+    parser.add_argument("model", choices=list(MODEL_SPECS))
+    parser.add_argument("inputs", nargs="+", help="CSV files with a header row")
+    parser.add_argument("--output", required=True, help="directory for the part files and summary.json")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--shard-mb", type=float, help="input bytes per task (default: up to 32 MB)")
+    parser.add_argument("--keep", nargs="+", default=[], help="input columns copied to the output, e.g. an ID")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_ROWS, help="rows per predict call")
+    parser.add_argument("--format", choices=("parquet", "npz"), help="default: parquet if pyarrow is installed")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    shard_bytes = int(args.shard_mb * (1 << 20)) if args.shard_mb else None
+    report = bulk_score(
+        args.model, args.inputs, args.output, args.jobs, shard_bytes, args.keep, args.chunksize, args.format
+    )
+    print(f"{'output':<40}{'rows':>12}{'scored':>12}{'skipped':>9}{'positive':>10}{'shards':>8}")
+    for entry in report["files"]:
+        print(
+            f"{entry['directory']:<40}{entry['rows']:>12}{entry['scored']:>12}"
+            f"{entry['skipped']:>9}{entry['positives']:>10}{entry['shards']:>8}"
+        )
+    print(
+        f"{report['rows']} rows in {report['seconds']:.1f} s ({report['rows_per_second']:,.0f} rows/s) "
+        f"on {report['jobs']} workers; {report['format']} parts and summary.json in {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Memoised predictions keyed on the exact encoded feature vector.
+
+The app's inputs are bounded widgets (integer glucose, Yes/No radios, small
+selectboxes), so identical feature vectors come back across users and
+reruns.  ``PredictionCache`` keeps one LRU per model in memory and, if given
+a SQLite path, a second tier on disk that survives restarts.  Disk writes go
+through a queue to one writer thread, as the audit log's do.  Disk reads and
+the registry lookup of the serving version (which loads a cold model) run
+outside the cache lock, so neither holds up other sessions' in-memory hits.
+
+Entries are tied to the model version they were computed with: when the
+registry swaps in a new version of a model (see ``ModelWatcher``), that
+model's entries are dropped, and a label computed by a version that was
+swapped out meanwhile is not stored.  Explanations (``smart_health.explain``)
+are kept alongside the labels, in memory only, under the same rules.
+"""
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from smart_health.registry import get_registry
+from smart_health.specs import MODEL_SPECS
+
+DEFAULT_CACHE_SIZE = 4096
+# rows written to the disk tier per transaction
+WRITE_BATCH = 256
+
+_STOP = object()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+def _row_key(row: tuple) -> str:
+    # 40 and 40.0 are the same input to the model, and equal as dict keys
+    return json.dumps([float(value) for value in row])
+
+
+class PredictionCache:
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+        sqlite_path: str = None,
+        registry=None,
+    ):
+        self.maxsize = maxsize
+        self.registry = registry or get_registry()
+        self._lock = threading.Lock()
+        self._entries = {key: OrderedDict() for key in MODEL_SPECS}
+        self._explanations = {key: OrderedDict() for key in MODEL_SPECS}
+        self._stats = {key: CacheStats() for key in MODEL_SPECS}
+        self._versions = {}
+
+        self._db = None
+        self._writer = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                " model TEXT, version TEXT, features TEXT, label INTEGER,"
+                " PRIMARY KEY (model, version, features))"
+            )
+            # reads share the connection; the writer thread opens its own
+            self._db_lock = threading.Lock()
+            self._writes = queue.SimpleQueue()
+            self._writer = threading.Thread(
+                target=self._write_loop, args=(sqlite_path,), name="cache-writer", daemon=True
+            )
+            self._writer.start()
+
+    def _sync(self, key: str, version: str):
+        """Note ``version`` as serving ``key``; a change drops the old entries.
+
+        Callers resolve ``version`` before taking the lock: on a cold model
+        that loads it, which must not hold up every other session's lookups.
+        """
+        previous = self._versions.get(key)
+        if previous is not None and previous != version:
+            self._entries[key].clear()
+            self._explanations[key].clear()
+            self._stats[key].invalidations += 1
+        self._versions[key] = version
+
+    def version(self, key: str) -> str:
+        """The version the last lookup for ``key`` was checked against."""
+        with self._lock:
+            version = self._versions.get(key)
+        if version is None:
+            version = self.registry.version(key)
+            with self._lock:
+                self._sync(key, version)
+        return version
+
+    def get(self, key: str, row: tuple):
+        """Cached label for ``row``, or ``None``."""
+        version = self.registry.version(key)
+        with self._lock:
+            self._sync(key, version)
+            entries = self._entries[key]
+            label = entries.get(row)
+            if label is not None:
+                entries.move_to_end(row)
+                self._stats[key].hits += 1
+                return label
+            if self._db is None:
+                self._stats[key].misses += 1
+                return None
+
+        with self._db_lock:
+            found = self._db.execute(
+                "SELECT label FROM predictions WHERE model = ? AND version = ? AND features = ?",
+                (key, version, _row_key(row)),
+            ).fetchone()
+        with self._lock:
+            if found is None:
+                self._stats[key].misses += 1
+                return None
+            self._stats[key].disk_hits += 1
+            # a swap while the disk was read makes the label stale
+            if self._versions.get(key) == version:
+                self._store(key, row, found[0])
+            return found[0]
+
+    def put(self, key: str, row: tuple, label, version: str = None):
+        """Store ``label``, unless it came from ``version`` and that is no longer serving."""
+        current = self.registry.version(key)
+        with self._lock:
+            self._sync(key, current)
+            if version is not None and version != current:
+                return
+            version = current
+            self._store(key, row, label)
+        if self._writer is not None:
+            self._writes.put((key, version, _row_key(row), label))
+
+    def _write_loop(self, sqlite_path: str):
+        db = sqlite3.connect(sqlite_path, isolation_level=None)
+        db.execute("PRAGMA synchronous=NORMAL")
+        stop = False
+        while not stop:
+            batch = []
+            item = self._writes.get()
+            while item is not _STOP:
+                batch.append(item)
+                if len(batch) >= WRITE_BATCH:
+                    break
+                try:
+                    item = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+            stop = item is _STOP
+            if not batch:
+                continue
+            try:
+                with db:
+                    db.execute("BEGIN")
+                    db.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)", batch)
+            except sqlite3.Error:
+                pass  # a lost entry is only a future miss
+        db.close()
+
+    def close(self):
+        """Write every queued entry to disk and stop the writer."""
+        if self._writer is not None:
+            self._writes.put(_STOP)
+            self._writer.join()
+            self._writer = None
+
+    def _store(self, key: str, row: tuple, label):
+        entries = self._entries[key]
+        entries[row] = label
+        entries.move_to_end(row)
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+            self._stats[key].evictions += 1
+
+    def get_explanation(self, key: str, row: tuple):
+        """Cached ``Explanation`` for ``row`` from the serving version, or ``None``."""
+        version = self.registry.version(key)
+        with self._lock:
+            self._sync(key, version)
+            entries = self._explanations[key]
+            found = entries.get(row)
+            if found is not None:
+                entries.move_to_end(row)
+            return found
+
+    def put_explanation(self, key: str, row: tuple, explanation, version: str):
+        """Store ``explanation`` unless ``version`` was swapped out while it was computed."""
+        current = self.registry.version(key)
+        with self._lock:
+            self._sync(key, current)
+            if version != current:
+                return
+            entries = self._explanations[key]
+            entries[row] = explanation
+            entries.move_to_end(row)
+            if len(entries) > self.maxsize:
+                entries.popitem(last=False)
+
+    def clear(self, key: str = None):
+        with self._lock:
+            for name in [key] if key else MODEL_SPECS:
+                self._entries[name].clear()
+                self._explanations[name].clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                key: {
+                    "size": len(self._entries[key]),
+                    "explanations": len(self._explanations[key]),
+                    **vars(self._stats[key]),
+                }
+                for key in MODEL_SPECS
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> PredictionCache:
+    """Process-wide cache, sized by ``SMART_HEALTH_CACHE_SIZE``.
+
+    Set ``SMART_HEALTH_CACHE_DB`` to a file path to enable the SQLite tier.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache(
+                    maxsize=int(os.environ.get("SMART_HEALTH_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+                    sqlite_path=os.environ.get("SMART_HEALTH_CACHE_DB") or None,
+                )
+                atexit.register(_cache.close)
+    return _cache
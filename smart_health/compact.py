@@ -0,0 +1,224 @@
+"""Compact, memory-mappable binary format for the fitted models.
+
+An unpickled forest lives in each process's private heap.  The compact file
+stores the arrays ``FlatForest`` / ``LinearScorer`` need in narrow dtypes, and
+``load_compact`` maps it read-only, so every Streamlit or worker process
+serving the same file shares one copy through the page cache.
+
+Layout (little-endian)::
+
+    b"SHMODEL\\0"  magic
+    uint32         format version
+    uint32         header length
+    header         UTF-8 JSON: kind, feature names, classes, source pickle
+                   SHA-256 and {name: dtype, shape, offset} for every array
+    arrays         each aligned to 64 bytes
+
+Forest arrays: int16 feature indices, float32 thresholds, uint16 (or uint32)
+child indices and float64 node class distributions.  Thresholds are rounded
+*down* to float32: inputs are compared as float32, and for any float32 ``x``,
+``x <= t`` holds exactly when ``x <= floor32(t)``, so predictions stay exact.
+
+    python -m smart_health.compact export   # write saved_models/*.compact
+    python -m smart_health.compact check    # parity against the pickles
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from smart_health.forest import FlatForest
+from smart_health.linear import LinearScorer
+
+MAGIC = b"SHMODEL\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+SUFFIX = ".compact"
+
+
+def compact_path(pickle_path: str) -> str:
+    return os.path.splitext(pickle_path)[0] + SUFFIX
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _floor_float32(values: np.ndarray) -> np.ndarray:
+    narrow = values.astype(np.float32)
+    above = narrow.astype(np.float64) > values
+    narrow[above] = np.nextafter(narrow[above], np.float32(-np.inf))
+    return narrow
+
+
+def _forest_arrays(forest: FlatForest) -> dict:
+    index_dtype = np.uint16 if forest.n_nodes <= np.iinfo(np.uint16).max else np.uint32
+    return {
+        "feature": forest.feature.astype(np.int16),
+        "threshold": _floor_float32(forest.threshold),
+        "children": forest.children.astype(index_dtype),
+        "value": forest.value.astype(np.float64),
+        "roots": forest.roots.astype(index_dtype),
+    }
+
+
+def write_compact(predictor, path: str, features, source_sha256: str = ""):
+    """Write a ``FlatForest`` or ``LinearScorer`` to ``path``."""
+    if isinstance(predictor, FlatForest):
+        kind = "forest"
+        arrays = _forest_arrays(predictor)
+        extra = {"max_depth": predictor.max_depth}
+    elif isinstance(predictor, LinearScorer):
+        kind = "linear"
+        arrays = {
+            "coef": predictor.coef.astype(np.float64),
+            "intercept": np.array([predictor.intercept], dtype=np.float64),
+        }
+        extra = {}
+    else:
+        raise TypeError(f"Cannot write {type(predictor).__name__} in the compact format")
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = {
+        "kind": kind,
+        "features": list(features),
+        "classes": predictor.classes_.tolist(),
+        "n_features": int(predictor.n_features_in_),
+        "source_sha256": source_sha256,
+        "arrays": layout,
+        **extra,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    prefix = len(MAGIC) + 8 + len(header_bytes)
+    header_bytes += b" " * (-prefix % ALIGNMENT)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<II", FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        data_start = f.tell()
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a compact model file")
+        version, header_len = struct.unpack("<II", f.read(8))
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+        header = json.loads(f.read(header_len))
+    header["data_offset"] = len(MAGIC) + 8 + header_len
+    return header
+
+
+def load_compact(path: str):
+    """Memory-map ``path`` read-only and wrap it in a predictor."""
+    header = read_header(path)
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=header["data_offset"] + spec["offset"]
+        ).reshape(spec["shape"])
+
+    classes = np.asarray(header["classes"])
+    if header["kind"] == "forest":
+        predictor = FlatForest(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            children=arrays["children"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            classes=classes,
+            n_features=header["n_features"],
+            max_depth=header["max_depth"],
+        )
+    elif header["kind"] == "linear":
+        predictor = LinearScorer(arrays["coef"], float(arrays["intercept"][0]), classes)
+    else:
+        raise ValueError(f"Unknown compact model kind {header['kind']!r}")
+    predictor.feature_names = tuple(header["features"])
+    return predictor
+
+
+def export_model(registry, key: str) -> str:
+    """Convert the pickled model for ``key`` and return the written path."""
+    from smart_health.registry import compile_model
+
+    pickle_path = registry.path(key)
+    predictor = compile_model(registry.get(key))
+    path = compact_path(pickle_path)
+    write_compact(predictor, path, registry.specs[key].features, sha256_file(pickle_path))
+    return path
+
+
+def check_parity(registry, key: str, n_random: int = 20_000, seed: int = 0) -> dict:
+    """Compare the compact model with the pickle on the CSV plus perturbed rows."""
+    from smart_health.datasets import load_dataset
+
+    model = registry.get(key)
+    compact = load_compact(compact_path(registry.path(key)))
+    X, _ = load_dataset(key)
+    X = X.to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    noisy = X[rng.integers(0, len(X), n_random)] * rng.uniform(0.9, 1.1, (n_random, X.shape[1]))
+    rows = np.vstack([X, noisy])
+    return {
+        "rows": len(rows),
+        "mismatches": int((model.predict(rows) != compact.predict(rows)).sum()),
+    }
+
+
+def main():
+    import warnings
+
+    from smart_health.registry import get_registry
+    from smart_health.specs import MODEL_SPECS
+
+    parser = argparse.ArgumentParser(description="Convert models to the compact mmap format")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_SPECS), default=list(MODEL_SPECS))
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    registry = get_registry()
+    failed = False
+    for key in args.models:
+        if args.command == "export":
+            path = export_model(registry, key)
+            print(
+                f"{key:<11} {os.path.getsize(registry.path(key)) / 1e6:6.2f} MB pickle -> "
+                f"{os.path.getsize(path) / 1e6:6.2f} MB {os.path.basename(path)}"
+            )
+        report = check_parity(registry, key)
+        failed |= report["mismatches"] > 0
+        print(f"{key:<11} parity on {report['rows']} rows: {report['mismatches']} mismatches")
+    if failed:
+        raise SystemExit("parity check failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""Shrink a fitted random forest and record how often it still agrees.
+
+Methods:
+
+* ``subset``: keep the ``--trees`` trees chosen greedily so that their vote
+  agrees most often with the full forest's.
+* ``merge``: in every tree, merge sibling leaves into their parent, bottom
+  up, wherever the merged leaf votes with the full forest at least as often
+  on the calibration rows reaching it (reduced-error pruning against the
+  forest's labels, with the training CSV weighted as much as all synthetic
+  rows together).  Fully grown trees split down to single samples, so many
+  deep splits only separate rows the forest labels the same way.  Merged
+  leaves keep mixed class distributions, so the forest's averaged vote can
+  still move; the recorded agreement shows by how much.
+  ``subset --merge`` applies it to the selected trees as well.
+* ``tree`` / ``boosted``: distil the forest into one shallow
+  ``DecisionTreeClassifier`` or a small ``GradientBoostingClassifier``,
+  trained on the forest's own labels for the training CSV plus synthetic
+  rows.
+
+Agreement with the original forest is measured on the training CSV and on
+rows sampled uniformly across the app's input ranges (``INPUT_RANGES``).
+Synthetic rows used for evaluation are never the ones used to select trees
+or fit a student.  The result is an ordinary sklearn pickle written to
+``saved_models/compressed/`` with a ``.json`` report alongside; ``--install``
+puts it in place of the served model (the original is kept as ``.orig``).
+
+    python -m smart_health.compression heart --method subset --trees 40 --merge
+"""
+import argparse
+import copy
+import json
+import os
+import pickle
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from smart_health.datasets import load_dataset
+from smart_health.registry import SAVED_MODELS_DIR, ModelRegistry, compile_model
+from smart_health.specs import INPUT_RANGES, MODEL_SPECS
+
+FOREST_KEYS = ("heart", "parkinsons", "kidney")
+METHODS = ("subset", "merge", "tree", "boosted")
+
+# seeds for synthetic rows: one set to fit/select on, one to evaluate on
+FIT_SEED = 1
+EVAL_SEED = 2
+
+
+def sample_inputs(key: str, n: int, seed: int = 0) -> np.ndarray:
+    """``n`` rows drawn uniformly from the range of every input widget."""
+    rng = np.random.default_rng(seed)
+    columns = []
+    for feature in MODEL_SPECS[key].features:
+        spec = INPUT_RANGES[key][feature]
+        if spec.choices:
+            column = rng.choice(np.asarray(spec.choices, dtype=np.float64), n)
+        elif spec.integer:
+            column = rng.integers(int(spec.low), int(spec.high) + 1, n).astype(np.float64)
+        else:
+            column = rng.uniform(spec.low, spec.high, n)
+        columns.append(column)
+    return np.column_stack(columns)
+
+
+def agreement(teacher, student, X: np.ndarray) -> float:
+    return float((teacher.predict(X) == student.predict(X)).mean())
+
+
+def select_trees(forest, n_trees: int, X: np.ndarray, weight: np.ndarray = None):
+    """Copy of ``forest`` keeping the ``n_trees`` trees that best reproduce its labels."""
+    from smart_health.forest import FlatForest
+
+    flat = FlatForest.from_sklearn(forest)
+    target = flat.predict(X) == forest.classes_[1]
+    # (rows, trees) probability of the second class from each tree
+    votes = flat.value[flat.apply(X), 1]
+    weight = np.ones(len(X)) if weight is None else weight
+    total = np.zeros(len(X))
+    chosen = []
+    available = np.ones(votes.shape[1], dtype=bool)
+    for k in range(1, n_trees + 1):
+        # class 1 wins when its summed probability beats the other class's
+        predicted = (total[:, None] + votes) * 2 > k
+        score = weight @ (predicted == target[:, None])
+        score[~available] = -1.0
+        best = int(np.argmax(score))
+        chosen.append(best)
+        available[best] = False
+        total += votes[:, best]
+
+    subset = copy.copy(forest)
+    subset.estimators_ = [forest.estimators_[i] for i in sorted(chosen)]
+    subset.n_estimators = len(subset.estimators_)
+    return subset
+
+
+def _collapse_tree_state(state: dict, collapse: np.ndarray) -> dict:
+    """Tree state with every ``collapse`` node turned into a leaf keeping its own value."""
+    nodes, values = state["nodes"], state["values"]
+    left, right = nodes["left_child"], nodes["right_child"]
+    is_leaf = collapse | (left == -1)
+
+    order, depth_of, parent_slot = [], [], []
+    stack = [(0, 0, None)]
+    while stack:
+        node, depth, slot = stack.pop()
+        new_id = len(order)
+        order.append(node)
+        depth_of.append(depth)
+        parent_slot.append(slot)
+        if not is_leaf[node]:
+            stack.append((right[node], depth + 1, (new_id, "right_child")))
+            stack.append((left[node], depth + 1, (new_id, "left_child")))
+
+    new_nodes = nodes[order].copy()
+    for new_id, old in enumerate(order):
+        slot = parent_slot[new_id]
+        if slot is not None:
+            new_nodes[slot[0]][slot[1]] = new_id
+        if is_leaf[old]:
+            new_nodes[new_id]["left_child"] = -1
+            new_nodes[new_id]["right_child"] = -1
+            new_nodes[new_id]["feature"] = -2
+            new_nodes[new_id]["threshold"] = -2.0
+    return {
+        **state,
+        "max_depth": int(max(depth_of)),
+        "node_count": len(order),
+        "nodes": new_nodes,
+        "values": np.ascontiguousarray(values[order]),
+    }
+
+
+def _prune_mask(tree, X: np.ndarray, target: np.ndarray, weight: np.ndarray) -> np.ndarray:
+    """Nodes whose subtree can become one leaf without losing agreement with ``target``."""
+    reaches = tree.decision_path(X.astype(np.float32)).tocsc()
+    left, right = tree.children_left, tree.children_right
+    votes = tree.value[:, 0, :].argmax(axis=1)
+    # weight of the rows reaching each node that the node would label like the forest
+    agree_as_leaf = np.zeros(tree.node_count)
+    for node in range(tree.node_count):
+        rows = reaches.indices[reaches.indptr[node]:reaches.indptr[node + 1]]
+        agree_as_leaf[node] = weight[rows][target[rows] == votes[node]].sum()
+    agree_subtree = agree_as_leaf.copy()
+    collapse = np.zeros(tree.node_count, dtype=bool)
+    # sklearn numbers nodes depth-first, so children come after their parent
+    for node in range(tree.node_count - 1, -1, -1):
+        if left[node] == -1:
+            continue
+        below = agree_subtree[left[node]] + agree_subtree[right[node]]
+        if agree_as_leaf[node] >= below:
+            collapse[node] = True
+        else:
+            agree_subtree[node] = below
+    return collapse
+
+
+def merge_leaves(forest, X: np.ndarray, weight: np.ndarray = None):
+    """Copy of ``forest`` with each tree pruned against the forest's labels for ``X``."""
+    target = np.searchsorted(forest.classes_, forest.predict(X))
+    weight = np.ones(len(X)) if weight is None else weight
+    merged = copy.copy(forest)
+    merged.estimators_ = []
+    for estimator in forest.estimators_:
+        collapse = _prune_mask(estimator.tree_, X, target, weight)
+        estimator = copy.deepcopy(estimator)
+        estimator.tree_.__setstate__(_collapse_tree_state(estimator.tree_.__getstate__(), collapse))
+        merged.estimators_.append(estimator)
+    return merged
+
+
+def distill(forest, key: str, kind: str, X_fit: np.ndarray, max_depth: int = None):
+    """Fit a small student on ``forest``'s labels for ``X_fit``."""
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.tree import DecisionTreeClassifier
+
+    if kind == "tree":
+        student = DecisionTreeClassifier(max_depth=max_depth or 6, random_state=0)
+    else:
+        student = GradientBoostingClassifier(n_estimators=50, max_depth=max_depth or 3, random_state=0)
+    # fitted on a frame so the student keeps feature_names_in_ like the originals
+    frame = pd.DataFrame(X_fit, columns=list(MODEL_SPECS[key].features))
+    return student.fit(frame, forest.predict(X_fit))
+
+
+def n_nodes(model) -> int:
+    trees = getattr(model, "estimators_", None)
+    if trees is None:
+        return int(model.tree_.node_count)
+    # boosted models keep a (stages, 1) array of regression trees
+    return int(sum(tree.tree_.node_count for tree in np.ravel(trees)))
+
+
+def single_row_ms(model, row: list, repeat: int = 200) -> float:
+    predictor = compile_model(model)
+    predictor.predict([row])
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predictor.predict([row])
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def compress(
+    forest,
+    key: str,
+    method: str,
+    trees: int = 50,
+    merge: bool = False,
+    max_depth: int = None,
+    n_synthetic: int = 20_000,
+):
+    """Return ``(compressed_model, report)``."""
+    X_csv, _ = load_dataset(key)
+    X_csv = X_csv.to_numpy(dtype=np.float64)
+    X_fit = np.vstack([X_csv, sample_inputs(key, n_synthetic, FIT_SEED)])
+    # the real rows count as much as all synthetic rows together
+    weight = np.r_[np.full(len(X_csv), n_synthetic / len(X_csv)), np.ones(n_synthetic)]
+    X_eval = sample_inputs(key, n_synthetic, EVAL_SEED)
+
+    if method == "subset":
+        model = select_trees(forest, trees, X_fit, weight)
+    elif method == "merge":
+        model = forest
+    else:
+        model = distill(forest, key, method, X_fit, max_depth)
+    merged = method == "merge" or (method == "subset" and merge)
+    if merged:
+        model = merge_leaves(model, X_fit, weight)
+
+    report = {
+        "model": key,
+        "method": method,
+        "merged_leaves": merged,
+        "agreement_training_csv": agreement(forest, model, X_csv),
+        "agreement_synthetic": agreement(forest, model, X_eval),
+        "synthetic_rows": len(X_eval),
+        "nodes_before": n_nodes(forest),
+        "nodes_after": n_nodes(model),
+        "pickle_bytes_before": len(pickle.dumps(forest)),
+        "pickle_bytes_after": len(pickle.dumps(model)),
+        "single_row_ms_before": single_row_ms(forest, X_csv[0].tolist()),
+        "single_row_ms_after": single_row_ms(model, X_csv[0].tolist()),
+    }
+    if method == "subset":
+        report["trees"] = trees
+    if method in ("tree", "boosted"):
+        report["max_depth"] = int(model.get_params()["max_depth"])
+    return model, report
+
+
+def main():
+    import warnings
+
+    parser = argparse.ArgumentParser(description="Compress a fitted forest")
+    parser.add_argument("model", choices=FOREST_KEYS)
+    parser.add_argument("--method", choices=METHODS, default="subset")
+    parser.add_argument("--trees", type=int, default=50, help="trees kept by --method subset")
+    parser.add_argument("--merge", action="store_true", help="also merge leaves after subset")
+    parser.add_argument("--max-depth", type=int, help="depth of a distilled student")
+    parser.add_argument("--synthetic-rows", type=int, default=20_000)
+    parser.add_argument("--output", help="default: saved_models/compressed/<model file>")
+    parser.add_argument("--install", action="store_true", help="replace the served model (keeps .orig)")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    registry = ModelRegistry(prefer_compact=False)
+    served_path = registry.path(args.model)
+    original_path = served_path + ".orig"
+    if os.path.exists(original_path):
+        # compress the original, not a previously installed result
+        with open(original_path, "rb") as f:
+            forest = pickle.load(f)
+    else:
+        forest = registry.get(args.model)
+
+    model, report = compress(
+        forest, args.model, args.method, args.trees, args.merge, args.max_depth, args.synthetic_rows
+    )
+    output = args.output or os.path.join(SAVED_MODELS_DIR, "compressed", MODEL_SPECS[args.model].filename)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output + ".tmp", "wb") as f:
+        pickle.dump(model, f)
+    os.replace(output + ".tmp", output)
+    with open(output + ".json", "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, value in report.items():
+        print(f"{name:<24} {value:.4f}" if isinstance(value, float) else f"{name:<24} {value}")
+    print(f"written to {output}")
+
+    if args.install:
+        if not os.path.exists(original_path):
+            shutil.copy2(served_path, original_path)
+        shutil.copyfile(output, served_path + ".tmp")
+        os.replace(served_path + ".tmp", served_path)
+        print(f"installed as {served_path} (original kept as {os.path.basename(original_path)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Loaders for the bundled training CSVs, cleaned the way the notebooks clean them."""
+import os
+
+import pandas as pd
+
+from smart_health.registry import BASE_DIR
+from smart_health.specs import MODEL_SPECS
+
+DATA_FILES = {
+    "diabetes": "diabetes.csv",
+    "heart": "heart.csv",
+    "parkinsons": "parkinsons.csv",
+    "kidney": "kidney_disease.csv",
+}
+
+TARGETS = {
+    "diabetes": "Outcome",
+    "heart": "target",
+    "parkinsons": "status",
+    "kidney": "classification",
+}
+
+# categorical encodings from Kidney_Disease_Prediction.ipynb
+KIDNEY_MAPPINGS = {
+    "rbc": {"abnormal": 1, "normal": 0},
+    "pc": {"abnormal": 1, "normal": 0},
+    "pcc": {"present": 1, "notpresent": 0},
+    "ba": {"present": 1, "notpresent": 0},
+    "htn": {"yes": 1, "no": 0},
+    "dm": {"yes": 1, "no": 0},
+    "cad": {"yes": 1, "no": 0},
+    "appet": {"good": 1, "poor": 0},
+    "pe": {"yes": 1, "no": 0},
+    "ane": {"yes": 1, "no": 0},
+}
+
+
+def data_path(key: str) -> str:
+    return os.path.join(BASE_DIR, DATA_FILES[key])
+
+
+def clean_kidney(data: pd.DataFrame) -> pd.DataFrame:
+    """Apply the kidney notebook's cleaning: target fix, complete rows, encodings."""
+    data = data.copy()
+    # fix 'ckd\t' to 'ckd', then ckd -> 1, notckd -> 0
+    data["classification"] = (
+        data["classification"].replace("ckd\t", "ckd").map({"ckd": 1, "notckd": 0})
+    )
+    data = data.drop(columns="id", errors="ignore")
+
+    # keep only complete rows
+    df = data.dropna(axis=0).reset_index(drop=True)
+
+    # tabbed counts like '\t6200' and numbers stored as strings
+    df["pcv"] = pd.to_numeric(df["pcv"].astype(str).str.strip()).astype(int)
+    df["wc"] = pd.to_numeric(df["wc"].astype(str).str.strip()).astype(int)
+    df["rc"] = pd.to_numeric(df["rc"].astype(str).str.strip()).astype(float)
+
+    for column, mapping in KIDNEY_MAPPINGS.items():
+        if df[column].dtype == object:
+            df[column] = df[column].str.strip().map(mapping)
+    df["classification"] = df["classification"].astype(int)
+    return df
+
+
+def load_frame(key: str, path: str = None) -> pd.DataFrame:
+    """The cleaned CSV for ``key``, with every column the notebook kept."""
+    data = pd.read_csv(path or data_path(key))
+    if key == "kidney":
+        data = clean_kidney(data)
+    return data
+
+
+def load_dataset(key: str, path: str = None):
+    """``(X, y)`` for ``key`` with X restricted to the model's feature order."""
+    data = load_frame(key, path)
+    X = data[list(MODEL_SPECS[key].features)]
+    y = data[TARGETS[key]]
+    return X, y
@@ -0,0 +1,308 @@
+"""Input drift: live feature distributions compared with the training CSVs.
+
+Every row ``predict_one`` scores is also counted here, per model and
+feature, into a fixed set of bins taken from that model's training CSV:
+
+* numeric features: the CSV's deciles (fewer where values tie), so each bin
+  held about a tenth of the training rows;
+* coded features (radios and selectboxes such as ``cp``, ``thal``, ``htn``):
+  one bin per code, plus one for anything else;
+* numeric features the UI reduces to a few answers (``DiabetesPedigreeFunction``
+  is sent as 0.08 or 2.5 for a family-history Yes/No): one quantile bin per
+  answer, so each answer lands in its own bin and the CSV's continuous values
+  from the API and uploads are binned the same way.
+
+The bins are the sketch: a feature costs one bisect and one increment per
+row and a dozen counters however many rows arrive.  ``observe_many`` bins a
+whole scored batch (API arrays, Batch Screening chunks) with one
+``searchsorted`` and ``bincount`` per feature.  Counts are kept for the
+current ``window`` rows and the window before it, so old traffic ages out
+and a recent shift is not diluted by months of ordinary inputs.
+
+``report`` scores each feature with the population stability index (PSI)
+of the live bins against the training bins: above 0.1 is a ``moderate``
+shift, above 0.25 ``shifted``.  Nothing is flagged before ``min_rows`` rows.
+
+``SMART_HEALTH_DRIFT=0`` turns the monitor off.
+
+    python -m smart_health.drift [audit/predictions.sqlite ...]   # replay logged inputs
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import sqlite3
+import threading
+from bisect import bisect_right
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Tuple
+
+import numpy as np
+
+from smart_health.specs import INPUT_RANGES, MODEL_SPECS
+
+BINS = 10
+DEFAULT_WINDOW = 5000
+DEFAULT_MIN_ROWS = 100
+MODERATE_PSI = 0.1
+SHIFTED_PSI = 0.25
+# an empty bin on either side would make the PSI infinite
+_EPSILON = 1e-4
+
+
+@dataclass
+class Reference:
+    """Training-set bins for one feature."""
+
+    feature: str
+    # numeric: bin i holds values below edges[i] (and at or above edges[i - 1])
+    edges: Tuple[float, ...] = ()
+    # coded: bin i holds codes[i]; the extra last bin holds anything else
+    codes: Tuple[float, ...] = ()
+    shares: Tuple[float, ...] = ()
+    _index: Dict[float, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._index = {code: i for i, code in enumerate(self.codes)}
+
+    @property
+    def kind(self) -> str:
+        return "coded" if self.codes else "numeric"
+
+    def bin(self, value: float) -> int:
+        if self.codes:
+            return self._index.get(value, len(self.codes))
+        return bisect_right(self.edges, value)
+
+    def bin_many(self, values: np.ndarray) -> np.ndarray:
+        """``bin`` for every value in ``values``."""
+        if self.codes:
+            codes = np.asarray(self.codes)
+            index = np.minimum(np.searchsorted(codes, values), len(codes) - 1)
+            return np.where(codes[index] == values, index, len(codes))
+        return np.searchsorted(self.edges, values, side="right")
+
+
+def build_reference(key: str, feature: str, values: np.ndarray) -> Reference:
+    """Bins and training shares for one feature's training ``values``."""
+    values = np.asarray(values, dtype=np.float64)
+    spec = INPUT_RANGES[key].get(feature)
+    if spec is not None and spec.integer and spec.choices:
+        codes = tuple(sorted(set(map(float, spec.choices)) | set(np.unique(values).tolist())))
+        reference = Reference(feature, codes=codes)
+        bins = np.array([reference.bin(value) for value in values.tolist()])
+        counts = np.bincount(bins, minlength=len(codes) + 1)
+    else:
+        bins = len(spec.choices) if spec is not None and spec.choices else BINS
+        edges = np.unique(np.quantile(values, np.arange(1, bins) / bins))
+        reference = Reference(feature, edges=tuple(edges.tolist()))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+    reference.shares = tuple((counts / counts.sum()).tolist())
+    return reference
+
+
+def load_references(key: str, path: str = None) -> Tuple[Reference, ...]:
+    """One ``Reference`` per model feature, in model order, from the training CSV."""
+    from smart_health.datasets import load_dataset
+
+    X, _ = load_dataset(key, path)
+    return tuple(build_reference(key, feature, X[feature].to_numpy()) for feature in MODEL_SPECS[key].features)
+
+
+def psi(counts, shares) -> float:
+    """Population stability index of bin ``counts`` against reference ``shares``."""
+    total = sum(counts)
+    value = 0.0
+    for count, share in zip(counts, shares):
+        live = max(count / total, _EPSILON)
+        share = max(share, _EPSILON)
+        value += (live - share) * math.log(live / share)
+    return value
+
+
+def status(value: float, rows: int, min_rows: int = DEFAULT_MIN_ROWS) -> str:
+    if rows < min_rows:
+        return "warming up"
+    if value > SHIFTED_PSI:
+        return "shifted"
+    if value > MODERATE_PSI:
+        return "moderate"
+    return "stable"
+
+
+@dataclass
+class FeatureDrift:
+    model: str
+    feature: str
+    kind: str
+    rows: int
+    psi: float
+    status: str
+
+
+class _ModelSketch:
+    """Bin counts for one model: the window being filled and the one before."""
+
+    def __init__(self, references: Tuple[Reference, ...]):
+        self.references = references
+        self.lock = threading.Lock()
+        self.current = [[0] * len(reference.shares) for reference in references]
+        self.previous = [[0] * len(reference.shares) for reference in references]
+        self.current_rows = 0
+        self.previous_rows = 0
+
+    def rotate(self):
+        self.previous, self.previous_rows = self.current, self.current_rows
+        self.current = [[0] * len(reference.shares) for reference in self.references]
+        self.current_rows = 0
+
+
+class DriftMonitor:
+    def __init__(self, window: int = DEFAULT_WINDOW, min_rows: int = DEFAULT_MIN_ROWS, paths: dict = None):
+        self.window = window
+        self.min_rows = min_rows
+        # model key -> training CSV, for references built from other files
+        self.paths = paths or {}
+        self._sketches = {}
+        self._lock = threading.Lock()
+
+    def _sketch(self, key: str) -> _ModelSketch:
+        sketch = self._sketches.get(key)
+        if sketch is None:
+            with self._lock:
+                sketch = self._sketches.get(key)
+                if sketch is None:
+                    sketch = self._sketches[key] = _ModelSketch(load_references(key, self.paths.get(key)))
+        return sketch
+
+    def references(self, key: str) -> Tuple[Reference, ...]:
+        """The training bins for ``key``, read from its CSV on first use."""
+        return self._sketch(key).references
+
+    def observe(self, key: str, row):
+        """Count one encoded feature row; constant time and memory."""
+        sketch = self._sketch(key)
+        with sketch.lock:
+            if sketch.current_rows >= self.window:
+                sketch.rotate()
+            for reference, counts, value in zip(sketch.references, sketch.current, row):
+                counts[reference.bin(float(value))] += 1
+            sketch.current_rows += 1
+
+    def observe_many(self, key: str, rows):
+        """Count a batch of encoded feature rows, window by window."""
+        rows = np.asarray(rows, dtype=np.float64)
+        if rows.ndim != 2 or not len(rows):
+            return
+        sketch = self._sketch(key)
+        bins = [reference.bin_many(rows[:, i]) for i, reference in enumerate(sketch.references)]
+        with sketch.lock:
+            start = 0
+            while start < len(rows):
+                if sketch.current_rows >= self.window:
+                    sketch.rotate()
+                stop = min(len(rows), start + self.window - sketch.current_rows)
+                for counts, feature_bins in zip(sketch.current, bins):
+                    added = np.bincount(feature_bins[start:stop], minlength=len(counts))
+                    for i, count in enumerate(added.tolist()):
+                        counts[i] += count
+                sketch.current_rows += stop - start
+                start = stop
+
+    def report(self, key: str = None) -> list:
+        """``FeatureDrift`` per observed feature, most shifted first."""
+        results = []
+        for model in [key] if key else list(self._sketches):
+            sketch = self._sketches.get(model)
+            if sketch is None:
+                continue
+            with sketch.lock:
+                rows = sketch.current_rows + sketch.previous_rows
+                live = [
+                    [a + b for a, b in zip(current, previous)]
+                    for current, previous in zip(sketch.current, sketch.previous)
+                ]
+            if not rows:
+                continue
+            for reference, counts in zip(sketch.references, live):
+                value = psi(counts, reference.shares)
+                results.append(
+                    FeatureDrift(model, reference.feature, reference.kind, rows, value, status(value, rows, self.min_rows))
+                )
+        return sorted(results, key=lambda drift: drift.psi, reverse=True)
+
+    def shifted(self, key: str = None) -> list:
+        """Features whose live inputs have moved well away from training."""
+        return [drift for drift in self.report(key) if drift.status == "shifted"]
+
+    def stats(self) -> dict:
+        """Model -> rows in the window and per-feature PSI, for JSON output."""
+        result = {}
+        for drift in self.report():
+            entry = result.setdefault(drift.model, {"rows": drift.rows, "features": {}})
+            entry["features"][drift.feature] = {"psi": round(drift.psi, 4), "status": drift.status}
+        return result
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_drift_monitor():
+    """Process-wide drift monitor, or ``None`` when ``SMART_HEALTH_DRIFT=0``."""
+    global _monitor
+    if _monitor is None:
+        if os.environ.get("SMART_HEALTH_DRIFT", "1") == "0":
+            return None
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = DriftMonitor()
+    return _monitor
+
+
+def replay(monitor: DriftMonitor, databases) -> int:
+    """Feed every row in audit-log ``databases`` to ``monitor``, oldest first."""
+    rows = 0
+    for database in databases:
+        db = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+        try:
+            for model, features in db.execute("SELECT model, features FROM predictions ORDER BY ts"):
+                if model in MODEL_SPECS:
+                    monitor.observe(model, json.loads(features))
+                    rows += 1
+        finally:
+            db.close()
+    return rows
+
+
+def main():
+    from smart_health.audit import DEFAULT_DIR
+
+    parser = argparse.ArgumentParser(description="Compare logged inputs with the training data")
+    parser.add_argument(
+        "databases", nargs="*", help="audit-log files, oldest first (default: every file in audit/)"
+    )
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="rows per window; two are compared")
+    parser.add_argument("--min-rows", type=int, default=DEFAULT_MIN_ROWS)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    # rotated files (predictions-<UTC time>.sqlite) sort before the current one
+    databases = args.databases or sorted(glob.glob(os.path.join(DEFAULT_DIR, "predictions*.sqlite")))
+    monitor = DriftMonitor(args.window, args.min_rows)
+    rows = replay(monitor, databases)
+    report = monitor.report()
+    if args.json:
+        print(json.dumps([asdict(drift) for drift in report], indent=2))
+        return
+    print(f"{rows} logged rows from {len(databases)} file(s)")
+    print(f"{'model':<12}{'feature':<24}{'kind':<9}{'rows':>7}{'psi':>9}  status")
+    for drift in report:
+        print(
+            f"{drift.model:<12}{drift.feature:<24}{drift.kind:<9}{drift.rows:>7}{drift.psi:>9.3f}  {drift.status}"
+        )
+
+
+if __name__ == "__main__":
+    main()
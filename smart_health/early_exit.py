@@ -0,0 +1,179 @@
+"""Early-exit soft voting for the binary forests, with exactly the full forest's labels.
+
+A fitted forest predicts the second class when the summed margin
+``sum_i (p1_i - p0_i)`` over its trees is positive.  Each tree's margin is
+bounded by the smallest and largest margin among its leaves, so after
+evaluating some trees the final sum is known to lie in
+``[so_far + sum of remaining minima, so_far + sum of remaining maxima]``.
+Once that interval is clear of zero by more than any floating-point
+rounding, the label is settled and the remaining trees are skipped.  Rows
+that are never settled (a margin within ``eps`` of zero) are re-scored by
+the full forest, so labels always match ``FlatForest.predict``.
+
+No label can be settled before the trees evaluated outweigh the rest (just
+over half of them for fully grown trees, whose leaves are pure), so the first
+block is exactly that many trees; after it, blocks of 32, 64... follow
+until every row is settled.  Every block is one vectorised pass over the
+rows still open, so the saving shows on batches; a single row that needs
+several blocks pays a pass each and can be slower than the full forest.
+Trees are taken in a configurable order:
+
+* ``estimator``: the forest's own order.
+* ``accuracy``: most accurate single trees on the training CSV first.
+* ``decisive``: trees with the largest mean ``|p1 - p0|`` on the CSV first,
+  ties broken by accuracy.
+
+    python -m smart_health.early_exit   # average trees evaluated and parity per model
+"""
+import time
+
+import numpy as np
+
+from smart_health.forest import FlatForest
+
+ORDERS = ("estimator", "accuracy", "decisive")
+
+# far above the rounding error of summing a few hundred probabilities
+DEFAULT_EPS = 1e-9
+
+
+def tree_order(forest: FlatForest, X, y, by: str = "accuracy") -> np.ndarray:
+    """Tree indices, best first by ``by``, measured on rows ``X`` with labels ``y``."""
+    if by == "estimator":
+        return np.arange(forest.n_estimators)
+    leaves = forest.apply(X)
+    margin = forest.value[leaves, 1] - forest.value[leaves, 0]
+    truth = np.asarray(y) == forest.classes_[1]
+    accuracy = ((margin > 0) == truth[:, None]).mean(axis=0)
+    if by == "accuracy":
+        return np.lexsort((np.arange(forest.n_estimators), -accuracy))
+    if by == "decisive":
+        return np.lexsort((-accuracy, -np.abs(margin).mean(axis=0)))
+    raise ValueError(f"Unknown tree order {by!r}; expected one of {ORDERS}")
+
+
+class EarlyExitForest:
+    def __init__(self, forest: FlatForest, order=None, block: int = 32, eps: float = DEFAULT_EPS):
+        if len(forest.classes_) != 2:
+            raise ValueError("Early exit needs a binary forest.")
+        self.forest = forest
+        self.classes_ = forest.classes_
+        self.n_features_in_ = forest.n_features_in_
+        self.order = np.arange(forest.n_estimators) if order is None else np.asarray(order, dtype=np.intp)
+        self.eps = eps
+
+        margin = forest.value[:, 1] - forest.value[:, 0]
+        nodes = np.arange(forest.n_nodes)
+        is_leaf = forest.children[:, 0] == nodes
+        low = np.minimum.reduceat(np.where(is_leaf, margin, np.inf), forest.roots)[self.order]
+        high = np.maximum.reduceat(np.where(is_leaf, margin, -np.inf), forest.roots)[self.order]
+        self._margin = margin
+        self._order_roots = forest.roots[self.order]
+
+        # remaining trees' minimum / maximum margin sum after the first k trees
+        remaining_low = np.r_[np.cumsum(low[::-1])[::-1], 0.0]
+        remaining_high = np.r_[np.cumsum(high[::-1])[::-1], 0.0]
+        done_low = np.r_[0.0, np.cumsum(low)]
+        done_high = np.r_[0.0, np.cumsum(high)]
+        # fewest trees after which even a unanimous row could be settled
+        possible = (done_high + remaining_low > eps) | (done_low + remaining_high < -eps)
+        first = max(1, int(np.argmax(possible))) if possible.any() else forest.n_estimators
+
+        # block boundaries: the first settle point, then doubling blocks
+        bounds = [0, first]
+        size = block
+        while bounds[-1] < forest.n_estimators:
+            bounds.append(min(forest.n_estimators, bounds[-1] + size))
+            size *= 2
+        self._bounds = bounds
+        self._remaining_low = [remaining_low[end] for end in bounds[1:]]
+        self._remaining_high = [remaining_high[end] for end in bounds[1:]]
+
+        self.rows = 0
+        self.trees_evaluated = 0
+
+    @classmethod
+    def calibrated(cls, forest: FlatForest, key: str, by: str = "accuracy", **kwargs) -> "EarlyExitForest":
+        """Order ``forest``'s trees by ``by`` on the training CSV for model ``key``."""
+        from smart_health.datasets import load_dataset
+
+        X, y = load_dataset(key)
+        return cls(forest, tree_order(forest, X.to_numpy(dtype=np.float64), y.to_numpy(), by), **kwargs)
+
+    def predict_with_counts(self, X):
+        """Labels plus the number of trees evaluated for each row."""
+        X = self.forest._validate(X)
+        n_rows = X.shape[0]
+        positive = np.zeros(n_rows, dtype=bool)
+        margin = np.zeros(n_rows)
+        evaluated = np.zeros(n_rows, dtype=np.intp)
+        active = np.arange(n_rows)
+        for block, (start, end) in enumerate(zip(self._bounds, self._bounds[1:])):
+            leaves = self.forest._apply(X[active], self._order_roots[start:end])
+            margin[active] += self._margin[leaves].sum(axis=1)
+            evaluated[active] = end
+            so_far = margin[active]
+            settled_positive = so_far + self._remaining_low[block] > self.eps
+            settled = settled_positive | (so_far + self._remaining_high[block] < -self.eps)
+            positive[active[settled_positive]] = True
+            active = active[~settled]
+            if not active.size:
+                break
+        if active.size:
+            # too close to call from the bounds: the full forest decides
+            positive[active] = self.forest.predict(X[active]) == self.classes_[1]
+        return self.classes_.take(positive.astype(np.intp)), evaluated
+
+    def predict(self, X) -> np.ndarray:
+        labels, evaluated = self.predict_with_counts(X)
+        self.rows += len(evaluated)
+        self.trees_evaluated += int(evaluated.sum())
+        return labels
+
+    def mean_trees_evaluated(self) -> float:
+        return self.trees_evaluated / self.rows if self.rows else 0.0
+
+
+def _median_ms(model, rows: list) -> float:
+    """Median latency of ``model.predict`` over the inputs in ``rows``."""
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def main():
+    import warnings
+
+    from smart_health.datasets import DATA_FILES, load_dataset
+    from smart_health.registry import ModelRegistry
+
+    warnings.filterwarnings("ignore")
+    registry = ModelRegistry(prefer_compact=False)
+    print(
+        f"{'model':<11}{'order':<11}{'trees':>6}{'mean used':>10}{'mismatch':>9}"
+        f"{'batch ms':>10}{'(full)':>8}{'1-row ms':>10}{'(full)':>8}"
+    )
+    for key in ("heart", "parkinsons", "kidney"):
+        forest = registry.predictor(key)
+        X, y = load_dataset(key)
+        X = X.to_numpy(dtype=np.float64)
+        expected = registry.get(key).predict(X)
+        rows = [[row] for row in X[:200].tolist()]
+        batch = np.repeat(X, 20, axis=0)
+        full_row, full_batch = _median_ms(forest, rows), _median_ms(forest, [batch] * 3)
+        for by in ORDERS:
+            fast = EarlyExitForest(forest, tree_order(forest, X, y.to_numpy(), by))
+            labels, evaluated = fast.predict_with_counts(X)
+            print(
+                f"{key:<11}{by:<11}{forest.n_estimators:>6}{evaluated.mean():>10.1f}"
+                f"{int((labels != expected).sum()):>9}{_median_ms(fast, [batch] * 3):>10.1f}{full_batch:>8.1f}"
+                f"{_median_ms(fast, rows):>10.3f}{full_row:>8.3f}"
+            )
+    print(f"(batch: each CSV repeated 20 times; 1-row: median over the first 200 rows; parity on every row of {', '.join(DATA_FILES[k] for k in ('heart', 'parkinsons', 'kidney'))})")
+
+
+if __name__ == "__main__":
+    main()
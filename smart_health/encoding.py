@@ -0,0 +1,138 @@
+"""Label encodings used by the UI pages, shared with file and API inputs."""
+from smart_health.specs import MODEL_SPECS
+
+YES_NO = {"No": 0, "Yes": 1}
+
+SEX_MAP = {"Male": 1, "Female": 0}
+
+CP_MAP = {
+    "Typical angina": 0,
+    "Atypical angina": 1,
+    "Non-anginal pain": 2,
+    "Asymptomatic": 3,
+}
+
+SLOPE_MAP = {
+    "Upsloping": 0,
+    "Flat": 1,
+    "Downsloping": 2,
+}
+
+THAL_MAP = {
+    "Normal": 0,
+    "Fixed defect": 1,
+    "Reversible defect": 2,
+}
+
+# the diabetes page asks for family history instead of the pedigree function
+FAMILY_HISTORY_DPF = {"No": 0.08, "Yes": 2.5}
+
+# model feature -> label encoding, for inputs that arrive as text
+CATEGORICAL_FEATURES = {
+    "diabetes": {"DiabetesPedigreeFunction": FAMILY_HISTORY_DPF},
+    "heart": {
+        "sex": SEX_MAP,
+        "cp": CP_MAP,
+        "exang": YES_NO,
+        "slope": SLOPE_MAP,
+        "thal": THAL_MAP,
+    },
+    "parkinsons": {},
+    "kidney": {"htn": YES_NO, "dm": YES_NO, "ane": YES_NO},
+}
+
+
+def encode_label(mapping: dict, value):
+    """Encode ``value`` with ``mapping``, ignoring case; numbers pass through."""
+    if isinstance(value, str):
+        wanted = value.strip().lower()
+        for label, code in mapping.items():
+            if label.lower() == wanted:
+                return code
+        raise ValueError(f"unknown value {value!r}; expected one of {list(mapping)}")
+    return value
+
+
+# other accepted spellings of feature names (the app's own input names)
+FEATURE_ALIASES = {
+    "diabetes": {
+        "DPF": "DiabetesPedigreeFunction",
+    },
+    "heart": {},
+    "parkinsons": {
+        "Fo": "MDVP:Fo(Hz)",
+        "Fhi": "MDVP:Fhi(Hz)",
+        "Flo": "MDVP:Flo(Hz)",
+        "Jitter_percent": "MDVP:Jitter(%)",
+        "Shimmer": "MDVP:Shimmer",
+    },
+    "kidney": {
+        "k_age": "age",
+        "k_bp": "bp",
+        "k_sg": "sg",
+        "k_al": "al",
+        "k_bgr": "bgr",
+        "k_bu": "bu",
+        "k_sc": "sc",
+        "k_hemo": "hemo",
+        "k_wc": "wc",
+        "k_htn": "htn",
+        "k_dm": "dm",
+        "k_ane": "ane",
+    },
+}
+
+
+def map_columns(columns, key: str) -> dict:
+    """Map each model feature to the matching input column name.
+
+    Matching ignores case and surrounding whitespace and accepts the aliases
+    in ``FEATURE_ALIASES``.  Raises ``ValueError`` naming missing features.
+    """
+    wanted = {name.lower(): name for name in MODEL_SPECS[key].features}
+    for alias, feature in FEATURE_ALIASES[key].items():
+        wanted[alias.lower()] = feature
+
+    mapping = {}
+    for column in columns:
+        feature = wanted.get(str(column).strip().lower())
+        if feature is not None and feature not in mapping:
+            mapping[feature] = column
+
+    missing = [name for name in MODEL_SPECS[key].features if name not in mapping]
+    if missing:
+        raise ValueError(
+            f"Missing columns for the {MODEL_SPECS[key].title} model: "
+            + ", ".join(missing)
+        )
+    return mapping
+
+
+def encode_record(key: str, record) -> list:
+    """One API/JSON record as a numeric feature list in model order.
+
+    ``record`` is either a list already in model order or an object keyed by
+    feature name (training-CSV header or the app's input name).  Text values
+    of categorical features use the same encodings as the UI.
+    """
+    features = MODEL_SPECS[key].features
+    categorical = CATEGORICAL_FEATURES[key]
+    if isinstance(record, dict):
+        mapping = map_columns(record.keys(), key)
+        values = [record[mapping[feature]] for feature in features]
+    elif isinstance(record, (list, tuple)):
+        if len(record) != len(features):
+            raise ValueError(f"Expected {len(features)} values, got {len(record)}")
+        values = list(record)
+    else:
+        raise ValueError("A record must be a JSON object or array")
+
+    row = []
+    for feature, value in zip(features, values):
+        labels = categorical.get(feature)
+        if labels:
+            value = encode_label(labels, value)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{feature} must be a number, got {value!r}")
+        row.append(value)
+    return row
@@ -0,0 +1,137 @@
+"""Exact per-feature contributions behind a prediction.
+
+Forests: every split on a row's path moves the tree's positive-class share
+from the parent node's value to the child's; that move is credited to the
+split feature (Saabas' decomposition).  Summed over the path the moves
+telescope, so per row
+
+    base + sum(contributions) == predict_proba(row)[1]
+
+where ``base`` is the forest's share at the roots (the training prevalence).
+``FlatForest`` already advances all (row, tree) pairs one level per step;
+``contributions`` takes the same steps and adds each level's moves with one
+``bincount``, so a batch costs about two ``predict_proba`` calls.
+
+Linear SVC: the decision score ``<w, x> + b`` splits exactly as
+``w_j * (x_j - mean_j)`` per feature around ``base = <w, mean> + b``, with the
+means of the training CSV, so a feature at its average contributes nothing.
+
+``explain`` keeps its results in the prediction cache next to the labels,
+keyed on the row and tied to the model version that computed them, so a
+hot-reloaded model is explained afresh and the old one is not kept alive.
+Other models (such as a boosted ``compression`` student) raise ``TypeError``.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+from smart_health.cache import get_cache
+from smart_health.specs import MODEL_SPECS
+
+# (rows x trees) node indices advanced per step, as in FlatForest.apply
+_MAX_CELLS = 1 << 16
+
+
+@dataclass(frozen=True)
+class Explanation:
+    features: Tuple[str, ...]
+    # one per feature, in model order; positive pushes towards disease
+    contributions: np.ndarray
+    base: float
+    score: float
+    threshold: float
+    score_name: str
+
+    def top(self, n: int = 5) -> list:
+        """``(feature, contribution)`` for the ``n`` largest contributions by size."""
+        order = np.argsort(-np.abs(self.contributions), kind="stable")[:n]
+        return [(self.features[i], float(self.contributions[i])) for i in order]
+
+
+def forest_contributions(forest, X) -> tuple:
+    """``(base, contributions (rows, features), scores)`` for a binary ``FlatForest``."""
+    if len(forest.classes_) != 2:
+        raise ValueError("Contributions are only defined here for binary forests.")
+    X = forest._validate(X)
+    n_rows, n_features = X.shape
+    positive = np.ascontiguousarray(forest.value[:, 1])
+    children = forest.children.ravel()
+    contributions = np.empty((n_rows, n_features))
+    leaves = np.empty((n_rows, forest.n_estimators), dtype=np.intp)
+    step = max(1, _MAX_CELLS // forest.n_estimators)
+    for start in range(0, n_rows, step):
+        chunk = X[start:start + step]
+        flat_X = chunk.ravel()
+        cells = chunk.shape[0] * n_features
+        row_offset = (np.arange(chunk.shape[0]) * n_features)[:, None]
+        node = np.broadcast_to(forest.roots, (chunk.shape[0], forest.n_estimators))
+        total = np.zeros(cells)
+        for _ in range(forest.max_depth):
+            # leaves loop back to themselves, so their moves are zero
+            cell = row_offset + forest.feature.take(node)
+            go_left = flat_X.take(cell) <= forest.threshold.take(node)
+            child = children.take(np.add(node, node, dtype=np.intp) + go_left)
+            move = positive.take(child) - positive.take(node)
+            total += np.bincount(cell.ravel(), weights=move.ravel(), minlength=cells)
+            node = child
+        contributions[start:start + step] = total.reshape(-1, n_features) / forest.n_estimators
+        leaves[start:start + step] = node
+    base = float(positive.take(forest.roots).mean())
+    scores = positive.take(leaves).mean(axis=1)
+    return base, contributions, scores
+
+
+@lru_cache(maxsize=None)
+def training_means(key: str) -> np.ndarray:
+    from smart_health.datasets import load_dataset
+
+    X, _ = load_dataset(key)
+    means = X.to_numpy(dtype=np.float64).mean(axis=0)
+    means.setflags(write=False)
+    return means
+
+
+def linear_contributions(scorer, X, means: np.ndarray) -> tuple:
+    """``(base, contributions (rows, features), scores)`` for a ``LinearScorer``."""
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    contributions = (X - means) * scorer.coef
+    base = float(scorer.intercept + means @ scorer.coef)
+    return base, contributions, base + contributions.sum(axis=1)
+
+
+def contributions(key: str, predictor, X) -> tuple:
+    """``(base, contributions, scores, threshold, score_name)`` for rows ``X`` of ``key``."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.tree import DecisionTreeClassifier
+
+    from smart_health.forest import FlatForest
+
+    # an early-exit wrapper stops counting votes early; explain the whole forest
+    predictor = getattr(predictor, "forest", predictor)
+    if isinstance(predictor, (RandomForestClassifier, DecisionTreeClassifier)):
+        predictor = FlatForest.from_sklearn(predictor)
+    if isinstance(predictor, FlatForest):
+        return (*forest_contributions(predictor, X), 0.5, "probability")
+    if hasattr(predictor, "coef") and hasattr(predictor, "intercept"):
+        return (*linear_contributions(predictor, X, training_means(key)), 0.0, "decision score")
+    raise TypeError(f"No exact explanation for a {type(predictor).__name__} model.")
+
+
+def explain(key: str, row) -> Explanation:
+    """Contributions behind the prediction for one encoded feature ``row``."""
+    cache = get_cache()
+    row = tuple(float(value) for value in row)
+    found = cache.get_explanation(key, row)
+    if found is not None:
+        return found
+
+    # one version for the computation and the cache entry, even if a swap lands meanwhile
+    active = cache.registry.active(key)
+    base, values, scores, threshold, score_name = contributions(key, active.predictor, [row])
+    result = Explanation(MODEL_SPECS[key].features, values[0], base, float(scores[0]), threshold, score_name)
+    cache.put_explanation(key, row, result, active.version)
+    return result
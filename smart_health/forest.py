@@ -0,0 +1,162 @@
+"""Array-backed inference for fitted ``RandomForestClassifier`` models.
+
+``RandomForestClassifier.predict`` walks its trees one estimator at a time
+through joblib, which costs milliseconds even for a single patient row.
+``FlatForest`` concatenates the node arrays of every tree into one set of
+contiguous arrays and advances all (row, tree) pairs one level per step, so a
+whole forest is evaluated in ``max_depth`` vectorised NumPy operations.
+
+Children are stored interleaved, ``children[2 * node + went_left]``, so one
+step is a handful of ``take`` calls.  Leaves are rewritten as self-loops with
+an infinite threshold, so rows that reach a leaf early simply stay there
+until the deepest tree finishes.
+
+Predictions reproduce sklearn's exactly: inputs are rounded to float32 before
+comparison (as sklearn does), leaf distributions are normalised the same way,
+and per-tree probabilities are accumulated in estimator order.
+"""
+import numpy as np
+
+# (rows x trees) node indices advanced per step; keeps scratch arrays cache-sized
+_MAX_CELLS = 1 << 16
+
+
+class FlatForest:
+    def __init__(
+        self,
+        feature,
+        threshold,
+        children,
+        value,
+        roots,
+        classes,
+        n_features: int,
+        max_depth: int,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        # (n_nodes, 2): column 0 is the right child, column 1 the left child
+        self.children = children
+        # per-node class distribution, normalised to sum to one
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "FlatForest":
+        """Flatten a fitted forest, or a single decision tree as a forest of one."""
+        from sklearn.tree import DecisionTreeClassifier
+
+        # boosted ensembles keep an array of regression trees whose leaves are not votes
+        estimators = getattr(forest, "estimators_", None)
+        if estimators is None:
+            estimators = [forest]
+        if not all(isinstance(estimator, DecisionTreeClassifier) for estimator in estimators):
+            raise TypeError(
+                f"Only forests of classification trees can be flattened, not a {type(forest).__name__}."
+            )
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n = tree.node_count
+            nodes = np.arange(n)
+            leaf = tree.children_left == -1
+
+            left = np.where(leaf, nodes, tree.children_left) + offset
+            right = np.where(leaf, nodes, tree.children_right) + offset
+            feature = np.where(leaf, 0, tree.feature)
+            threshold = np.where(leaf, np.inf, tree.threshold)
+
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(feature)
+            thresholds.append(threshold)
+            children.append(np.stack([right, left], axis=1))
+            values.append(value / normalizer)
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.ascontiguousarray(np.concatenate(children), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(forest.classes_),
+            n_features=int(forest.n_features_in_),
+            max_depth=int(max_depth),
+        )
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def _validate(self, X) -> np.ndarray:
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but the forest expects "
+                f"{self.n_features_in_} features as input."
+            )
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity.")
+        return X.astype(np.float64)
+
+    def apply(self, X) -> np.ndarray:
+        """Global leaf index reached by every row in every tree, ``(rows, trees)``."""
+        X = self._validate(X)
+        out = np.empty((X.shape[0], self.n_estimators), dtype=np.intp)
+        step = max(1, _MAX_CELLS // self.n_estimators)
+        for start in range(0, X.shape[0], step):
+            out[start:start + step] = self._apply(X[start:start + step])
+        return out
+
+    def _apply(self, X: np.ndarray, roots: np.ndarray = None) -> np.ndarray:
+        """Leaves reached from ``roots`` (default: every tree) by validated rows."""
+        roots = self.roots if roots is None else roots
+        n_rows = X.shape[0]
+        flat_X = X.ravel()
+        children = self.children.ravel()
+        row_offset = (np.arange(n_rows) * X.shape[1])[:, None]
+        node = np.broadcast_to(roots, (n_rows, len(roots)))
+        for _ in range(self.max_depth):
+            x = flat_X.take(row_offset + self.feature.take(node))
+            go_left = x <= self.threshold.take(node)
+            # widen before doubling: compact models store uint16 indices
+            node = children.take(np.add(node, node, dtype=np.intp) + go_left)
+        return node
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = self._validate(X)
+        proba = np.empty((X.shape[0], self.value.shape[1]))
+        # chunked like ``apply``, so the per-tree values gathered below stay
+        # cache-sized instead of trees x rows x classes for the whole input
+        step = max(1, _MAX_CELLS // self.n_estimators)
+        for start in range(0, X.shape[0], step):
+            leaves = self._apply(X[start:start + step])
+            # (trees, rows, classes): summing over axis 0 adds tree by tree, in
+            # the same order sklearn accumulates them
+            proba[start:start + step] = self.value[leaves.T].sum(axis=0)
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def compile_forest(forest) -> FlatForest:
+    return FlatForest.from_sklearn(forest)
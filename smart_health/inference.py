@@ -0,0 +1,77 @@
+"""Single-row scoring shared by the UI pages and the prediction API.
+
+A row is looked up in the prediction cache first; only misses reach the
+model, through the per-model micro-batcher.  Every prediction, cached or
+not, is queued for the audit log with the model version that produced its
+label, and counted by the input-drift monitor.  Batches scored elsewhere
+(API arrays, Batch Screening uploads) are logged and counted with
+``record_scored``.
+"""
+import asyncio
+import time
+
+from smart_health import metrics
+from smart_health.audit import get_audit_log
+from smart_health.cache import get_cache
+from smart_health.drift import get_drift_monitor
+from smart_health.microbatch import get_batcher
+from smart_health.specs import MODEL_SPECS
+
+_PREDICT_SECONDS = {
+    key: metrics.histogram("smart_health_predict_seconds", model=key) for key in MODEL_SPECS
+}
+
+
+def _lookup(key: str, row: tuple) -> tuple:
+    """``(label, version)`` from the prediction cache, or ``(None, None)`` on a miss."""
+    cache = get_cache()
+    label = cache.get(key, row)
+    if label is None:
+        return None, None
+    return label, cache.version(key)
+
+
+def _record(key: str, row: tuple, label, version: str, start: float, scored: bool) -> int:
+    """Cache a freshly ``scored`` label, then audit, count and time the prediction."""
+    if scored:
+        get_cache().put(key, row, label, version)
+    audit = get_audit_log()
+    if audit is not None:
+        audit.record(key, row, label, version)
+    drift = get_drift_monitor()
+    if drift is not None:
+        drift.observe(key, row)
+    _PREDICT_SECONDS[key].observe_since(start)
+    return label
+
+
+def predict_one(key: str, row) -> int:
+    """Label for one encoded feature row."""
+    start = time.perf_counter()
+    row = tuple(row)
+    label, version = _lookup(key, row)
+    scored = label is None
+    if scored:
+        label, version = get_batcher(key).submit(list(row)).result()
+    return _record(key, row, label, version, start, scored)
+
+
+async def predict_one_async(key: str, row) -> int:
+    """``predict_one`` for event-loop callers; never blocks on the model."""
+    start = time.perf_counter()
+    row = tuple(row)
+    label, version = _lookup(key, row)
+    scored = label is None
+    if scored:
+        label, version = await asyncio.wrap_future(get_batcher(key).submit(list(row)))
+    return _record(key, row, label, version, start, scored)
+
+
+def record_scored(key: str, rows, labels, version: str):
+    """Audit a batch of rows already scored by model ``version`` and count it for drift."""
+    audit = get_audit_log()
+    if audit is not None:
+        audit.record_many(key, rows, labels, version)
+    drift = get_drift_monitor()
+    if drift is not None:
+        drift.observe_many(key, rows)
@@ -0,0 +1,215 @@
+"""Per-stage latency histograms with Prometheus-text and JSON exposition.
+
+Histograms have fixed bucket bounds and a preallocated count per bucket, so
+``observe`` only bisects and increments: nothing is allocated or retained per
+event, and memory stays constant however long the process runs.  Every
+histogram is registered once, by name and labels, in a process-wide table;
+callers keep the returned object and observe into it directly.
+
+Metrics recorded by the app and API:
+
+* ``smart_health_stage_seconds{page, stage}``: app pages, with stages
+  ``style``, ``encode``, ``predict``, ``render`` and ``script`` (the whole rerun).
+* ``smart_health_predict_seconds{model}``: ``predict_one``, cache included.
+* ``smart_health_model_load_seconds{model}``: unpickling or mapping a model.
+
+The API serves them at ``GET /metrics``.  In a Streamlit process set
+``SMART_HEALTH_METRICS_PORT`` to serve the same text on that port, or
+``SMART_HEALTH_METRICS_FILE`` to dump JSON with p50/p99 there every
+``SMART_HEALTH_METRICS_INTERVAL`` seconds (default 10).
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# seconds; 50 us .. 10 s covers a cached predict up to a cold model load
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"),
+)
+
+PAGE_STAGES = ("style", "encode", "predict", "render", "script")
+
+
+class _Timer(threading.local):
+    """Reusable context manager: one per histogram, with a start time per thread."""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram:
+    def __init__(self, name: str, labels: dict, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+        self._timer = _Timer(self)
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def observe_since(self, start: float):
+        """Record ``perf_counter() - start``."""
+        self.observe(time.perf_counter() - start)
+
+    def time(self) -> _Timer:
+        """Context manager that observes the duration of its block (not reentrant per thread)."""
+        return self._timer
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile by interpolating within its bucket."""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return float("nan")
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if seen + count >= rank and count:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound if bound != float("inf") else lower
+        return lower
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count, total = self.count, self.sum
+        return {
+            "labels": self.labels,
+            "count": count,
+            "sum_seconds": total,
+            # null rather than NaN, which is not valid JSON
+            "p50_ms": self.quantile(0.50) * 1000 if count else None,
+            "p99_ms": self.quantile(0.99) * 1000 if count else None,
+        }
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(name: str, **labels) -> Histogram:
+    """The process-wide histogram for ``name`` and ``labels``, created on first use."""
+    key = (name, tuple(sorted(labels.items())))
+    found = _histograms.get(key)
+    if found is None:
+        with _histograms_lock:
+            found = _histograms.get(key)
+            if found is None:
+                found = _histograms[key] = Histogram(name, labels)
+    return found
+
+
+def page_stages(page: str) -> dict:
+    """Stage name -> histogram for one app page."""
+    return {stage: histogram("smart_health_stage_seconds", page=page, stage=stage) for stage in PAGE_STAGES}
+
+
+def _format_labels(labels: dict, **extra) -> str:
+    merged = {**labels, **extra}
+    if not merged:
+        return ""
+    body = ",".join(f'{name}="{value}"' for name, value in merged.items())
+    return "{" + body + "}"
+
+
+def render_prometheus() -> str:
+    """All histograms in the Prometheus text exposition format."""
+    lines = []
+    by_name = {}
+    for hist in list(_histograms.values()):
+        by_name.setdefault(hist.name, []).append(hist)
+    for name in sorted(by_name):
+        lines.append(f"# TYPE {name} histogram")
+        for hist in by_name[name]:
+            with hist._lock:
+                counts = list(hist.counts)
+                count, total = hist.count, hist.sum
+            cumulative = 0
+            for bound, bucket_count in zip(hist.buckets, counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(hist.labels, le=le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(hist.labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(hist.labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> dict:
+    """Name -> list of per-label summaries with p50/p99, for JSON output."""
+    result = {}
+    for hist in list(_histograms.values()):
+        result.setdefault(hist.name, []).append(hist.snapshot())
+    return result
+
+
+def _serve_prometheus(port: int):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+
+
+def _dump_json(path: str, interval: float):
+    while True:
+        time.sleep(interval)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+_exporter_started = False
+
+
+def start_exporter():
+    """Start the exporters configured by environment variables, once per process.
+
+    Raises ``OSError`` when the metrics port cannot be bound; the JSON dump,
+    if configured, is already running by then.
+    """
+    global _exporter_started
+    with _histograms_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+    path = os.environ.get("SMART_HEALTH_METRICS_FILE")
+    if path:
+        interval = float(os.environ.get("SMART_HEALTH_METRICS_INTERVAL", 10))
+        threading.Thread(target=_dump_json, args=(path, interval), name="metrics-dump", daemon=True).start()
+    port = os.environ.get("SMART_HEALTH_METRICS_PORT")
+    if port:
+        _serve_prometheus(int(port))
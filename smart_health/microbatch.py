@@ -0,0 +1,208 @@
+"""Cross-request micro-batching in front of the disease models.
+
+Every ``predict`` call pays a fixed overhead (input validation, NumPy call
+setup) that is larger than the work for a single row.  A ``MicroBatcher``
+collects rows submitted from any thread (Streamlit sessions, API handlers)
+until ``max_batch`` rows are waiting or the oldest row has waited
+``max_latency`` seconds, runs them as one ``predict`` and resolves each
+caller's future with its own label and the model version that produced it.
+A row arriving at an idle batcher (empty queue, last batch a single row) is
+run at once: there is nobody to wait for.  Cancelled futures are skipped.
+"""
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future, InvalidStateError
+
+from smart_health.registry import get_registry
+from smart_health.specs import MODEL_SPECS
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_LATENCY = 0.002
+
+# upper bounds of the queue-wait histogram buckets, in seconds
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.05, float("inf"))
+
+_STOP = object()
+
+
+class _Request:
+    __slots__ = ("row", "future", "enqueued")
+
+    def __init__(self, row):
+        self.row = row
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        # rows -> (labels array, model version)
+        predict_fn,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_latency: float = DEFAULT_MAX_LATENCY,
+        name: str = "",
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.name = name
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # counters, only written by the worker thread
+        self.batches = 0
+        self.rows = 0
+        self.batch_sizes = [0] * (max_batch + 1)
+        self.wait_counts = [0] * len(WAIT_BUCKETS)
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._last_batch = 0
+
+    def submit(self, row) -> Future:
+        """Queue one encoded feature row; the future resolves to ``(label, version)``."""
+        if self._thread is None:
+            self._start()
+        request = _Request(row)
+        self._queue.put(request)
+        return request.future
+
+    def predict_one(self, row, timeout: float = None):
+        return self.submit(row).result(timeout)[0]
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"microbatch-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self, first: _Request) -> list:
+        batch = [first]
+        if self._last_batch <= 1 and self._queue.empty():
+            return batch
+        deadline = first.enqueued + self.max_latency
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                # past the deadline, still take whatever is already queued
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            try:
+                batch = self._collect(first)
+                self._last_batch = len(batch)
+                started = time.perf_counter()
+                for request in batch:
+                    wait = started - request.enqueued
+                    self.wait_total += wait
+                    self.wait_max = max(self.wait_max, wait)
+                    self.wait_counts[bisect_left(WAIT_BUCKETS, wait)] += 1
+                self.batches += 1
+                self.rows += len(batch)
+                self.batch_sizes[len(batch)] += 1
+                # a caller may have given up on its future; it must not be resolved
+                batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+                if batch:
+                    self._execute(batch)
+            except Exception as exc:
+                # fail this batch only; the worker must outlive it or every later submit hangs
+                for request in batch:
+                    try:
+                        request.future.set_exception(exc)
+                    except InvalidStateError:
+                        pass  # resolved or cancelled already
+
+    def _execute(self, batch: list):
+        try:
+            labels, version = self.predict_fn([request.row for request in batch])
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0].future.set_exception(exc)
+                return
+            # one bad row must not fail its neighbours: retry them one by one
+            for request in batch:
+                self._execute([request])
+            return
+        for request, label in zip(batch, labels.tolist()):
+            request.future.set_result((label, version))
+
+    def stats(self) -> dict:
+        sizes = {str(size): count for size, count in enumerate(self.batch_sizes) if count}
+        waits = {
+            ("inf" if bound == float("inf") else f"{bound * 1000:g}ms"): count
+            for bound, count in zip(WAIT_BUCKETS, self.wait_counts)
+        }
+        return {
+            "max_batch": self.max_batch,
+            "max_latency_ms": self.max_latency * 1000,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "batch_size_counts": sizes,
+            "queue_wait_counts": waits,
+            "mean_queue_wait_ms": self.wait_total / self.rows * 1000 if self.rows else 0.0,
+            "max_queue_wait_ms": self.wait_max * 1000,
+        }
+
+
+_settings = {"max_batch": DEFAULT_MAX_BATCH, "max_latency": DEFAULT_MAX_LATENCY}
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def configure(max_batch: int = None, max_latency: float = None):
+    """Set the knobs used for batchers created from now on."""
+    if max_batch is not None:
+        _settings["max_batch"] = max_batch
+    if max_latency is not None:
+        _settings["max_latency"] = max_latency
+
+
+def get_batcher(key: str) -> MicroBatcher:
+    """The process-wide batcher for model ``key``."""
+    batcher = _batchers.get(key)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(key)
+            if batcher is None:
+                registry = get_registry()
+
+                def predict(rows):
+                    # one version for the whole batch, even if a swap lands meanwhile
+                    active = registry.active(key)
+                    return active.predictor.predict(rows), active.version
+
+                batcher = MicroBatcher(
+                    predict,
+                    name=key,
+                    **_settings,
+                )
+                _batchers[key] = batcher
+    return batcher
+
+
+def all_stats() -> dict:
+    return {key: _batchers[key].stats() for key in MODEL_SPECS if key in _batchers}
@@ -0,0 +1,524 @@
+"""Process-wide, lazily populated registry of the pickled disease models.
+
+Streamlit re-executes ``app.py`` on every widget change, but imported modules
+stay in ``sys.modules`` for the lifetime of the server process.  Keeping the
+registry here means each model is unpickled at most once per process, the
+first time a page (or any other caller) asks for it, and every session and
+rerun after that shares the same object.
+
+When ``saved_models/`` holds an up-to-date ``.compact`` export of a model
+(see ``smart_health.compact``), ``predictor`` memory-maps it instead of
+unpickling, so processes serving the same file share one copy.
+
+Models are versioned by content.  ``start_model_watcher`` polls the files of
+loaded models; a changed file is loaded and validated (feature count and
+names, classes, and parity with the pickle on the notebook sample rows) on
+the watcher thread while the old version keeps serving, then swapped in with
+one assignment.  Requests that already hold the old predictor finish on it.
+``rollback`` returns to the version before the last swap.  Each version keeps
+the pickle bytes it was hashed from, and ``get`` unpickles the sklearn model
+from those rather than from whatever file is on disk by then, so callers
+that need the estimator score with the version the registry accepted.  The registry
+remembers the file each load, reload and rollback acted on, so the watcher
+neither retries a rejected file nor undoes a rollback, whoever made it.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+
+from smart_health import metrics
+from smart_health.specs import MODEL_SPECS, SAMPLE_ROWS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAVED_MODELS_DIR = os.path.join(BASE_DIR, "saved_models")
+
+# earlier versions kept per model for rollback
+MAX_HISTORY = 2
+DEFAULT_WATCH_INTERVAL = 1.0
+# from about this many rows sklearn's compiled tree walk beats FlatForest
+BULK_MIN_ROWS = 1000
+
+
+@dataclass(frozen=True)
+class LoadStats:
+    key: str
+    path: str
+    file_bytes: int
+    # includes the one-off sklearn import for the first model loaded
+    load_seconds: float
+    # bytes retained by the unpickled object graph
+    memory_bytes: int
+
+
+def estimate_footprint(obj) -> int:
+    """Approximate bytes held by ``obj`` and everything reachable from it.
+
+    ``sys.getsizeof`` only counts the buffer of arrays that own their data,
+    so views (such as the node arrays sklearn's ``Tree`` hands out from
+    ``__getstate__``) get their ``nbytes`` added explicitly.  Extension types
+    keep their arrays out of ``__dict__``, so their state is walked instead.
+    """
+    # id -> object, so temporaries from __getstate__ stay alive and their
+    # ids cannot be reused while walking
+    seen = {}
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, type):
+            continue
+        seen[id(item)] = item
+        total += sys.getsizeof(item)
+        flags = getattr(item, "flags", None)
+        if flags is not None and hasattr(flags, "owndata") and not flags.owndata:
+            total += item.nbytes
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__"):
+            stack.append(vars(item))
+        elif hasattr(item, "__getstate__") and type(item).__module__.startswith("sklearn"):
+            stack.append(item.__getstate__())
+    return total
+
+
+def compile_model(model):
+    """Swap a fitted sklearn model for its array-backed equivalent, if there is one."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.svm import SVC
+    from sklearn.tree import DecisionTreeClassifier
+
+    if isinstance(model, (RandomForestClassifier, DecisionTreeClassifier)):
+        from smart_health.forest import FlatForest
+
+        return FlatForest.from_sklearn(model)
+    if isinstance(model, SVC) and model.kernel == "linear" and len(model.classes_) == 2:
+        from smart_health.linear import LinearScorer
+
+        return LinearScorer.from_svc(model)
+    return model
+
+
+class ModelValidationError(ValueError):
+    """A new model file failed the checks it must pass before serving."""
+
+
+# one lazy unpickle at a time, so two callers never both pay for it
+_unpickle_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ModelVersion:
+    key: str
+    # first 12 hex digits of the pickle's SHA-256
+    version: str
+    # size and mtime of the file when it was read, for the watcher
+    fingerprint: str
+    loaded_at: float
+    predictor: object = field(repr=False)
+    # the unpickled sklearn model, or None until ``sklearn_model`` first needs it
+    model: object = field(repr=False)
+    stats: LoadStats = field(repr=False)
+    # the pickle bytes ``version`` was hashed from; dropped once unpickled
+    source: bytes = field(default=None, repr=False)
+
+    def sklearn_model(self):
+        """The sklearn estimator of this version, unpickled from ``source`` on first use."""
+        if self.model is None:
+            with _unpickle_lock:
+                if self.model is None:
+                    object.__setattr__(self, "model", pickle.loads(self.source))
+                    object.__setattr__(self, "source", None)
+        return self.model
+
+
+def bulk_model(active: ModelVersion):
+    """Model of ``active`` best suited to large chunks.
+
+    ``FlatForest`` wins on single rows, but sklearn's compiled tree walk is
+    faster on chunks of thousands of rows, so forests are scored with the
+    version's original estimator here.
+    """
+    from smart_health.forest import FlatForest
+
+    if isinstance(active.predictor, FlatForest):
+        return active.sklearn_model()
+    return active.predictor
+
+
+def model_for(active: ModelVersion, X) -> tuple:
+    """``(model, X)`` to score the rows ``X`` with in one call.
+
+    From ``BULK_MIN_ROWS`` rows that is ``bulk_model(active)``, given ``X`` as
+    a frame with the column names it was fitted on; below, the serving
+    predictor.
+    """
+    import numpy as np
+
+    X = np.asarray(X, dtype=np.float64)
+    if len(X) < BULK_MIN_ROWS:
+        return active.predictor, X
+    model = bulk_model(active)
+    names = getattr(model, "feature_names_in_", None)
+    if model is not active.predictor and names is not None:
+        import pandas as pd
+
+        X = pd.DataFrame(X, columns=names)
+    return model, X
+
+
+def file_fingerprint(path: str) -> str:
+    return _fingerprint(os.stat(path))
+
+
+def _fingerprint(st: os.stat_result) -> str:
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: str = SAVED_MODELS_DIR, specs=MODEL_SPECS, prefer_compact: bool = True):
+        self.model_dir = model_dir
+        self.specs = specs
+        self.prefer_compact = prefer_compact
+        self._active = {}
+        # earlier versions per key, newest last, for rollback
+        self._history = {key: [] for key in specs}
+        # file fingerprint per key that the last load, reload or rollback acted on
+        self._acted_on = {}
+        self._stats = {}
+        # loads are rare; one lock keeps two sessions from unpickling the
+        # same file at the same time
+        self._load_lock = threading.Lock()
+        # one background reload at a time
+        self._reload_lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.model_dir, self.specs[key].filename)
+
+    def get(self, key: str):
+        """Return the fitted sklearn model of the version serving ``key``, loading it on first use."""
+        return self.active(key).sklearn_model()
+
+    def _read(self, key: str, source: bytes):
+        """``(model, LoadStats)`` unpickled from ``source``, the bytes of the file for ``key``."""
+        path = self.path(key)
+        start = time.perf_counter()
+        model = pickle.loads(source)
+        elapsed = time.perf_counter() - start
+        metrics.histogram("smart_health_model_load_seconds", model=key).observe(elapsed)
+
+        stats = LoadStats(
+            key=key,
+            path=path,
+            file_bytes=len(source),
+            load_seconds=elapsed,
+            memory_bytes=estimate_footprint(model),
+        )
+        return model, stats
+
+    def predictor(self, key: str):
+        """Fastest available object with the model's ``predict`` contract."""
+        return self.active(key).predictor
+
+    def version(self, key: str) -> str:
+        return self.active(key).version
+
+    def active(self, key: str) -> ModelVersion:
+        """The version serving ``key`` now, loaded on first use.
+
+        Callers that keep the returned object finish on it even if a new
+        version is swapped in meanwhile.
+        """
+        active = self._active.get(key)
+        if active is not None:
+            return active
+        with self._load_lock:
+            active = self._active.get(key)
+            if active is None:
+                active = self.load_version(key)
+                self._set_active(active)
+        return active
+
+    def load_version(self, key: str) -> ModelVersion:
+        """Read the file now on disk for ``key`` into a version that is not yet serving."""
+        with open(self.path(key), "rb") as f:
+            # the fingerprint of the open file describes exactly the bytes read
+            fingerprint = _fingerprint(os.fstat(f.fileno()))
+            source = f.read()
+        digest = hashlib.sha256(source).hexdigest()
+        model = predictor = stats = None
+        if self.prefer_compact:
+            predictor, stats = self._load_compact(key, digest)
+        if predictor is None:
+            model, stats = self._read(key, source)
+            predictor = compile_model(model)
+            source = None
+        predictor = self._with_early_exit(key, predictor)
+        return ModelVersion(key, digest[:12], fingerprint, time.time(), predictor, model, stats, source)
+
+    def validate(self, candidate: ModelVersion):
+        """Raise ``ModelValidationError`` unless ``candidate`` can replace the serving version.
+
+        Checks the feature count and names against the spec, the classes, and
+        that the predictor agrees with the unpickled model on the notebook
+        sample rows, one at a time and as a batch.
+        """
+        spec = self.specs[candidate.key]
+        # unpickled for the check only, so a compact-backed version stays lean
+        model = candidate.model if candidate.model is not None else pickle.loads(candidate.source)
+        expected_features = len(spec.features)
+        for name, obj in (("model", model), ("predictor", candidate.predictor)):
+            n_features = getattr(obj, "n_features_in_", None)
+            if n_features != expected_features:
+                raise ModelValidationError(
+                    f"The {name} for {candidate.key} takes {n_features} features, not {expected_features}."
+                )
+        names = getattr(model, "feature_names_in_", None)
+        if names is not None and tuple(names) != spec.features:
+            raise ModelValidationError(f"The {candidate.key} model was trained on columns {list(names)}.")
+        classes = list(getattr(candidate.predictor, "classes_", []))
+        if classes != [0, 1]:
+            raise ModelValidationError(f"The {candidate.key} model predicts classes {classes}, not [0, 1].")
+
+        import numpy as np
+
+        rows = np.asarray([SAMPLE_ROWS[candidate.key]], dtype=np.float64)
+        expected = np.asarray(model.predict(rows)).tolist()
+        batched = np.asarray(candidate.predictor.predict(rows)).tolist()
+        single = [candidate.predictor.predict([row])[0] for row in rows.tolist()]
+        if not (expected == batched == single):
+            raise ModelValidationError(
+                f"The {candidate.key} predictor disagrees with its model on the sample rows: "
+                f"expected {expected}, got {batched} batched and {single} one by one."
+            )
+
+    def _set_active(self, candidate: ModelVersion, keep_previous: bool = True):
+        # caller holds _load_lock; readers see the old or the new version, never a mix
+        previous = self._active.get(candidate.key)
+        if previous is not None and keep_previous:
+            history = self._history[candidate.key]
+            history.append(previous)
+            del history[:-MAX_HISTORY]
+        self._stats[candidate.key] = candidate.stats
+        self._active[candidate.key] = candidate
+        self._acted_on.setdefault(candidate.key, candidate.fingerprint)
+
+    def reload(self, key: str) -> ModelVersion:
+        """Load, validate and swap in the file now on disk for ``key``.
+
+        The serving version keeps answering while the new one loads; a file
+        with the same content as the serving version is not swapped.  Raises
+        ``ModelValidationError`` (or the load's own error) and keeps serving
+        the old version if the new one is unusable.
+        """
+        with self._reload_lock:
+            current = self._active.get(key)
+            # recorded before loading, so a file that fails is not retried until it changes
+            self._acted_on[key] = file_fingerprint(self.path(key))
+            candidate = self.load_version(key)
+            self._acted_on[key] = candidate.fingerprint
+            if current is not None and candidate.version == current.version:
+                return current
+            self.validate(candidate)
+            with self._load_lock:
+                self._set_active(candidate)
+            return candidate
+
+    def rollback(self, key: str) -> ModelVersion:
+        """Serve the version ``key`` had before the last swap again.
+
+        The file on disk is left alone and counts as handled: the watcher
+        reloads only once it changes again.
+        """
+        with self._reload_lock, self._load_lock:
+            history = self._history[key]
+            if not history:
+                raise ValueError(f"No earlier version of the {key} model is loaded.")
+            previous = history.pop()
+            self._set_active(previous, keep_previous=False)
+            try:
+                self._acted_on[key] = file_fingerprint(self.path(key))
+            except OSError:
+                pass
+        return previous
+
+    def acted_on(self, key: str):
+        """Fingerprint of the file the last load, reload or rollback of ``key`` acted on."""
+        return self._acted_on.get(key)
+
+    def versions(self, key: str) -> dict:
+        """The serving version of ``key`` and the earlier ones rollback can return to."""
+        active = self._active.get(key)
+        describe = lambda v: {"version": v.version, "loaded_at": v.loaded_at}  # noqa: E731
+        return {
+            "active": describe(active) if active is not None else None,
+            "history": [describe(v) for v in reversed(self._history[key])],
+        }
+
+    def loaded(self) -> dict:
+        """Key -> serving ``ModelVersion``, for every model loaded so far."""
+        return dict(self._active)
+
+    @staticmethod
+    def _with_early_exit(key: str, predictor):
+        """Wrap a binary forest in ``EarlyExitForest`` when ``SMART_HEALTH_EARLY_EXIT`` names a tree order."""
+        from smart_health.forest import FlatForest
+
+        by = os.environ.get("SMART_HEALTH_EARLY_EXIT")
+        if not by or not isinstance(predictor, FlatForest) or len(predictor.classes_) != 2:
+            return predictor
+        from smart_health.early_exit import EarlyExitForest
+
+        return EarlyExitForest.calibrated(predictor, key, by)
+
+    def _load_compact(self, key: str, source_sha256: str):
+        """``(predictor, LoadStats)`` from the ``.compact`` export of ``key``, if it matches the pickle."""
+        from smart_health import compact
+
+        path = compact.compact_path(self.path(key))
+        if not os.path.exists(path):
+            return None, None
+        start = time.perf_counter()
+        header = compact.read_header(path)
+        if header["source_sha256"] != source_sha256:
+            return None, None  # stale export: the pickle was retrained since
+        if tuple(header["features"]) != self.specs[key].features:
+            return None, None
+        predictor = compact.load_compact(path)
+        elapsed = time.perf_counter() - start
+        metrics.histogram("smart_health_model_load_seconds", model=key).observe(elapsed)
+        stats = LoadStats(
+            key=key,
+            path=path,
+            file_bytes=os.path.getsize(path),
+            load_seconds=elapsed,
+            memory_bytes=estimate_footprint(predictor),
+        )
+        return predictor, stats
+
+    def invalidate(self, key: str):
+        """Forget ``key`` so the next caller loads the file from disk again."""
+        with self._load_lock:
+            self._active.pop(key, None)
+            self._acted_on.pop(key, None)
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._active
+
+    def stats(self) -> dict:
+        """Load time and memory of every model loaded so far, by key."""
+        return dict(self._stats)
+
+
+class ModelWatcher:
+    """Polls the files of loaded models and hot-reloads the ones that change.
+
+    A changed file is only read once two polls in a row see the same size
+    and mtime, so a copy still in progress is not loaded half-written.  A
+    file that fails to load or validate is skipped until it changes again;
+    the old version keeps serving.
+    """
+
+    def __init__(self, registry: ModelRegistry, interval: float = DEFAULT_WATCH_INTERVAL):
+        self.registry = registry
+        self.interval = interval
+        self._pending = {}
+        self.reloads = 0
+        self.failures = 0
+        self.errors = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """One poll: reload every loaded model whose file has changed and settled."""
+        for key, active in self.registry.loaded().items():
+            try:
+                fingerprint = file_fingerprint(self.registry.path(key))
+            except OSError:
+                continue  # mid-replace
+            if fingerprint == self.registry.acted_on(key):
+                self._pending.pop(key, None)
+                continue
+            if self._pending.get(key) != fingerprint:
+                self._pending[key] = fingerprint
+                continue
+            del self._pending[key]
+            try:
+                self.registry.reload(key)
+            except Exception as exc:  # a bad file of any kind must not stop the watcher
+                self.failures += 1
+                self.errors[key] = f"{type(exc).__name__}: {exc}"
+            else:
+                self.reloads += 1
+                self.errors.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"reloads": self.reloads, "failures": self.failures, "errors": dict(self.errors)}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+_watcher = None
+
+
+def get_registry() -> ModelRegistry:
+    """The registry shared by every session of this server process."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+
+def start_model_watcher():
+    """Hot-reload changed model files for the rest of the process, once.
+
+    Returns the watcher, or ``None`` when ``SMART_HEALTH_RELOAD=0``; models
+    then stay as first loaded until the server restarts.
+    """
+    global _watcher
+    if os.environ.get("SMART_HEALTH_RELOAD", "1") == "0":
+        return None
+    with _registry_lock:
+        if _watcher is None:
+            _watcher = ModelWatcher(get_registry()).start()
+    return _watcher
+
+
+def get_model_watcher():
+    return _watcher
+
+
+if __name__ == "__main__":
+    # the pickles, not their compact exports: this reports what unpickling costs
+    registry = ModelRegistry(prefer_compact=False)
+    for key in MODEL_SPECS:
+        registry.get(key)
+    for s in registry.stats().values():
+        print(
+            f"{s.key:<11} file {s.file_bytes / 1e6:6.2f} MB  "
+            f"memory {s.memory_bytes / 1e6:6.2f} MB  load {s.load_seconds * 1000:7.1f} ms"
+        )
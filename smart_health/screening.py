@@ -0,0 +1,109 @@
+"""One patient profile scored by all four models concurrently.
+
+Several inputs mean the same thing to more than one model (age, diastolic
+blood pressure, blood glucose, known diabetes).  ``build_inputs`` takes them
+once, as ``SHARED_INPUTS``, plus the inputs only one model uses, and builds
+every model's feature vector in training order.  A shared value outside a
+model's widget range (an age of 10 for diabetes, whose page starts at 21) is
+clamped to it, and every such change is returned as an ``Adjustment`` so the
+page can say which values were scored in place of the patient's own.
+
+``screen`` submits the four rows to a small thread pool at once, so a full
+screening waits about as long as the slowest model rather than the sum.
+Each row still goes through ``predict_one``: the prediction cache, the
+micro-batcher and the latency histograms all apply.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from smart_health.inference import predict_one
+from smart_health.specs import INPUT_RANGES, MODEL_SPECS
+
+# shared profile input -> the model feature it fills, per model
+SHARED_INPUTS = {
+    "age": {"diabetes": "Age", "heart": "age", "kidney": "age"},
+    "diastolic_bp": {"diabetes": "BloodPressure", "kidney": "bp"},
+    "glucose": {"diabetes": "Glucose", "kidney": "bgr"},
+    "diabetic": {"kidney": "dm"},
+}
+
+
+@dataclass(frozen=True)
+class Adjustment:
+    """A shared value a model could not take as given."""
+
+    model: str
+    feature: str
+    given: float
+    used: float
+
+
+@dataclass
+class ScreeningResult:
+    labels: Dict[str, int] = field(default_factory=dict)
+    # per model, from submission to its label
+    seconds: Dict[str, float] = field(default_factory=dict)
+    total_seconds: float = 0.0
+
+
+def _clamp(key: str, feature: str, value):
+    spec = INPUT_RANGES[key][feature]
+    value = min(max(value, spec.low), spec.high)
+    return round(value) if spec.integer else value
+
+
+def build_inputs(shared: dict, specific: dict) -> Tuple[Dict[str, list], List[Adjustment]]:
+    """``(model key -> feature row, adjustments)`` from ``shared`` profile values and ``specific[key][feature]``.
+
+    Raises ``ValueError`` naming any feature left without a value.
+    """
+    values = {key: dict(specific.get(key, {})) for key in MODEL_SPECS}
+    adjustments = []
+    for name, targets in SHARED_INPUTS.items():
+        if name in shared:
+            for key, feature in targets.items():
+                used = _clamp(key, feature, shared[name])
+                if used != shared[name]:
+                    adjustments.append(Adjustment(key, feature, shared[name], used))
+                values[key][feature] = used
+
+    inputs = {}
+    for key, spec in MODEL_SPECS.items():
+        missing = [feature for feature in spec.features if feature not in values[key]]
+        if missing:
+            raise ValueError(f"Missing values for the {spec.title} model: " + ", ".join(missing))
+        inputs[key] = [values[key][feature] for feature in spec.features]
+    return inputs, adjustments
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=len(MODEL_SPECS), thread_name_prefix="screening")
+    return _pool
+
+
+def _timed_predict(key: str, row: list, submitted: float):
+    label = predict_one(key, row)
+    return label, time.perf_counter() - submitted
+
+
+def screen(inputs: Dict[str, list]) -> ScreeningResult:
+    """Score every model's row concurrently; returns once all labels are in."""
+    start = time.perf_counter()
+    pool = _get_pool()
+    futures = {key: pool.submit(_timed_predict, key, row, start) for key, row in inputs.items()}
+    result = ScreeningResult()
+    for key, future in futures.items():
+        result.labels[key], result.seconds[key] = future.result()
+    result.total_seconds = time.perf_counter() - start
+    return result
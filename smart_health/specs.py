@@ -0,0 +1,150 @@
+"""Static description of the four disease models shipped in ``saved_models/``."""
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    key: str
+    title: str
+    filename: str
+    # column names in the exact order the model was trained on
+    features: Tuple[str, ...]
+
+
+MODEL_SPECS = {
+    "diabetes": ModelSpec(
+        key="diabetes",
+        title="Diabetes",
+        filename="diabetes_model.sav",
+        features=(
+            "Glucose",
+            "BMI",
+            "Age",
+            "DiabetesPedigreeFunction",
+            "Insulin",
+            "BloodPressure",
+        ),
+    ),
+    "heart": ModelSpec(
+        key="heart",
+        title="Heart Disease",
+        filename="heart_disease_model.sav",
+        features=(
+            "age",
+            "sex",
+            "cp",
+            "trestbps",
+            "chol",
+            "thalach",
+            "exang",
+            "oldpeak",
+            "slope",
+            "thal",
+        ),
+    ),
+    "parkinsons": ModelSpec(
+        key="parkinsons",
+        title="Parkinson's Disease",
+        filename="parkinsons_model.sav",
+        features=(
+            "MDVP:Fo(Hz)",
+            "MDVP:Fhi(Hz)",
+            "MDVP:Flo(Hz)",
+            "MDVP:Jitter(%)",
+            "MDVP:Shimmer",
+            "HNR",
+            "RPDE",
+            "DFA",
+        ),
+    ),
+    "kidney": ModelSpec(
+        key="kidney",
+        title="Kidney Disease",
+        filename="kidney_model.sav",
+        features=(
+            "age",
+            "bp",
+            "sg",
+            "al",
+            "bgr",
+            "bu",
+            "sc",
+            "hemo",
+            "wc",
+            "htn",
+            "dm",
+            "ane",
+        ),
+    ),
+}
+
+
+@dataclass(frozen=True)
+class FeatureRange:
+    """Values the app's widget for one feature can produce."""
+
+    low: float
+    high: float
+    integer: bool = False
+    # radios and selectboxes: the only codes the widget can emit
+    choices: Tuple[float, ...] = ()
+
+
+_BINARY = FeatureRange(0, 1, integer=True, choices=(0, 1))
+
+# the "Building a Predictive System" rows from the training notebooks, in model order
+SAMPLE_ROWS: Dict[str, Tuple[float, ...]] = {
+    "diabetes": (166, 25.8, 51, 0.587, 175, 72),
+    "heart": (62, 0, 0, 140, 268, 160, 0, 3.6, 2, 2),
+    "parkinsons": (197.076, 206.896, 192.055, 0.00289, 0.01098, 26.775, 0.422229, 0.741367),
+    "kidney": (48, 80, 1.02, 1, 121, 36, 1.2, 15.4, 7800, 1, 1, 0),
+}
+
+# mirrors the min_value / max_value and options of the widgets in app.py
+INPUT_RANGES: Dict[str, Dict[str, FeatureRange]] = {
+    "diabetes": {
+        "Glucose": FeatureRange(40, 300, integer=True),
+        "BMI": FeatureRange(18.0, 67.0),
+        "Age": FeatureRange(21, 81, integer=True),
+        "DiabetesPedigreeFunction": FeatureRange(0.08, 2.5, choices=(0.08, 2.5)),
+        "Insulin": FeatureRange(15, 276, integer=True),
+        "BloodPressure": FeatureRange(24, 122, integer=True),
+    },
+    "heart": {
+        "age": FeatureRange(18, 100, integer=True),
+        "sex": _BINARY,
+        "cp": FeatureRange(0, 3, integer=True, choices=(0, 1, 2, 3)),
+        "trestbps": FeatureRange(80, 220, integer=True),
+        "chol": FeatureRange(100, 600, integer=True),
+        "thalach": FeatureRange(60, 220, integer=True),
+        "exang": _BINARY,
+        "oldpeak": FeatureRange(0.0, 6.5),
+        "slope": FeatureRange(0, 2, integer=True, choices=(0, 1, 2)),
+        "thal": FeatureRange(0, 2, integer=True, choices=(0, 1, 2)),
+    },
+    "parkinsons": {
+        "MDVP:Fo(Hz)": FeatureRange(70.0, 300.0),
+        "MDVP:Fhi(Hz)": FeatureRange(80.0, 600.0),
+        "MDVP:Flo(Hz)": FeatureRange(50.0, 260.0),
+        "MDVP:Jitter(%)": FeatureRange(0.001, 0.03),
+        "MDVP:Shimmer": FeatureRange(0.01, 0.2),
+        "HNR": FeatureRange(5.0, 45.0),
+        "RPDE": FeatureRange(0.1, 1.0),
+        "DFA": FeatureRange(0.4, 1.5),
+    },
+    "kidney": {
+        "age": FeatureRange(1, 100, integer=True),
+        "bp": FeatureRange(50.0, 200.0),
+        "sg": FeatureRange(1.005, 1.025),
+        "al": FeatureRange(0, 5, integer=True),
+        "bgr": FeatureRange(50.0, 500.0),
+        "bu": FeatureRange(1.0, 400.0),
+        "sc": FeatureRange(0.4, 15.0),
+        "hemo": FeatureRange(3.0, 20.0),
+        "wc": FeatureRange(2000, 25000, integer=True),
+        "htn": _BINARY,
+        "dm": _BINARY,
+        "ane": _BINARY,
+    },
+}
@@ -0,0 +1,119 @@
+"""Startup phases, background warm-up and a cold-start timing report.
+
+The app shell only needs Streamlit to render; NumPy, pandas and (without
+``.compact`` exports) scikit-learn are first imported by model loading or
+the Batch Screening page.  ``start_warm_up`` does that work on a daemon
+thread as soon as the shell is up: it loads every model and runs one dummy
+prediction through its micro-batcher, so the first real user pays neither
+the imports nor first-touch costs.
+
+Each step is timed with ``phase`` and kept in a process-wide table that
+``report`` returns.
+
+    python -m smart_health.startup [--json]   # cold-start report for a fresh process
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from smart_health.specs import MODEL_SPECS
+
+_phases = {}
+_phases_lock = threading.Lock()
+_warm_up_thread = None
+
+
+@contextmanager
+def phase(name: str):
+    """Time the ``with`` block and record it as ``name`` (summed on repeats)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _phases_lock:
+            _phases[name] = _phases.get(name, 0.0) + elapsed
+
+
+def report() -> dict:
+    """Seconds per recorded phase, in the order the phases first ran."""
+    with _phases_lock:
+        return dict(_phases)
+
+
+def warm_up(keys=None, registry=None):
+    """Load each model, run one dummy prediction through its batcher and read its drift reference."""
+    from smart_health.drift import get_drift_monitor
+    from smart_health.microbatch import get_batcher
+    from smart_health.registry import get_registry
+
+    registry = registry or get_registry()
+    drift = get_drift_monitor()
+    for key in keys or MODEL_SPECS:
+        with phase(f"load:{key}"):
+            registry.predictor(key)
+        with phase(f"first_predict:{key}"):
+            get_batcher(key).predict_one([0.0] * len(MODEL_SPECS[key].features))
+        if drift is not None:
+            with phase(f"drift_reference:{key}"):
+                drift.references(key)
+
+
+def start_warm_up(keys=None):
+    """Run ``warm_up`` once per process on a daemon thread and return it.
+
+    Set ``SMART_HEALTH_WARMUP=0`` to skip it (returns ``None``) and load
+    models on first use instead.
+    """
+    global _warm_up_thread
+    if os.environ.get("SMART_HEALTH_WARMUP", "1") == "0":
+        return None
+    with _phases_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(
+                target=_run_warm_up, args=(keys,), name="warm-up", daemon=True
+            )
+            _warm_up_thread.start()
+    return _warm_up_thread
+
+
+def _run_warm_up(keys):
+    with phase("warm_up"):
+        warm_up(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each startup phase of a fresh process")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    import warnings
+
+    warnings.filterwarnings("ignore")
+    with phase("import:streamlit"):
+        import streamlit  # noqa: F401
+        import streamlit_option_menu  # noqa: F401
+    with phase("import:app_modules"):
+        import smart_health.encoding  # noqa: F401
+        import smart_health.inference  # noqa: F401
+    warm_up()
+    from smart_health.microbatch import get_batcher
+
+    for key in MODEL_SPECS:
+        with phase(f"warm_predict:{key}"):
+            get_batcher(key).predict_one([0.0] * len(MODEL_SPECS[key].features))
+
+    phases = report()
+    if args.json:
+        print(json.dumps({name: seconds * 1000 for name, seconds in phases.items()}, indent=2))
+        return
+    for name, seconds in phases.items():
+        print(f"{name:<26} {seconds * 1000:9.2f} ms")
+    print(f"{'total':<26} {sum(phases.values()) * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Out-of-core training for screening exports too large to load at once.
+
+The CSV is read ``chunksize`` rows at a time with compact dtypes (float32
+features, int8 labels; the kidney export's free-text columns stay text until
+cleaned) and every chunk is cleaned exactly as ``datasets.load_frame`` cleans
+a whole file: the kidney ``"ckd\\t"`` fix, complete rows only, the stripped
+``pcv``/``wc``/``rc`` counts and the yes/no mappings.  Peak memory is one
+chunk plus the model, however many rows the file has.
+
+Two ways to fit:
+
+* ``forest``: each chunk fits a batch of ``--trees-per-chunk`` trees on
+  bootstrap samples of its rows plus a uniform sample (at most one chunk's
+  worth) of the rows before it, so files sorted by outcome still give every
+  batch both classes.  A second reservoir keeps a uniform sample of
+  ``n_estimators`` trees over all batches, so the forest stays the
+  configured size and every part of the file is equally represented.
+* ``incremental``: a ``StandardScaler`` is fitted in a first pass, then an
+  ``SGDClassifier`` (hinge loss, a linear SVM like the diabetes model)
+  learns with ``partial_fit`` over ``--epochs`` passes, rows shuffled
+  within each chunk.
+
+A fixed, seeded ``test_size`` share of every chunk is never trained on; a
+final pass scores it.  The model is an ordinary sklearn pickle, written to
+``saved_models/streamed/`` unless ``--output`` says otherwise.
+
+    python -m smart_health.streaming kidney --csv exports/kidney.csv --chunksize 200000
+"""
+import argparse
+import copy
+import json
+import os
+import pickle
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from smart_health.datasets import TARGETS, clean_kidney, data_path
+from smart_health.registry import SAVED_MODELS_DIR
+from smart_health.specs import MODEL_SPECS
+from smart_health.training import TRAINING_CONFIGS
+
+DEFAULT_CHUNK_ROWS = 100_000
+MODES = ("forest", "incremental")
+
+# kidney columns that hold text ('\t6200', ' yes', 'ckd\t') until cleaned
+KIDNEY_TEXT_COLUMNS = (
+    "rbc", "pc", "pcc", "ba", "pcv", "wc", "rc", "htn", "dm", "cad", "appet", "pe", "ane", "classification",
+)
+
+
+def _read_options(key: str, path: str) -> dict:
+    """``read_csv`` arguments: only the needed columns, at the smallest dtype that holds them."""
+    if key == "kidney":
+        # the notebook keeps only rows complete in every column, so all are read
+        header = pd.read_csv(path, nrows=0).columns
+        return {
+            "dtype": {
+                column: str if column in KIDNEY_TEXT_COLUMNS else np.float32
+                for column in header
+                if column != "id"
+            },
+            "usecols": [column for column in header if column != "id"],
+        }
+    features = list(MODEL_SPECS[key].features)
+    return {
+        "dtype": {**{feature: np.float32 for feature in features}, TARGETS[key]: np.float32},
+        "usecols": features + [TARGETS[key]],
+    }
+
+
+def iter_chunks(key: str, path: str = None, chunksize: int = DEFAULT_CHUNK_ROWS):
+    """Cleaned ``(X, y)`` arrays, float32 and int8, one chunk at a time."""
+    path = path or data_path(key)
+    features = list(MODEL_SPECS[key].features)
+    for chunk in pd.read_csv(path, chunksize=chunksize, **_read_options(key, path)):
+        if key == "kidney":
+            chunk = clean_kidney(chunk)
+        else:
+            chunk = chunk.dropna()
+        yield chunk[features].to_numpy(dtype=np.float32), chunk[TARGETS[key]].to_numpy(dtype=np.int8)
+
+
+def _held_out(n_rows: int, chunk_index: int, test_size: float, seed: int) -> np.ndarray:
+    """The same evaluation rows of a chunk on every pass."""
+    return np.random.default_rng([seed, chunk_index]).random(n_rows) < test_size
+
+
+class _RowReservoir:
+    """Uniform sample of at most ``capacity`` rows from everything added so far."""
+
+    def __init__(self, capacity: int, n_features: int, seed: int):
+        self.X = np.empty((capacity, n_features), dtype=np.float32)
+        self.y = np.empty(capacity, dtype=np.int8)
+        self.size = 0
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, X: np.ndarray, y: np.ndarray):
+        capacity = len(self.y)
+        fill = min(capacity - self.size, len(y))
+        self.X[self.size:self.size + fill] = X[:fill]
+        self.y[self.size:self.size + fill] = y[:fill]
+        self.size += fill
+        self.seen += fill
+        rest = len(y) - fill
+        if rest:
+            # algorithm R: row number n replaces a random slot with probability capacity / n
+            slots = self._rng.integers(0, self.seen + np.arange(1, rest + 1))
+            keep = slots < capacity
+            self.X[slots[keep]] = X[fill:][keep]
+            self.y[slots[keep]] = y[fill:][keep]
+            self.seen += rest
+
+
+def fit_forest(
+    key,
+    chunks,
+    params: dict,
+    trees_per_chunk: int = 10,
+    test_size: float = 0.2,
+    seed: int = 0,
+    sample_rows: int = DEFAULT_CHUNK_ROWS,
+):
+    """Random forest of ``params["n_estimators"]`` trees sampled from per-chunk batches."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    n_estimators = params.get("n_estimators", 100)
+    batch_params = {name: value for name, value in params.items() if name not in ("n_estimators", "random_state")}
+    rng = np.random.default_rng(seed)
+    reservoir = []
+    seen = 0
+    batch = None
+    earlier = _RowReservoir(sample_rows, len(MODEL_SPECS[key].features), seed)
+    stats = {"chunks": 0, "deferred_chunks": 0, "train_rows": 0}
+    for index, (X, y) in enumerate(chunks()):
+        stats["chunks"] += 1
+        train = ~_held_out(len(y), index, test_size, seed)
+        X, y = X[train], y[train]
+        stats["train_rows"] += len(y)
+        X_batch = np.concatenate([X, earlier.X[:earlier.size]])
+        y_batch = np.concatenate([y, earlier.y[:earlier.size]])
+        earlier.add(X, y)
+        if np.unique(y_batch).size < 2:
+            # trees fitted on one class would not vote like the others; these
+            # rows reach later batches through the row sample
+            stats["deferred_chunks"] += 1
+            continue
+        batch = RandomForestClassifier(
+            n_estimators=trees_per_chunk, random_state=seed + index, **batch_params
+        ).fit(X_batch, y_batch)
+        for tree in batch.estimators_:
+            if len(reservoir) < n_estimators:
+                reservoir.append(tree)
+            else:
+                slot = int(rng.integers(0, seen + 1))
+                if slot < n_estimators:
+                    reservoir[slot] = tree
+            seen += 1
+    if batch is None:
+        raise ValueError("The training rows never held both classes.")
+
+    forest = copy.copy(batch)
+    forest.estimators_ = reservoir
+    forest.n_estimators = len(reservoir)
+    forest.set_params(n_estimators=len(reservoir), random_state=params.get("random_state"))
+    forest.feature_names_in_ = np.asarray(MODEL_SPECS[key].features, dtype=object)
+    stats["trees_fitted"] = seen
+    return forest, stats
+
+
+def fit_incremental(key, chunks, epochs: int = 5, test_size: float = 0.2, seed: int = 0):
+    """``StandardScaler`` + ``SGDClassifier`` pipeline trained one chunk at a time."""
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    stats = {"chunks": 0, "train_rows": 0}
+    for index, (X, y) in enumerate(chunks()):
+        train = ~_held_out(len(y), index, test_size, seed)
+        if train.any():
+            scaler.partial_fit(X[train])
+        stats["chunks"] += 1
+        stats["train_rows"] += int(train.sum())
+
+    classifier = SGDClassifier(loss="hinge", alpha=1e-4, random_state=seed)
+    classes = np.array([0, 1], dtype=np.int8)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        for index, (X, y) in enumerate(chunks()):
+            train = np.flatnonzero(~_held_out(len(y), index, test_size, seed))
+            if not train.size:
+                continue
+            # exports are often sorted by outcome; SGD needs them mixed
+            rows = rng.permutation(train)
+            classifier.partial_fit(scaler.transform(X[rows]), y[rows], classes=classes)
+
+    model = make_pipeline(scaler, classifier)
+    stats["epochs"] = epochs
+    return model, stats
+
+
+def evaluate(model, chunks, test_size: float = 0.2, seed: int = 0) -> dict:
+    """Accuracy on the held-out rows of every chunk."""
+    correct = total = 0
+    for index, (X, y) in enumerate(chunks()):
+        held = _held_out(len(y), index, test_size, seed)
+        if held.any():
+            correct += int((model.predict(X[held]) == y[held]).sum())
+            total += int(held.sum())
+    return {"test_rows": total, "test_accuracy": correct / total if total else float("nan")}
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def train_streaming(
+    key: str,
+    path: str = None,
+    mode: str = None,
+    chunksize: int = DEFAULT_CHUNK_ROWS,
+    trees_per_chunk: int = 10,
+    epochs: int = 5,
+    test_size: float = 0.2,
+    seed: int = 0,
+):
+    """Return ``(model, report)`` for ``key`` trained from ``path`` chunk by chunk."""
+    config = TRAINING_CONFIGS[key]
+    mode = mode or ("forest" if config.estimator == "random_forest" else "incremental")
+
+    def chunks():
+        return iter_chunks(key, path, chunksize)
+
+    start = time.perf_counter()
+    if mode == "forest":
+        params = config.params if config.estimator == "random_forest" else {}
+        model, stats = fit_forest(key, chunks, params, trees_per_chunk, test_size, seed, chunksize)
+    elif mode == "incremental":
+        model, stats = fit_incremental(key, chunks, epochs, test_size, seed)
+    else:
+        raise ValueError(f"Unknown mode {mode!r}; expected one of {MODES}")
+    report = {
+        "model": key,
+        "mode": mode,
+        "csv": path or data_path(key),
+        "chunksize": chunksize,
+        **stats,
+        **evaluate(model, chunks, test_size, seed),
+        "seconds": time.perf_counter() - start,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+    return model, report
+
+
+def main():
+    import warnings
+
+    parser = argparse.ArgumentParser(description="Train a disease model from a CSV too large for memory")
+    parser.add_argument("model", choices=list(MODEL_SPECS))
+    parser.add_argument("--csv", help="default: the bundled training CSV")
+    parser.add_argument("--mode", choices=MODES, help="default: forest for forests, incremental for diabetes")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--trees-per-chunk", type=int, default=10)
+    parser.add_argument("--epochs", type=int, default=5, help="passes over the file in incremental mode")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="default: saved_models/streamed/<model file>")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    model, report = train_streaming(
+        args.model,
+        args.csv,
+        args.mode,
+        args.chunksize,
+        args.trees_per_chunk,
+        args.epochs,
+        args.test_size,
+        args.seed,
+    )
+    output = args.output or os.path.join(SAVED_MODELS_DIR, "streamed", MODEL_SPECS[args.model].filename)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output + ".tmp", "wb") as f:
+        pickle.dump(model, f)
+    os.replace(output + ".tmp", output)
+    with open(output + ".json", "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, value in report.items():
+        print(f"{name:<16} {value:.4f}" if isinstance(value, float) else f"{name:<16} {value}")
+    print(f"written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Scripted, parallel training of the four models with incremental rebuilds.
+
+Reproduces the notebooks' feature selection, splits and hyperparameters
+(``TRAINING_CONFIGS``), trains each stale model in its own worker process and
+writes the pickle to ``saved_models/`` under the name the app loads.
+
+A model is stale when its *config hash* differs from the one recorded in
+``saved_models/training_manifest.json``.  A pickle with no manifest entry
+(the shipped models in a fresh checkout) was not built here, so it is left
+alone unless ``--force`` is given.  The hash covers the CSV's contents,
+the feature list, the estimator and its hyperparameters, the split and the
+scikit-learn version, so editing any of them retrains just that model.
+Each entry is recorded as its worker finishes and the manifest is written
+even when another worker fails, so no pickle built here goes unrecorded; a
+failed model keeps its old file and entry and is reported as ``failed``.
+Cleaned feature matrices (the kidney ``dropna``, ``wc`` fix-up and label
+mapping, for example) are cached in ``.cache/training/`` keyed by the CSV
+hash, so an unchanged CSV is never re-cleaned.
+
+    python -m smart_health.training [--models heart kidney] [--force] [--jobs 4]
+"""
+import argparse
+import hashlib
+import importlib.metadata
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+
+from smart_health.registry import BASE_DIR, SAVED_MODELS_DIR
+from smart_health.specs import MODEL_SPECS
+
+CACHE_DIR = os.path.join(BASE_DIR, ".cache", "training")
+MANIFEST_NAME = "training_manifest.json"
+
+# bump when datasets.load_dataset changes how a CSV is cleaned
+CLEANING_VERSION = 1
+
+
+@dataclass(frozen=True)
+class TrainingConfig:
+    key: str
+    estimator: str  # "random_forest" or "svc"
+    params: dict = field(default_factory=dict)
+    test_size: float = 0.2
+    split_seed: int = 2
+    stratify: bool = True
+
+
+_FOREST_PARAMS = {"max_depth": None, "min_samples_split": 2, "min_samples_leaf": 1, "random_state": 42}
+
+# as in the training notebooks
+TRAINING_CONFIGS = {
+    "diabetes": TrainingConfig("diabetes", "svc", {"kernel": "linear"}),
+    "heart": TrainingConfig("heart", "random_forest", {"n_estimators": 300, **_FOREST_PARAMS}),
+    "parkinsons": TrainingConfig(
+        "parkinsons", "random_forest", {"n_estimators": 350, **_FOREST_PARAMS}, stratify=False
+    ),
+    "kidney": TrainingConfig(
+        "kidney", "random_forest", {"n_estimators": 350, **_FOREST_PARAMS}, split_seed=42
+    ),
+}
+
+
+def build_estimator(config: TrainingConfig):
+    if config.estimator == "random_forest":
+        from sklearn.ensemble import RandomForestClassifier
+
+        return RandomForestClassifier(**config.params)
+    if config.estimator == "svc":
+        from sklearn.svm import SVC
+
+        return SVC(**config.params)
+    raise ValueError(f"Unknown estimator {config.estimator!r}")
+
+
+def data_hash(key: str) -> str:
+    from smart_health.compact import sha256_file
+    from smart_health.datasets import data_path
+
+    return sha256_file(data_path(key))
+
+
+def config_hash(config: TrainingConfig, csv_hash: str) -> str:
+    """Identity of a trained model: same hash, same pickle."""
+    payload = {
+        "csv": csv_hash,
+        "features": MODEL_SPECS[config.key].features,
+        "cleaning": CLEANING_VERSION,
+        # from package metadata: importing sklearn just to hash would cost a second
+        "sklearn": importlib.metadata.version("scikit-learn"),
+        **asdict(config),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def cached_dataset(key: str, csv_hash: str):
+    """``load_dataset(key)``, cleaned once per CSV content and reused after."""
+    path = os.path.join(CACHE_DIR, f"{key}-{csv_hash[:16]}-v{CLEANING_VERSION}.pkl")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    from smart_health.datasets import load_dataset
+
+    X, y = load_dataset(key)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump((X, y), f)
+    os.replace(tmp_path, path)
+    return X, y
+
+
+def split(config: TrainingConfig, X, y):
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(
+        X,
+        y,
+        test_size=config.test_size,
+        stratify=y if config.stratify else None,
+        random_state=config.split_seed,
+    )
+
+
+def train_one(config: TrainingConfig, csv_hash: str, output_path: str) -> dict:
+    """Fit one model and write its pickle atomically; runs in a worker process."""
+    import warnings
+
+    from sklearn.metrics import accuracy_score
+
+    warnings.filterwarnings("ignore")
+    start = time.perf_counter()
+    X, y = cached_dataset(config.key, csv_hash)
+    X_train, X_test, y_train, y_test = split(config, X, y)
+    model = build_estimator(config)
+    model.fit(X_train, y_train)
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(model, f)
+    os.replace(tmp_path, output_path)
+    return {
+        "train_accuracy": float(accuracy_score(y_train, model.predict(X_train))),
+        "test_accuracy": float(accuracy_score(y_test, model.predict(X_test))),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def load_manifest(model_dir: str) -> dict:
+    try:
+        with open(os.path.join(model_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_manifest(model_dir: str, manifest: dict):
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def build(keys=None, force: bool = False, jobs: int = None, model_dir: str = SAVED_MODELS_DIR) -> dict:
+    """Retrain the stale models among ``keys`` in parallel; returns key -> result.
+
+    A model whose training raised gets ``{"status": "failed", "error": ...}``.
+    """
+    from smart_health import compact
+    from smart_health.registry import ModelRegistry
+
+    keys = list(keys or MODEL_SPECS)
+    manifest = load_manifest(model_dir)
+    csv_hashes = {key: data_hash(key) for key in keys}
+    hashes = {}
+    stale = []
+    results = {}
+    for key in keys:
+        hashes[key] = config_hash(TRAINING_CONFIGS[key], csv_hashes[key])
+        output_path = os.path.join(model_dir, MODEL_SPECS[key].filename)
+        entry = manifest.get(key)
+        if not force and entry is None and os.path.exists(output_path):
+            # not trained by this pipeline; overwriting it needs --force
+            results[key] = {"status": "unmanaged"}
+        elif force or entry is None or entry.get("config_hash") != hashes[key] or not os.path.exists(output_path):
+            stale.append(key)
+        else:
+            results[key] = {"status": "up to date", **entry}
+    if not stale:
+        return results
+
+    workers = min(jobs or os.cpu_count() or 1, len(stale))
+    trained = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    train_one,
+                    TRAINING_CONFIGS[key],
+                    csv_hashes[key],
+                    os.path.join(model_dir, MODEL_SPECS[key].filename),
+                ): key
+                for key in stale
+            }
+            # recorded as each pickle lands, so one failed job cannot orphan the others
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    outcome = future.result()
+                except Exception as exc:  # reported per model; the other jobs carry on
+                    results[key] = {"status": "failed", "error": f"{type(exc).__name__}: {exc}"}
+                    continue
+                manifest[key] = {"config_hash": hashes[key], **outcome}
+                results[key] = {"status": "trained", **manifest[key]}
+                trained.append(key)
+    finally:
+        _save_manifest(model_dir, manifest)
+
+    # a .compact export of the old pickle would be ignored as stale; refresh it
+    registry = ModelRegistry(model_dir=model_dir, prefer_compact=False)
+    for key in trained:
+        if os.path.exists(compact.compact_path(registry.path(key))):
+            compact.export_model(registry, key)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the disease models")
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_SPECS), default=list(MODEL_SPECS))
+    parser.add_argument("--force", action="store_true", help="retrain even if nothing changed")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--output-dir", default=SAVED_MODELS_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = build(args.models, force=args.force, jobs=args.jobs, model_dir=args.output_dir)
+    for key in args.models:
+        result = results[key]
+        if result["status"] == "unmanaged":
+            print(f"{key:<11} {result['status']:<11} kept: not built by this pipeline; --force retrains it")
+            continue
+        if result["status"] == "failed":
+            print(f"{key:<11} {result['status']:<11} {result['error']}")
+            continue
+        print(
+            f"{key:<11} {result['status']:<11} test accuracy {result['test_accuracy']:.3f}"
+            + (f"  {result['seconds']:.1f} s" if result["status"] == "trained" else "")
+        )
+    print(f"done in {time.perf_counter() - start:.1f} s")
+    failed = [key for key, result in results.items() if result["status"] == "failed"]
+    if failed:
+        raise SystemExit(f"training failed for {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Latency-aware hyperparameter search for the three random forests.
+
+Every candidate combination of ``n_estimators``, ``max_depth``,
+``min_samples_leaf`` and ``max_features`` is cross-validated on the
+notebook's training split in a worker process, and the shipped
+configuration always joins the grid so it can be compared.  Once every
+worker has finished, the parent times each fitted candidate one at a time,
+so the latencies are not skewed by fits running on the other cores.  It measures the serving path (``FlatForest``) on one row and on a
+1,000-row batch, and records the size of the model's compact export.
+
+Candidates that no other candidate beats on CV accuracy, single-row latency
+and size at once form the Pareto front.  The recommendation is the
+fastest (then smallest) candidate whose CV accuracy is within
+``--tolerance`` of the best.
+
+    python -m smart_health.tuning --models kidney [--tolerance 0.01] [--output tuning.json]
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+
+import numpy as np
+
+from smart_health.training import TRAINING_CONFIGS, build_estimator, cached_dataset, data_hash, split
+
+FOREST_KEYS = ("heart", "parkinsons", "kidney")
+
+DEFAULT_GRID = {
+    "n_estimators": [25, 50, 100, 200, 350],
+    "max_depth": [None, 4, 8],
+    "min_samples_leaf": [1, 2, 4],
+    "max_features": ["sqrt", "log2"],
+}
+
+
+@dataclass
+class Candidate:
+    params: dict
+    cv_accuracy: float = 0.0
+    cv_accuracy_std: float = 0.0
+    cv_roc_auc: float = 0.0
+    test_accuracy: float = 0.0
+    single_row_ms: float = 0.0
+    batch_us_per_row: float = 0.0
+    compact_bytes: int = 0
+    n_nodes: int = 0
+    fit_seconds: float = 0.0
+
+
+_worker_data = {}
+
+
+def _load_worker_data(key: str, csv_hash: str):
+    X, y = cached_dataset(key, csv_hash)
+    _worker_data["split"] = split(TRAINING_CONFIGS[key], X, y)
+    _worker_data["key"] = key
+
+
+def _evaluate(params: dict, folds: int):
+    """Cross-validate one candidate and fit it on the full training split."""
+    import warnings
+
+    from sklearn.model_selection import StratifiedKFold, cross_validate
+
+    warnings.filterwarnings("ignore")
+    X_train, X_test, y_train, y_test = _worker_data["split"]
+    config = replace(TRAINING_CONFIGS[_worker_data["key"]], params=params)
+    scores = cross_validate(
+        build_estimator(config),
+        X_train,
+        y_train,
+        cv=StratifiedKFold(folds, shuffle=True, random_state=0),
+        scoring=("accuracy", "roc_auc"),
+    )
+    start = time.perf_counter()
+    model = build_estimator(config).fit(X_train, y_train)
+    candidate = Candidate(
+        params=params,
+        cv_accuracy=float(scores["test_accuracy"].mean()),
+        cv_accuracy_std=float(scores["test_accuracy"].std()),
+        cv_roc_auc=float(scores["test_roc_auc"].mean()),
+        test_accuracy=float((model.predict(X_test) == y_test).mean()),
+        fit_seconds=time.perf_counter() - start,
+    )
+    return candidate, model
+
+
+def _measure(candidate: Candidate, model, X: np.ndarray, repeat: int = 200):
+    from smart_health.compact import _forest_arrays
+    from smart_health.forest import FlatForest
+
+    flat = FlatForest.from_sklearn(model)
+    row = [X[0].tolist()]
+    flat.predict(row)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        flat.predict(row)
+        timings.append(time.perf_counter() - start)
+    candidate.single_row_ms = float(np.median(timings) * 1000)
+
+    batch = X[np.random.default_rng(0).integers(0, len(X), 1000)]
+    start = time.perf_counter()
+    flat.predict(batch)
+    candidate.batch_us_per_row = (time.perf_counter() - start) / len(batch) * 1e6
+    candidate.compact_bytes = int(sum(array.nbytes for array in _forest_arrays(flat).values()))
+    candidate.n_nodes = flat.n_nodes
+
+
+def pareto_front(candidates: list) -> list:
+    """Candidates not dominated on (accuracy up, latency down, size down)."""
+
+    def dominates(a, b):
+        no_worse = (
+            a.cv_accuracy >= b.cv_accuracy
+            and a.single_row_ms <= b.single_row_ms
+            and a.compact_bytes <= b.compact_bytes
+        )
+        better = (
+            a.cv_accuracy > b.cv_accuracy
+            or a.single_row_ms < b.single_row_ms
+            or a.compact_bytes < b.compact_bytes
+        )
+        return no_worse and better
+
+    front = [c for c in candidates if not any(dominates(other, c) for other in candidates)]
+    return sorted(front, key=lambda c: -c.cv_accuracy)
+
+
+def recommend(candidates: list, tolerance: float) -> Candidate:
+    best = max(c.cv_accuracy for c in candidates)
+    eligible = [c for c in candidates if c.cv_accuracy >= best - tolerance]
+    return min(eligible, key=lambda c: (c.single_row_ms, c.compact_bytes))
+
+
+def search(key: str, grid: dict, folds: int = 5, jobs: int = None) -> list:
+    """Evaluate every combination in ``grid`` for forest ``key``."""
+    names = list(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    base = TRAINING_CONFIGS[key].params
+    param_sets = [{**base, **combo} for combo in combos]
+    # the shipped model, with the estimator's defaults for any grid name it leaves unset
+    defaults = build_estimator(TRAINING_CONFIGS[key]).get_params()
+    shipped = {**base, **{name: defaults[name] for name in names if name not in base}}
+    if shipped not in param_sets:
+        param_sets.append(shipped)
+
+    csv_hash = data_hash(key)
+    X, y = cached_dataset(key, csv_hash)
+    X = X.to_numpy(dtype=np.float64)
+
+    with ProcessPoolExecutor(
+        max_workers=jobs or os.cpu_count(), initializer=_load_worker_data, initargs=(key, csv_hash)
+    ) as pool:
+        fitted = list(pool.map(_evaluate, param_sets, itertools.repeat(folds)))
+    # timed after the pool has shut down, one candidate at a time on idle cores
+    candidates = []
+    for candidate, model in fitted:
+        _measure(candidate, model, X)
+        candidates.append(candidate)
+    return candidates
+
+
+def _parse_grid(args) -> dict:
+    def value(text):
+        if text == "None":
+            return None
+        try:
+            return int(text)
+        except ValueError:
+            try:
+                return float(text)
+            except ValueError:
+                return text
+
+    grid = dict(DEFAULT_GRID)
+    for name in grid:
+        given = getattr(args, name)
+        if given:
+            grid[name] = [value(text) for text in given]
+    return grid
+
+
+def _print_row(candidate: Candidate, marker: str = ""):
+    p = candidate.params
+    print(
+        f"{marker:<2}{p['n_estimators']:>5} {str(p['max_depth']):>5} {p['min_samples_leaf']:>4} "
+        f"{str(p['max_features']):>6}  {candidate.cv_accuracy:.3f}±{candidate.cv_accuracy_std:.3f} "
+        f"{candidate.cv_roc_auc:.3f} {candidate.test_accuracy:.3f}  {candidate.single_row_ms:7.3f} "
+        f"{candidate.batch_us_per_row:7.2f} {candidate.compact_bytes / 1e3:9.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency-aware hyperparameter search for the forests")
+    parser.add_argument("--models", nargs="+", choices=FOREST_KEYS, default=list(FOREST_KEYS))
+    for name in DEFAULT_GRID:
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, nargs="+", help=f"values for {name}")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.01, help="CV accuracy given up for speed")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--output", help="write every candidate and the front as JSON")
+    args = parser.parse_args()
+
+    grid = _parse_grid(args)
+    report = {}
+    for key in args.models:
+        start = time.perf_counter()
+        candidates = search(key, grid, folds=args.folds, jobs=args.jobs)
+        front = pareto_front(candidates)
+        choice = recommend(candidates, args.tolerance)
+        current = TRAINING_CONFIGS[key].params
+
+        print(f"\n{key}: {len(candidates)} candidates in {time.perf_counter() - start:.1f} s, Pareto front:")
+        print("  trees depth leaf  feats  cv acc      auc   test    1-row ms  us/row  compact KB")
+        for candidate in front:
+            _print_row(candidate, "*" if candidate is choice else "")
+        shipped = [c for c in candidates if all(c.params.get(k) == v for k, v in current.items())]
+        if shipped:
+            print("current:")
+            _print_row(shipped[0])
+        print(f"* recommended within {args.tolerance:.3f} of the best CV accuracy")
+        report[key] = {
+            "candidates": [asdict(c) for c in candidates],
+            "pareto_front": [asdict(c) for c in front],
+            "recommended": asdict(choice),
+        }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
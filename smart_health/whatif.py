@@ -0,0 +1,117 @@
+"""What-if risk curves: one patient's inputs with one or two values swept.
+
+``sweep`` varies a single feature across its widget range (``INPUT_RANGES``)
+and ``grid`` varies two at once; every other feature keeps the patient's
+value.  All points are scored in one batched call to the model's predictor
+(the sklearn forest for grids of ``BULK_MIN_ROWS`` points or more),
+and the result is kept in a small process-wide LRU keyed on the patient
+vector, the swept features and the serving model version, so redrawing a panel
+(or another session asking about the same vector) does not score again.
+
+The score is the forest's probability of the positive class, or the signed
+distance from the SVC's hyperplane for diabetes; ``threshold`` is where the
+label flips (0.5 or 0).
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from smart_health.registry import get_registry, model_for
+from smart_health.specs import INPUT_RANGES, MODEL_SPECS
+
+SWEEP_POINTS = 200
+GRID_POINTS = 50
+MAX_CACHED = 64
+
+
+@dataclass(frozen=True)
+class WhatIf:
+    features: Tuple[str, ...]
+    # one axis per swept feature
+    axes: Tuple[np.ndarray, ...]
+    # shaped like the axes: (points,) for a sweep, (points_y, points_x) for a grid
+    labels: np.ndarray
+    scores: np.ndarray
+    threshold: float
+    score_name: str
+
+    def flips(self) -> list:
+        """Swept values midway between neighbouring points with different labels (sweeps only)."""
+        values = self.axes[0]
+        changed = np.flatnonzero(self.labels[1:] != self.labels[:-1])
+        return [float((values[i] + values[i + 1]) / 2) for i in changed]
+
+
+def axis_values(key: str, feature: str, points: int) -> np.ndarray:
+    """Up to ``points`` values the widget for ``feature`` can produce, in order."""
+    spec = INPUT_RANGES[key][feature]
+    if spec.choices:
+        return np.asarray(spec.choices, dtype=np.float64)
+    if spec.integer and spec.high - spec.low + 1 <= points:
+        return np.arange(spec.low, spec.high + 1, dtype=np.float64)
+    values = np.linspace(spec.low, spec.high, points)
+    return np.unique(np.round(values)) if spec.integer else values
+
+
+def _score(predictor, X: np.ndarray):
+    """``(labels, scores, threshold, score_name)`` for rows ``X`` in one batched call."""
+    # an early-exit wrapper gives the same labels; its forest also has probabilities
+    predictor = getattr(predictor, "forest", predictor)
+    if hasattr(predictor, "predict_proba"):
+        proba = predictor.predict_proba(X)
+        return predictor.classes_.take(proba.argmax(axis=1)), proba[:, 1], 0.5, "probability"
+    return predictor.predict(X), predictor.decision_function(X), 0.0, "decision score"
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cached(cache_key, compute):
+    with _cache_lock:
+        found = _cache.get(cache_key)
+        if found is not None:
+            _cache.move_to_end(cache_key)
+            return found
+    result = compute()
+    with _cache_lock:
+        _cache[cache_key] = result
+        if len(_cache) > MAX_CACHED:
+            _cache.popitem(last=False)
+    return result
+
+
+def _evaluate(key: str, row, features: Tuple[str, ...], points: int, registry=None) -> WhatIf:
+    # one version for the curve and its cache key, even if a swap lands meanwhile
+    active = (registry or get_registry()).active(key)
+    row = tuple(float(value) for value in row)
+    names = MODEL_SPECS[key].features
+
+    def compute():
+        axes = tuple(axis_values(key, feature, points) for feature in features)
+        # ij-indexing over the reversed axes puts the first feature last: (y, x)
+        mesh = np.meshgrid(*axes[::-1], indexing="ij")
+        X = np.tile(np.asarray(row), (mesh[0].size, 1))
+        for feature, values in zip(features[::-1], mesh):
+            X[:, names.index(feature)] = values.ravel()
+        labels, scores, threshold, score_name = _score(*model_for(active, X))
+        shape = tuple(len(axis) for axis in axes[::-1])
+        return WhatIf(features, axes, labels.reshape(shape), scores.reshape(shape), threshold, score_name)
+
+    # keyed on the version string, not the predictor, so a swapped-out model is not kept alive
+    return _cached((key, active.version, row, features, points), compute)
+
+
+def sweep(key: str, row, feature: str, points: int = SWEEP_POINTS, registry=None) -> WhatIf:
+    """Scores for ``row`` with ``feature`` swept across its input range."""
+    return _evaluate(key, row, (feature,), points, registry)
+
+
+def grid(key: str, row, x: str, y: str, points: int = GRID_POINTS, registry=None) -> WhatIf:
+    """Scores for ``row`` over every combination of ``x`` and ``y``; arrays are ``(y, x)``."""
+    if x == y:
+        raise ValueError("A what-if grid needs two different features.")
+    return _evaluate(key, row, (x, y), points, registry)
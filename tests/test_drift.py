@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from smart_health.datasets import load_dataset
+from smart_health.drift import DriftMonitor
+from smart_health.encoding import FAMILY_HISTORY_DPF
+from smart_health.specs import INPUT_RANGES, MODEL_SPECS
+
+
+@pytest.mark.parametrize("key", sorted(MODEL_SPECS))
+def test_ui_traffic_does_not_alert(key):
+    """Training-like rows, with the answers the UI sends for reduced features, stay unflagged."""
+    X, _ = load_dataset(key)
+    rows = X.sample(400, replace=True, random_state=0).to_numpy(dtype=np.float64)
+    for i, feature in enumerate(MODEL_SPECS[key].features):
+        spec = INPUT_RANGES[key].get(feature)
+        if spec is not None and spec.choices and not spec.integer:
+            rows[:, i] = np.resize(spec.choices, len(rows))
+    monitor = DriftMonitor()
+    monitor.observe_many(key, rows)
+    assert monitor.shifted(key) == []
+
+
+def test_family_history_answers_stay_stable():
+    X, _ = load_dataset("diabetes")
+    column = list(MODEL_SPECS["diabetes"].features).index("DiabetesPedigreeFunction")
+    rows = X.sample(100, random_state=0).to_numpy(dtype=np.float64)
+    rows[:, column] = [FAMILY_HISTORY_DPF["No"]] * 50 + [FAMILY_HISTORY_DPF["Yes"]] * 50
+    monitor = DriftMonitor()
+    for row in rows:
+        monitor.observe("diabetes", row)
+    drift = [d for d in monitor.report("diabetes") if d.feature == "DiabetesPedigreeFunction"][0]
+    assert drift.status == "stable"
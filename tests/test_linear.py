@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from smart_health.datasets import load_dataset
+from smart_health.linear import LinearScorer, check_parity
+from smart_health.registry import ModelRegistry
+
+# the scorer folds the support vectors into one weight vector, so its sums round differently
+DECISION_TOLERANCE = 1e-6
+
+
+@pytest.fixture(scope="module")
+def svc():
+    return ModelRegistry(prefer_compact=False).get("diabetes")
+
+
+@pytest.fixture(scope="module")
+def rows():
+    X, _ = load_dataset("diabetes")
+    return X.to_numpy(dtype=np.float64)
+
+
+def test_labels_match_svc_on_every_training_row(svc, rows):
+    report = check_parity(svc, rows)
+    assert report["rows"] == len(rows)
+    assert report["batch_mismatches"] == 0
+    assert report["single_mismatches"] == 0
+
+
+def test_decision_function_within_tolerance(svc, rows):
+    scorer = LinearScorer.from_svc(svc)
+    error = np.abs(scorer.decision_function(rows) - svc.decision_function(rows))
+    assert error.max() < DECISION_TOLERANCE
+    single = np.array([scorer.decision_one(row) for row in rows.tolist()])
+    assert np.abs(single - svc.decision_function(rows)).max() < DECISION_TOLERANCE
+
+
+def test_served_predictor_matches_svc(svc, rows):
+    served = ModelRegistry().predictor("diabetes")
+    assert (served.predict(rows) == svc.predict(rows)).all()